@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+WebSocket broadcast benchmark
+WebSocket广播基准测试
+
+Connects N in-process fake clients to the CommunicationService, a few of
+them slow, and broadcasts a stream of task progress updates. Reports how
+long each broadcast call takes and how late fast clients receive messages,
+compared with the old sequential loop (json.dumps + await send per client).
+
+Run from the backend directory:
+    python -m benchmarks.bench_broadcast --clients 1000 --messages 200
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from typing import List
+
+from src.services.communication_service import CommunicationService
+from src.utils.config import WebSocketSettings
+
+
+class FakeClient:
+    """Stands in for a plugin socket; records when frames arrive"""
+
+    def __init__(self, send_delay: float):
+        self.send_delay = send_delay
+        self.latencies: List[float] = []
+        self.received = 0
+        self._closed = asyncio.Event()
+
+    async def send(self, frame) -> None:
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        self.received += 1
+        sent_at = json.loads(frame)['payload']['sent_at']
+        self.latencies.append(time.perf_counter() - sent_at)
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        self._closed.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await self._closed.wait()
+        raise StopAsyncIteration
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def progress_message(index: int, rows: int) -> dict:
+    return {
+        'id': f"msg-{index}",
+        'type': 'task_status_update',
+        'timestamp': time.time(),
+        'source': 'backend',
+        'target': 'orchestrator',
+        'payload': {
+            'task_id': f"task-{index % 10}",
+            'status': 'executing',
+            'progress': index,
+            'sent_at': time.perf_counter(),
+            'rows': [{'title': f"row {i}", 'url': f"https://example.com/{i}"} for i in range(rows)]
+        }
+    }
+
+
+def report(label: str, call_times: List[float], clients: List[FakeClient]) -> None:
+    latencies = [latency for client in clients for latency in client.latencies]
+    print(
+        f"{label:<12} broadcast call p50={percentile(call_times, 50) * 1000:.2f}ms "
+        f"p99={percentile(call_times, 99) * 1000:.2f}ms  "
+        f"fast-client delivery p50={percentile(latencies, 50) * 1000:.2f}ms "
+        f"p99={percentile(latencies, 99) * 1000:.2f}ms"
+    )
+
+
+async def run_sequential(args, fast: List[FakeClient], slow: List[FakeClient]) -> None:
+    clients = fast + slow
+    call_times = []
+    for index in range(args.messages):
+        message = progress_message(index, args.rows)
+        started = time.perf_counter()
+        for client in clients:
+            await client.send(json.dumps(message))
+        call_times.append(time.perf_counter() - started)
+        await asyncio.sleep(args.interval)
+    report("sequential", call_times, fast)
+
+
+async def run_queued(args, fast: List[FakeClient], slow: List[FakeClient]) -> None:
+    service = CommunicationService(WebSocketSettings(outbound_queue_size=args.queue_size))
+    handlers = [
+        asyncio.create_task(service.handle_connection(client, "/ws"))
+        for client in fast + slow
+    ]
+    await asyncio.sleep(0)
+
+    call_times = []
+    for index in range(args.messages):
+        message = progress_message(index, args.rows)
+        started = time.perf_counter()
+        await service.broadcast_message(message)
+        call_times.append(time.perf_counter() - started)
+        await asyncio.sleep(args.interval)
+    await asyncio.sleep(0.5)
+
+    report("queued", call_times, fast)
+    stats = service.get_stats()
+    slow_ids = {f"conn_{id(client)}" for client in slow}
+    slow_stats = [s for cid, s in stats['per_connection'].items() if cid in slow_ids]
+    print(
+        f"{'':<12} slow clients received {sum(c.received for c in slow)} frames, "
+        f"coalesced={sum(s['coalesced'] for s in slow_stats)} "
+        f"dropped={sum(s['dropped'] for s in slow_stats)}, "
+        f"max backpressure={stats['max_backpressure']}"
+    )
+
+    for client in fast + slow:
+        await client.close()
+    await asyncio.gather(*handlers)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--slow", type=int, default=10, help="clients that take --slow-delay per frame")
+    parser.add_argument("--slow-delay", type=float, default=0.05)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.01)
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--queue-size", type=int, default=256)
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    print(f"{args.clients} clients ({args.slow} slow), {args.messages} progress updates")
+    if not args.skip_sequential:
+        await run_sequential(
+            args,
+            [FakeClient(0) for _ in range(args.clients - args.slow)],
+            [FakeClient(args.slow_delay) for _ in range(args.slow)]
+        )
+    await run_queued(
+        args,
+        [FakeClient(0) for _ in range(args.clients - args.slow)],
+        [FakeClient(args.slow_delay) for _ in range(args.slow)]
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
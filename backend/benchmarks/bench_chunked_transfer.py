@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Chunked transfer memory benchmark
+分块传输内存基准测试
+
+Feeds a large extraction result (200 MB by default) into the
+CommunicationService either as one frame (decoded in memory, as before) or
+as a chunked transfer spooled to a temp file, and reports the peak RSS of
+each. Each mode runs in its own process so the peaks do not mix.
+
+Run from the backend directory:
+    python -m benchmarks.bench_chunked_transfer --size-mb 200
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import time
+import uuid
+from typing import Iterator
+
+from src.services.chunked_transfer import CHUNK_MAGIC
+from src.services.communication_service import CommunicationService
+from src.utils.config import WebSocketSettings
+
+
+def payload_chunks(total_bytes: int, chunk_bytes: int) -> Iterator[bytes]:
+    """A JSON array of scraped rows, generated chunk by chunk"""
+    row = json.dumps({
+        'title': 'Example product title ' * 3,
+        'url': 'https://shop.example.com/item/123456789',
+        'price': 199.99,
+        'description': 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 6
+    }).encode()
+    produced = 0
+    first = True
+    while produced < total_bytes:
+        parts = [b'['] if first else []
+        size = 1 if first else 0
+        while size < chunk_bytes and produced + size < total_bytes:
+            parts.append(row if first and len(parts) == 1 else b',' + row)
+            size += len(parts[-1])
+        produced += size
+        if produced >= total_bytes:
+            parts.append(b']')
+        first = False
+        yield b''.join(parts)
+
+
+class FeedingSocket:
+    """Fake plugin socket that yields pre-planned frames, then closes"""
+
+    def __init__(self, frames: Iterator):
+        self.frames = frames
+
+    async def send(self, frame) -> None:
+        pass
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        pass
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(0)
+        try:
+            return next(self.frames)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def chunked_frames(size: int, chunk: int) -> Iterator:
+    transfer_id = uuid.uuid4()
+    digest = hashlib.sha256()
+    total = 0
+    for data in payload_chunks(size, chunk):
+        digest.update(data)
+        total += len(data)
+    # Second pass streams the same bytes; the start message needs the totals
+    yield json.dumps({
+        'type': 'chunked_transfer_start',
+        'payload': {
+            'transfer_id': str(transfer_id),
+            'message_type': 'node_update',
+            'total_size': total,
+            'sha256': digest.hexdigest(),
+            'metadata': {'node_id': 'node-extract'}
+        }
+    })
+    for data in payload_chunks(size, chunk):
+        yield CHUNK_MAGIC + transfer_id.bytes + data
+    yield json.dumps({'type': 'chunked_transfer_end', 'payload': {'transfer_id': str(transfer_id)}})
+
+
+def single_frame(size: int, chunk: int) -> Iterator:
+    rows = b''.join(payload_chunks(size, chunk)).decode()
+    yield '{"type": "node_update", "payload": {"node_id": "node-extract", "extracted": ' + rows + '}}'
+
+
+async def run_mode(mode: str, size: int, chunk: int) -> None:
+    service = CommunicationService(WebSocketSettings(max_message_size=size * 2))
+    received = asyncio.get_running_loop().create_future()
+
+    async def on_update(connection_id: str, data: dict) -> None:
+        transfer = data.get('transfer')
+        if transfer is not None:
+            transfer.copy_to(os.devnull)
+            received.set_result(transfer.size)
+        else:
+            received.set_result(len(data['payload']['extracted']))
+
+    service.register_message_handler('node_update', on_update)
+    frames = chunked_frames(size, chunk) if mode == 'chunked' else single_frame(size, chunk)
+
+    started = time.perf_counter()
+    await service.handle_connection(FeedingSocket(frames), "/ws")
+    result = await received
+    elapsed = time.perf_counter() - started
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:<8} received={result}  time={elapsed:.2f}s  peak RSS={peak_mb:.0f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=200)
+    parser.add_argument("--chunk-kb", type=int, default=1024)
+    parser.add_argument("--mode", choices=["chunked", "single"])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.mode:
+        asyncio.run(run_mode(args.mode, args.size_mb * 1024 * 1024, args.chunk_kb * 1024))
+        return
+
+    baseline_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{args.size_mb} MB extraction, interpreter baseline RSS={baseline_mb:.0f} MB")
+    for mode in ("chunked", "single"):
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_chunked_transfer", "--mode", mode,
+             "--size-mb", str(args.size_mb), "--chunk-kb", str(args.chunk_kb)],
+            check=True
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Wire codec benchmark
+消息编解码基准测试
+
+Encodes and decodes extraction-result messages of increasing size with
+every codec available in this environment (stdlib json always; orjson and
+msgpack when installed) and reports throughput and frame size.
+
+Run from the backend directory:
+    python -m benchmarks.bench_codecs --rows 100 1000 10000
+"""
+
+import argparse
+import random
+import string
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+from src.utils.codecs import available_codecs
+
+
+def random_text(length: int) -> str:
+    return ''.join(random.choices(string.ascii_letters + string.digits + '     ', k=length))
+
+
+def extraction_message(rows: int) -> Dict[str, Any]:
+    """A data_extractor result as a plugin would send it"""
+    return {
+        'id': 'msg-bench',
+        'type': 'node_update',
+        'timestamp': datetime.now().isoformat(),
+        'source': 'plugin',
+        'target': 'backend',
+        'payload': {
+            'node_id': 'node-extract',
+            'extracted': [
+                {
+                    'index': index,
+                    'title': random_text(60),
+                    'url': f"https://shop.example.com/item/{random.randint(1, 10**8)}",
+                    'price': round(random.uniform(1, 999), 2),
+                    'in_stock': random.random() > 0.2,
+                    'rating': random.randint(0, 50) / 10,
+                    'description': random_text(300),
+                    'attributes': {
+                        'class': 'product-card',
+                        'data-sku': random_text(12),
+                        'xpath': f"/html/body/div[2]/main/ul/li[{index + 1}]"
+                    },
+                    'tags': [random_text(8) for _ in range(4)]
+                }
+                for index in range(rows)
+            ]
+        }
+    }
+
+
+def measure(fn: Callable[[], Any], min_seconds: float) -> float:
+    """Seconds per call, repeating until min_seconds has passed"""
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return elapsed / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--min-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    codecs = available_codecs()
+    print(f"codecs available: {', '.join(codecs)}")
+    print(f"{'rows':>6} {'codec':<8} {'frame KB':>9} {'encode ms':>10} {'decode ms':>10} {'enc MB/s':>9} {'dec MB/s':>9}")
+
+    for rows in args.rows:
+        message = extraction_message(rows)
+        for name, codec in codecs.items():
+            frame = codec.encode(message)
+            size = len(frame.encode() if isinstance(frame, str) else frame)
+            encode_s = measure(lambda: codec.encode(message), args.min_seconds)
+            decode_s = measure(lambda: codec.decode(frame), args.min_seconds)
+            print(
+                f"{rows:>6} {name:<8} {size / 1024:>9.1f} {encode_s * 1000:>10.3f} {decode_s * 1000:>10.3f} "
+                f"{size / encode_s / 1e6:>9.1f} {size / decode_s / 1e6:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
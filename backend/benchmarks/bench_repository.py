@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Repository write benchmark
+仓库写入基准测试
+
+Compares task state-change throughput and latency for:
+  * memory      - in-memory store only (baseline)
+  * sqlite      - SQLite repository with group commits
+  * sqlite-1    - SQLite repository committing every write on its own
+  * events      - task event log, with SQLite snapshots every 1000 events
+
+Run from the backend directory:
+    python -m benchmarks.bench_repository --tasks 2000 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import List, Optional
+
+from src.models.task import TaskCreate, TriggerConfig, TriggerType
+from src.services.repository import SQLiteRepository
+from src.services.task_events import TaskEventLog
+from src.services.task_service import TaskService
+from src.utils.config import DatabaseSettings
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+async def run_case(
+    name: str,
+    tasks: int,
+    concurrency: int,
+    batch_size: Optional[int],
+    event_log: bool = False
+) -> None:
+    repository = None
+    workdir = tempfile.TemporaryDirectory()
+    if batch_size is not None:
+        config = DatabaseSettings(
+            url=f"sqlite:///{os.path.join(workdir.name, 'bench.db')}",
+            commit_batch_size=batch_size
+        )
+        repository = SQLiteRepository(config)
+        await repository.initialize()
+
+    events = TaskEventLog(os.path.join(workdir.name, 'events')) if event_log else None
+    service = TaskService(repository=repository, events=events)
+    await service.initialize()
+    create = TaskCreate(workflow_id="bench", trigger_config=TriggerConfig(type=TriggerType.MANUAL))
+    task_ids = [(await service.create_task(create)).id for _ in range(tasks)]
+
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def toggle(task_id: str) -> None:
+        async with semaphore:
+            for operation in (service.execute_task, service.stop_task):
+                started = time.perf_counter()
+                await operation(task_id)
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(toggle(task_id) for task_id in task_ids))
+    elapsed = time.perf_counter() - started
+
+    commits = ""
+    await service.cleanup()
+    if repository:
+        stats = repository.get_stats()
+        commits = f"  commits={stats['commits']}"
+        await repository.cleanup()
+    workdir.cleanup()
+
+    print(
+        f"{name:<10} writes={len(latencies):>7}  "
+        f"writes/sec={len(latencies) / elapsed:>10.0f}  "
+        f"p50={percentile(latencies, 50) * 1000:>8.3f}ms  "
+        f"p99={percentile(latencies, 99) * 1000:>8.3f}ms  "
+        f"mean={statistics.fmean(latencies) * 1000:>8.3f}ms{commits}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=DatabaseSettings().commit_batch_size)
+    args = parser.parse_args()
+
+    await run_case("memory", args.tasks, args.concurrency, None)
+    await run_case("sqlite", args.tasks, args.concurrency, args.batch_size)
+    await run_case("sqlite-1", args.tasks, args.concurrency, 1)
+    await run_case("events", args.tasks, args.concurrency, args.batch_size, event_log=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
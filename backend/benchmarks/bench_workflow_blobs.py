@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Workflow blob store benchmark
+工作流块存储基准测试
+
+Builds a corpus of cloned workflows that differ from a base workflow in a
+few selectors and compares resident memory for:
+  * dicts   - every workflow_data held as its own decoded dict (as loaded
+              from the repository before chunking)
+  * chunks  - documents stored in the content-addressed blob store, then
+              loaded back by a fresh store as after a restart
+
+Also reports the dedup ratio, compression ratio and bytes on disk. Each
+mode runs in its own interpreter so the RSS figures do not mix.
+
+Run from the backend directory:
+    python -m benchmarks.bench_workflow_blobs --workflows 10000 --nodes 30
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from src.services.workflow_blobs import WorkflowBlobStore
+
+
+def rss_mb() -> float:
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def base_workflow(nodes: int) -> Dict[str, Any]:
+    """A scraping workflow: a chain of nodes, each with a few operation units"""
+    return {
+        'nodes': [
+            {
+                'id': f"node-{index}",
+                'type': random.choice(['click', 'input', 'extract', 'wait', 'navigate']),
+                'position': {'x': index * 180, 'y': (index % 4) * 120},
+                'properties': {
+                    'label': f"Step {index}",
+                    'timeout': 30000,
+                    'retry': {'attempts': 3, 'delay_ms': 500},
+                    'notes': f"Generated step {index} of the listing crawler " * 3
+                },
+                'operation_units': [
+                    {
+                        'observation': {
+                            'type': 'element',
+                            'target': {'selector': f"#listing-{index} .item:nth-child({unit}) > a.title"}
+                        },
+                        'action': {'type': 'click', 'params': {'button': 'left', 'delay': 50}}
+                    }
+                    for unit in range(4)
+                ]
+            }
+            for index in range(nodes)
+        ],
+        'connections': [
+            {
+                'id': f"edge-{index}",
+                'from_node': f"node-{index}",
+                'from_socket': 'out',
+                'to_node': f"node-{index + 1}",
+                'to_socket': 'in'
+            }
+            for index in range(nodes - 1)
+        ],
+        'execution_config': {'mode': 'sequential', 'headless': True}
+    }
+
+
+def corpus(workflows: int, nodes: int, edits: int) -> List[bytes]:
+    """JSON of clones of one base workflow, each with a few selectors changed"""
+    random.seed(7)
+    base = json.dumps(base_workflow(nodes))
+    documents = []
+    for clone in range(workflows):
+        document = json.loads(base)
+        for _ in range(edits):
+            node = random.choice(document['nodes'])
+            unit = random.choice(node['operation_units'])
+            unit['observation']['target']['selector'] = f"#clone-{clone} .item:nth-child({random.randint(1, 50)})"
+        documents.append(json.dumps(document).encode())
+    return documents
+
+
+async def run_mode(mode: str, workflows: int, nodes: int, edits: int) -> None:
+    raw = corpus(workflows, nodes, edits)
+    raw_bytes = sum(len(document) for document in raw)
+    gc.collect()
+    before = rss_mb()
+
+    if mode == 'dicts':
+        started = time.perf_counter()
+        held = [json.loads(document) for document in raw]
+        elapsed = time.perf_counter() - started
+        del raw
+        gc.collect()
+        print(f"dicts   {len(held)} workflows  load={elapsed:.2f}s  "
+              f"RSS before={before:.0f} MB after={rss_mb():.0f} MB (+{rss_mb() - before:.0f} MB)")
+        return
+
+    workdir = tempfile.TemporaryDirectory()
+    writer = WorkflowBlobStore(workdir.name)
+    started = time.perf_counter()
+    refs = [(await writer.put(json.loads(document)))[0] for document in raw]
+    stored = time.perf_counter() - started
+    stats = writer.get_stats()
+    on_disk = sum(
+        os.path.getsize(os.path.join(folder, name))
+        for folder, _, names in os.walk(workdir.name)
+        for name in names
+    )
+    del writer, raw
+    gc.collect()
+    before = rss_mb()
+
+    reader = WorkflowBlobStore(workdir.name)
+    started = time.perf_counter()
+    held = [reader.load(ref) for ref in refs]
+    loaded = time.perf_counter() - started
+    gc.collect()
+    after = rss_mb()
+    print(f"chunks  {len(held)} workflows  store={stored:.2f}s load={loaded:.2f}s  "
+          f"RSS before={before:.0f} MB after={after:.0f} MB (+{after - before:.0f} MB)")
+    print(f"        codec={stats['codec']}  dedup ratio={stats['dedup_ratio']}x  "
+          f"compression={stats['compression_ratio']}x  "
+          f"JSON={raw_bytes / 1e6:.1f} MB -> on disk={on_disk / 1e6:.2f} MB "
+          f"in {stats['chunks_written']} chunks")
+    workdir.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workflows", type=int, default=10000)
+    parser.add_argument("--nodes", type=int, default=30)
+    parser.add_argument("--edits", type=int, default=3, help="selectors changed per clone")
+    parser.add_argument("--mode", choices=["dicts", "chunks"])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.mode:
+        asyncio.run(run_mode(args.mode, args.workflows, args.nodes, args.edits))
+        return
+
+    print(f"{args.workflows} clones of a {args.nodes}-node workflow, {args.edits} selectors changed each")
+    for mode in ("dicts", "chunks"):
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_workflow_blobs", "--mode", mode,
+             "--workflows", str(args.workflows), "--nodes", str(args.nodes), "--edits", str(args.edits)],
+            check=True
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,22 +3,134 @@ API Routes for Web Automation Orchestrator
 API路由定义
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
-
-from ..models.workflow import WorkflowCreate, WorkflowResponse, WorkflowUpdate
-from ..models.task import TaskCreate, TaskResponse
-from ..services.workflow_service import WorkflowService
-from ..services.task_service import TaskService
+from fastapi import APIRouter, Body, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+from pydantic import BaseModel
+
+from ..models.workflow import (
+    WorkflowBatchCreate,
+    WorkflowBatchDelete,
+    WorkflowBatchItem,
+    WorkflowCreate,
+    WorkflowPatchResult,
+    WorkflowResponse,
+    WorkflowUpdate,
+    WorkflowVersion,
+    WorkflowVersionInfo
+)
+from ..models.task import (
+    TaskBatchCreate,
+    TaskBatchExecute,
+    TaskBatchItem,
+    TaskCreate,
+    TaskLogPage,
+    TaskResponse,
+    TaskSelection
+)
+from ..services.workflow_service import WorkflowService, WorkflowVersionConflict
+from ..services.browser_handles import BrowserHandleRegistry
+from ..services.browser_pool import BrowserPool
+from ..services.communication_service import CommunicationService
+from ..services.response_cache import CachedResponse, ResponseCache, Version, format_etag, matching_etag, parse_etag
+from ..services.execution_engine import ExecutionEngine
+from ..services.workflow_planner import WorkflowValidationError
+from ..services.scheduler import TaskScheduler
+from ..services.task_events import json_default
+from ..services.task_service import TaskAlreadyActive, TaskService
+from ..services.task_stream import TaskSubscription, encode_sse
+from ..services.store import encode_cursor
 
 router = APIRouter()
 
-# Dependency injection
-def get_workflow_service() -> WorkflowService:
-    return WorkflowService()
-
-def get_task_service() -> TaskService:
-    return TaskService()
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Server-Sent Events: reconnect delay hint and keep-alive comment interval
+SSE_RETRY_MS = 3000
+SSE_KEEPALIVE_SECONDS = 15.0
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+    # GZipMiddleware passes responses with a Content-Encoding through;
+    # otherwise it would hold events back in its compression buffer
+    "Content-Encoding": "identity"
+}
+
+# Bulk endpoints: item outcomes that count as failures, and NDJSON streaming
+BATCH_FAILED_STATUSES = {"invalid", "not_found", "already_active"}
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_LINES_PER_CHUNK = 500
+
+# Dependency injection - services are created once per process in lifespan()
+def get_workflow_service(request: Request) -> WorkflowService:
+    return request.app.state.workflow_service
+
+def get_task_service(request: Request) -> TaskService:
+    return request.app.state.task_service
+
+def get_execution_engine(request: Request) -> ExecutionEngine:
+    return request.app.state.execution_engine
+
+def get_task_scheduler(request: Request) -> TaskScheduler:
+    return request.app.state.task_scheduler
+
+def get_browser_pool(request: Request) -> BrowserPool:
+    return request.app.state.browser_pool
+
+def get_handle_registry(request: Request) -> BrowserHandleRegistry:
+    return request.app.state.handle_registry
+
+def get_communication_service(request: Request) -> CommunicationService:
+    return request.app.state.communication_service
+
+
+def set_next_cursor(response: Response, page: list, limit: int) -> None:
+    """Expose the keyset cursor for the next page, if there may be one"""
+    if page and len(page) >= limit:
+        last = page[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+
+def batch_response(
+    request: Request,
+    results: Sequence[Union[TaskBatchItem, WorkflowBatchItem]]
+) -> Union[Dict[str, Any], StreamingResponse]:
+    """Per-item outcomes of a bulk request
+    
+    Clients that accept application/x-ndjson get one JSON line per item,
+    streamed as it is serialized; everyone else gets a single JSON object.
+    """
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return StreamingResponse(ndjson_lines(results), media_type=NDJSON_MEDIA_TYPE)
+    failed = sum(1 for item in results if item.status in BATCH_FAILED_STATUSES)
+    return {"results": results, "succeeded": len(results) - failed, "failed": failed}
+
+def ndjson_lines(items: Sequence[BaseModel]) -> Iterator[str]:
+    for start in range(0, len(items), NDJSON_LINES_PER_CHUNK):
+        chunk = items[start:start + NDJSON_LINES_PER_CHUNK]
+        yield ''.join(item.json(exclude_none=True) + "\n" for item in chunk)
+
+async def sse_events(
+    request: Request,
+    service: TaskService,
+    subscription: TaskSubscription,
+    initial: List[Dict[str, Any]]
+) -> AsyncIterator[str]:
+    """Stream task deltas until the client goes away or falls behind"""
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        for delta in initial:
+            yield encode_sse(delta, json_default)
+        while not subscription.closed:
+            batch = await subscription.next_batch(SSE_KEEPALIVE_SECONDS)
+            if batch:
+                yield ''.join(encode_sse(delta, json_default) for delta in batch)
+            elif await request.is_disconnected():
+                break
+            else:
+                yield ": keep-alive\n\n"
+    finally:
+        service.stream.unsubscribe(subscription)
 
 # ============================================================================
 # Workflow Management Routes
@@ -32,34 +144,117 @@ async def create_workflow(
     """Create a new workflow"""
     try:
         return await service.create_workflow(workflow)
+    except WorkflowValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/workflows:batch")
+async def create_workflows(
+    request: Request,
+    batch: WorkflowBatchCreate,
+    service: WorkflowService = Depends(get_workflow_service)
+):
+    """Create many workflows at once, with an outcome per workflow"""
+    try:
+        return batch_response(request, await service.create_workflows(batch.workflows, atomic=batch.atomic))
+    except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/workflows:delete")
+async def delete_workflows(
+    request: Request,
+    batch: WorkflowBatchDelete,
+    service: WorkflowService = Depends(get_workflow_service)
+):
+    """Delete many workflows at once, with an outcome per workflow"""
+    try:
+        return batch_response(request, await service.delete_workflows(batch.workflow_ids))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/workflows", response_model=List[WorkflowResponse])
 async def list_workflows(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     service: WorkflowService = Depends(get_workflow_service)
 ) -> List[WorkflowResponse]:
-    """List all workflows"""
+    """List all workflows
+    
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
     try:
-        return await service.list_workflows(skip=skip, limit=limit)
+        workflows = await service.list_workflows(skip=skip, limit=limit, cursor=cursor)
+        set_next_cursor(response, workflows, limit)
+        return workflows
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def conditional_response(
+    request: Request,
+    version: Version,
+    if_none_match: Optional[str],
+    load: Callable[[], Optional[CachedResponse]],
+    cache: ResponseCache
+) -> Optional[Response]:
+    """Answer a GET from the response cache: 304 if the client is current
+    
+    The body is sent already compressed to clients that accept gzip, so
+    GZipMiddleware passes it through. None if the record went away.
+    """
+    etag = matching_etag(if_none_match, version)
+    if etag is not None:
+        return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept-Encoding"})
+    
+    cached = load()
+    if cached is None:
+        return None
+    encoding = cache.encode(cached, request.headers.get("accept-encoding", ""))
+    headers = {"ETag": format_etag(cached.version, encoding), "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        return Response(cached.gzip_body, media_type="application/json", headers=headers)
+    return Response(cached.body, media_type="application/json", headers=headers)
+
+
 @router.get("/workflows/{workflow_id}", response_model=WorkflowResponse)
 async def get_workflow(
     workflow_id: str,
+    request: Request,
+    if_none_match: Optional[str] = Header(None),
     service: WorkflowService = Depends(get_workflow_service)
-) -> WorkflowResponse:
-    """Get a specific workflow"""
+) -> Response:
+    """Get a specific workflow
+    
+    Responses carry an ETag; send it back in If-None-Match to get a 304
+    while the workflow is unchanged.
+    """
     try:
-        workflow = await service.get_workflow(workflow_id)
-        if not workflow:
+        version = service.workflow_version(workflow_id)
+        response = None
+        if version is not None:
+            response = conditional_response(
+                request, version, if_none_match,
+                lambda: service.get_workflow_response(workflow_id),
+                service.responses
+            )
+        if response is None:
             raise HTTPException(status_code=404, detail="Workflow not found")
-        return workflow
+        return response
     except HTTPException:
         raise
     except Exception as e:
@@ -80,6 +275,117 @@ async def update_workflow(
         return workflow
     except HTTPException:
         raise
+    except WorkflowValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Workflow version named by an If-Match header; None for '*' or no header"""
+    if if_match is None or if_match.strip() == '*':
+        return None
+    version = parse_etag(if_match)
+    if version is None or not version.isdigit():
+        raise HTTPException(status_code=400, detail=f"Invalid If-Match header: {if_match}")
+    return int(version)
+
+
+@router.patch("/workflows/{workflow_id}", response_model=WorkflowPatchResult)
+async def patch_workflow(
+    workflow_id: str,
+    response: Response,
+    operations: List[Dict[str, Any]] = Body(...),
+    if_match: Optional[str] = Header(None),
+    service: WorkflowService = Depends(get_workflow_service)
+) -> WorkflowPatchResult:
+    """Apply an RFC 6902 JSON Patch to a workflow
+    
+    Send If-Match with the version last read to fail with 412 instead of
+    overwriting a concurrent change.
+    """
+    expected_version = parse_if_match(if_match)
+    try:
+        result = await service.patch_workflow(workflow_id, operations, expected_version)
+        if not result:
+            raise HTTPException(status_code=404, detail="Workflow not found")
+        response.headers["ETag"] = f'"{result.version}"'
+        return result
+    except HTTPException:
+        raise
+    except WorkflowVersionConflict as e:
+        raise HTTPException(status_code=412, detail=str(e))
+    except WorkflowValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/workflows/{workflow_id}/versions", response_model=List[WorkflowVersionInfo])
+async def list_workflow_versions(
+    workflow_id: str,
+    service: WorkflowService = Depends(get_workflow_service)
+) -> List[WorkflowVersionInfo]:
+    """List the recorded versions of a workflow, newest first"""
+    try:
+        versions = await service.list_versions(workflow_id)
+        if versions is None:
+            raise HTTPException(status_code=404, detail="Workflow not found")
+        return versions
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/workflows/{workflow_id}/versions/{version}", response_model=WorkflowVersion)
+async def get_workflow_version(
+    workflow_id: str,
+    version: int,
+    service: WorkflowService = Depends(get_workflow_service)
+) -> WorkflowVersion:
+    """Get a workflow as of one of its versions"""
+    try:
+        workflow = await service.get_version(workflow_id, version)
+        if not workflow:
+            raise HTTPException(status_code=404, detail="Workflow version not found")
+        return workflow
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/workflows/{workflow_id}/versions/{version}/rollback", response_model=WorkflowPatchResult)
+async def rollback_workflow(
+    workflow_id: str,
+    version: int,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    service: WorkflowService = Depends(get_workflow_service)
+) -> WorkflowPatchResult:
+    """Make a recorded version current again, saved as a new version"""
+    expected_version = parse_if_match(if_match)
+    try:
+        result = await service.rollback_workflow(workflow_id, version, expected_version)
+        if not result:
+            raise HTTPException(status_code=404, detail="Workflow not found")
+        response.headers["ETag"] = f'"{result.version}"'
+        return result
+    except HTTPException:
+        raise
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except WorkflowVersionConflict as e:
+        raise HTTPException(status_code=412, detail=str(e))
+    except WorkflowValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -113,26 +419,98 @@ async def create_task(
     """Create a new task"""
     try:
         return await service.create_task(task)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/tasks:batch")
+async def create_tasks(
+    request: Request,
+    batch: TaskBatchCreate,
+    service: TaskService = Depends(get_task_service)
+):
+    """Create many tasks at once, with an outcome per task"""
+    try:
+        return batch_response(request, await service.create_tasks(batch.tasks, atomic=batch.atomic))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/tasks:execute")
+async def execute_tasks(
+    request: Request,
+    batch: TaskBatchExecute,
+    service: TaskService = Depends(get_task_service)
+):
+    """Execute many tasks, picked by id or by workflow and/or state"""
+    try:
+        results = await service.execute_tasks(
+            task_ids=batch.task_ids,
+            workflow_id=batch.workflow_id,
+            state=batch.state,
+            priority=batch.priority
+        )
+        return batch_response(request, results)
+    except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/tasks:delete")
+async def delete_tasks(
+    request: Request,
+    batch: TaskSelection,
+    service: TaskService = Depends(get_task_service)
+):
+    """Delete many tasks, picked by id or by workflow and/or state"""
+    try:
+        results = await service.delete_tasks(
+            task_ids=batch.task_ids,
+            workflow_id=batch.workflow_id,
+            state=batch.state
+        )
+        return batch_response(request, results)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/tasks", response_model=List[TaskResponse])
 async def list_tasks(
+    response: Response,
     workflow_id: Optional[str] = None,
     state: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    include_logs: bool = False,
     service: TaskService = Depends(get_task_service)
 ) -> List[TaskResponse]:
-    """List tasks with optional filtering"""
+    """List tasks with optional filtering
+    
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    Execution logs are left out unless include_logs is set; use
+    /tasks/{task_id}/logs to page through them.
+    """
     try:
-        return await service.list_tasks(
+        tasks = await service.list_tasks(
             workflow_id=workflow_id,
             state=state,
             skip=skip,
-            limit=limit
+            limit=limit,
+            cursor=cursor,
+            include_logs=include_logs
         )
+        set_next_cursor(response, tasks, limit)
+        return tasks
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -140,33 +518,117 @@ async def list_tasks(
 @router.get("/tasks/{task_id}", response_model=TaskResponse)
 async def get_task(
     task_id: str,
+    request: Request,
+    if_none_match: Optional[str] = Header(None),
     service: TaskService = Depends(get_task_service)
-) -> TaskResponse:
-    """Get a specific task"""
+) -> Response:
+    """Get a specific task with its latest execution log entries
+    
+    Conditional like GET /workflows/{workflow_id}.
+    """
+    try:
+        version = service.task_version(task_id)
+        response = None
+        if version is not None:
+            response = conditional_response(
+                request, version, if_none_match,
+                lambda: service.get_task_response(task_id),
+                service.responses
+            )
+        if response is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/tasks/{task_id}/logs", response_model=TaskLogPage)
+async def get_task_logs(
+    task_id: str,
+    start: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    service: TaskService = Depends(get_task_service)
+) -> TaskLogPage:
+    """Page through a task's execution log, oldest entry first
+    
+    Without start the last page is returned.
+    """
     try:
-        task = await service.get_task(task_id)
-        if not task:
+        page = await service.get_task_log(task_id, start=start, limit=limit)
+        if page is None:
             raise HTTPException(status_code=404, detail="Task not found")
-        return task
+        entries, total = page
+        first = entries[0]['index'] if entries else (start if start is not None else total)
+        next_start = first + len(entries)
+        return TaskLogPage(
+            task_id=task_id,
+            total=total,
+            start=first,
+            entries=entries,
+            next_start=next_start if next_start < total else None
+        )
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/tasks/{task_id}/events")
+async def stream_task_events(
+    task_id: str,
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    service: TaskService = Depends(get_task_service)
+) -> StreamingResponse:
+    """Stream a task's state changes, log lines and progress as Server-Sent Events
+    
+    The stream opens with a snapshot of the task unless it resumes from
+    Last-Event-ID, in which case the missed deltas are sent instead.
+    """
+    if task_id not in service.store:
+        raise HTTPException(status_code=404, detail="Task not found")
+    subscription, initial = service.subscribe(task_id=task_id, last_event_id=last_event_id)
+    return StreamingResponse(
+        sse_events(request, service, subscription, initial),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+@router.get("/workflows/{workflow_id}/tasks/events")
+async def stream_workflow_task_events(
+    workflow_id: str,
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    service: TaskService = Depends(get_task_service)
+) -> StreamingResponse:
+    """Stream the deltas of every task of a workflow as Server-Sent Events"""
+    subscription, initial = service.subscribe(workflow_id=workflow_id, last_event_id=last_event_id)
+    return StreamingResponse(
+        sse_events(request, service, subscription, initial),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
 @router.post("/tasks/{task_id}/execute")
 async def execute_task(
     task_id: str,
+    priority: int = 0,
     service: TaskService = Depends(get_task_service)
 ) -> dict:
-    """Execute a task"""
+    """Execute a task; higher priority tasks are picked up first"""
     try:
-        success = await service.execute_task(task_id)
+        success = await service.execute_task(task_id, priority=priority)
         if not success:
             raise HTTPException(status_code=404, detail="Task not found")
         return {"message": "Task execution started"}
     except HTTPException:
         raise
+    except TaskAlreadyActive as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -205,6 +667,92 @@ async def delete_task(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/execution/stats")
+async def get_execution_stats(
+    engine: ExecutionEngine = Depends(get_execution_engine)
+) -> dict:
+    """Get execution engine queue depth and worker utilization"""
+    return engine.get_stats()
+
+
+@router.get("/execution/task-events")
+async def get_task_stats(
+    service: TaskService = Depends(get_task_service)
+) -> dict:
+    """Get task counts and event log sequence/snapshot watermark"""
+    return service.get_stats()
+
+
+@router.get("/execution/plan-cache")
+async def get_plan_cache_stats(
+    service: WorkflowService = Depends(get_workflow_service)
+) -> dict:
+    """Get compiled plan cache hit/miss/eviction counters"""
+    return service.planner.get_stats()
+
+
+@router.get("/cache/responses")
+async def get_response_cache_stats(
+    workflow_service: WorkflowService = Depends(get_workflow_service),
+    task_service: TaskService = Depends(get_task_service)
+) -> dict:
+    """Get cached GET response counters for workflows and tasks"""
+    return {
+        'workflows': workflow_service.responses.get_stats(),
+        'tasks': task_service.responses.get_stats()
+    }
+
+
+@router.get("/storage/workflow-history")
+async def get_workflow_history_stats(
+    service: WorkflowService = Depends(get_workflow_service)
+) -> dict:
+    """Get version history checkpoint/diff counters"""
+    return service.history.get_stats()
+
+
+@router.get("/storage/workflows")
+async def get_workflow_storage_stats(
+    service: WorkflowService = Depends(get_workflow_service)
+) -> dict:
+    """Get workflow chunk store dedup, compression and cache counters"""
+    if not service.blobs:
+        return {'durable': False}
+    return service.blobs.get_stats()
+
+
+@router.get("/scheduler/stats")
+async def get_scheduler_stats(
+    scheduler: TaskScheduler = Depends(get_task_scheduler)
+) -> dict:
+    """Get scheduled trigger counts and the time until the next fire"""
+    return scheduler.get_stats()
+
+
+@router.get("/browsers/stats")
+async def get_browser_pool_stats(
+    pool: BrowserPool = Depends(get_browser_pool)
+) -> dict:
+    """Get browser pool occupancy and warm/affinity hit counters"""
+    return pool.get_stats()
+
+
+@router.get("/browsers/handles/stats")
+async def get_browser_handle_stats(
+    registry: BrowserHandleRegistry = Depends(get_handle_registry)
+) -> dict:
+    """Get live browser handle count and lazy cookie/storage load counters"""
+    return registry.get_stats()
+
+
+@router.get("/communication/stats")
+async def get_communication_stats(
+    service: CommunicationService = Depends(get_communication_service)
+) -> dict:
+    """Get WebSocket connection counts and per-connection backpressure"""
+    return service.get_stats()
+
+
 # ============================================================================
 # System Status Routes
 # ============================================================================
@@ -5,6 +5,7 @@ Backend Service Entry Point
 
 import asyncio
 import logging
+import os
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
@@ -12,9 +13,25 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 
 from .api.routes import router as api_router
+from .services.browser_handles import BrowserHandleRegistry
+from .services.browser_pool import BrowserPool, CamoufoxDriver
+from .services.browser_runner import BrowserNodeRunner
 from .services.communication_service import CommunicationService
+from .services.execution_engine import ExecutionEngine
+from .services.repository import SQLiteRepository
+from .services.response_cache import ResponseCache
+from .services.scheduler import TaskScheduler
 from .services.state_manager import StateManager
+from .services.task_events import TaskEventLog
+from .services.task_logs import TaskLogStore
+from .services.task_stream import TaskEventBroker
+from .services.task_service import TaskService
+from .services.workflow_blobs import WorkflowBlobStore
+from .services.workflow_history import WorkflowHistory
+from .services.workflow_planner import WorkflowPlanner
+from .services.workflow_service import WorkflowService
 from .utils.config import get_settings
+from .utils.process_lock import ProcessLock, StateLockError
 
 # Configure logging
 logging.basicConfig(
@@ -26,22 +43,106 @@ logger = logging.getLogger(__name__)
 # Global services
 communication_service: CommunicationService = None
 state_manager: StateManager = None
+repository: SQLiteRepository = None
+workflow_service: WorkflowService = None
+task_service: TaskService = None
+execution_engine: ExecutionEngine = None
+task_scheduler: TaskScheduler = None
+browser_pool: BrowserPool = None
+handle_registry: BrowserHandleRegistry = None
+state_lock: ProcessLock = None
+
+# Held by the one process that owns the state under storage_path
+STATE_LOCK_FILE = "backend.lock"
+
+
+def response_cache(settings) -> ResponseCache:
+    return ResponseCache(
+        max_entries=settings.response_cache_max_entries,
+        max_bytes=settings.response_cache_max_bytes,
+        minimum_size=settings.gzip_minimum_size
+    )
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
-    global communication_service, state_manager
+    global communication_service, state_manager, repository, workflow_service, task_service
+    global execution_engine, task_scheduler, browser_pool, handle_registry, state_lock
     
     logger.info("Starting Web Automation Orchestrator Backend...")
     
-    # Initialize services
+    # Workflows, tasks, the scheduler, the execution engine and the task
+    # event log live in process memory, so only one process may own them;
+    # further workers (e.g. uvicorn --workers N) refuse to start
     settings = get_settings()
+    state_lock = ProcessLock(os.path.join(settings.storage_path, STATE_LOCK_FILE))
+    try:
+        state_lock.acquire()
+    except StateLockError as e:
+        raise RuntimeError(
+            f"Backend state under {settings.storage_path} is already in use ({e}); "
+            "run a single worker per storage directory"
+        ) from None
+    
+    # Initialize services
     state_manager = StateManager()
+    repository = SQLiteRepository(settings.database)
+    planner = WorkflowPlanner(
+        max_entries=settings.plan_cache_max_entries,
+        max_bytes=settings.plan_cache_max_bytes
+    )
+    handle_registry = BrowserHandleRegistry(state_manager)
+    browser_pool = BrowserPool(
+        settings,
+        CamoufoxDriver(settings.camoufox_binary_path, settings.camoufox_profile_path)
+    )
+    workflow_service = WorkflowService(
+        repository=repository,
+        planner=planner,
+        handles=handle_registry,
+        # Browser nodes of task executions lease instances from the pool
+        node_runner=BrowserNodeRunner(browser_pool, handle_registry),
+        blobs=WorkflowBlobStore(settings.workflow_storage_path, settings.workflow_chunk_cache_entries),
+        history=WorkflowHistory(
+            os.path.join(settings.workflow_storage_path, 'history'),
+            settings.workflow_checkpoint_interval
+        ),
+        responses=response_cache(settings)
+    )
+    task_service = TaskService(
+        repository=repository,
+        events=TaskEventLog(settings.task_event_path, fsync=settings.task_event_fsync),
+        logs=TaskLogStore(os.path.join(settings.log_storage_path, 'tasks'), settings.task_log_ring_size),
+        stream=TaskEventBroker(settings.task_stream_history_size, settings.task_stream_max_pending),
+        snapshot_interval=settings.task_snapshot_interval,
+        responses=response_cache(settings)
+    )
+    execution_engine = ExecutionEngine(settings, listener=task_service)
+    task_service.engine = execution_engine
+    task_service.runner = workflow_service.run_task_workflow
+    task_scheduler = TaskScheduler(settings, listener=task_service)
+    task_service.scheduler = task_scheduler
     communication_service = CommunicationService(settings.websocket)
     
+    # Share one service instance per process with the request handlers
+    app.state.workflow_service = workflow_service
+    app.state.task_service = task_service
+    app.state.execution_engine = execution_engine
+    app.state.task_scheduler = task_scheduler
+    app.state.browser_pool = browser_pool
+    app.state.handle_registry = handle_registry
+    app.state.communication_service = communication_service
+    
     # Start services
     await state_manager.initialize()
+    await repository.initialize()
+    await browser_pool.start()
+    await workflow_service.initialize()
+    await task_service.initialize()
+    await execution_engine.start()
+    await task_scheduler.start()
+    task_scheduler.restore(task_service.store.records.values())
     await communication_service.start()
     
     logger.info("Backend services started successfully")
@@ -51,7 +152,15 @@ async def lifespan(app: FastAPI):
     # Cleanup
     logger.info("Shutting down backend services...")
     await communication_service.stop()
+    await task_scheduler.stop()
+    await execution_engine.stop()
+    await task_service.cleanup()
+    await workflow_service.cleanup()
+    await handle_registry.clear()
+    await browser_pool.stop()
+    await repository.cleanup()
     await state_manager.cleanup()
+    state_lock.release()
     logger.info("Backend services shut down successfully")
 
 
@@ -73,8 +182,9 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag"],
     )
-    app.add_middleware(GZipMiddleware, minimum_size=1000)
+    app.add_middleware(GZipMiddleware, minimum_size=settings.gzip_minimum_size)
     
     # Include routers
     app.include_router(api_router, prefix="/api/v1")
@@ -103,7 +213,11 @@ async def health_check():
         "status": "healthy",
         "services": {
             "communication": communication_service.is_running() if communication_service else False,
-            "state_manager": state_manager.is_ready() if state_manager else False
+            "state_manager": state_manager.is_ready() if state_manager else False,
+            "repository": repository.is_ready() if repository else False,
+            "execution_engine": execution_engine.is_running() if execution_engine else False,
+            "scheduler": task_scheduler.is_running() if task_scheduler else False,
+            "browser_pool": browser_pool.is_running() if browser_pool else False
         }
     }
 
@@ -117,5 +231,7 @@ if __name__ == "__main__":
         host=settings.host,
         port=settings.port,
         reload=settings.debug,
-        log_level="info"
+        log_level="info",
+        # Open SSE streams would otherwise hold up shutdown indefinitely
+        timeout_graceful_shutdown=10
     )
\ No newline at end of file
@@ -8,6 +8,9 @@ from enum import Enum
 from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
+# Largest number of items one bulk request may carry
+BATCH_MAX_ITEMS = 10000
+
 
 class TaskState(str, Enum):
     """Task execution states"""
@@ -57,13 +60,52 @@ class TaskResponse(TaskBase):
     updated_at: datetime = Field(..., description="Last update timestamp")
     execution_log: Optional[List[Dict[str, Any]]] = Field(
         default_factory=list, 
-        description="Execution log entries"
+        description="Latest execution log entries; null when left out of a listing"
     )
+    log_count: int = Field(default=0, description="Total number of execution log entries")
+    next_run_at: Optional[datetime] = Field(None, description="Next scheduled fire time")
+    execution_count: int = Field(default=0, description="Number of triggered executions")
     
     class Config:
         from_attributes = True
 
 
+class TaskLogPage(BaseModel):
+    """A page of a task's execution log"""
+    task_id: str = Field(..., description="Task ID")
+    total: int = Field(..., description="Total number of execution log entries")
+    start: int = Field(..., description="Index of the first entry in this page")
+    entries: List[Dict[str, Any]] = Field(default_factory=list, description="Log entries, oldest first")
+    next_start: Optional[int] = Field(None, description="Start of the next page, if there is one")
+
+
+class TaskBatchCreate(BaseModel):
+    """Tasks to create in one request"""
+    tasks: List[TaskCreate] = Field(..., max_items=BATCH_MAX_ITEMS, description="Tasks to create")
+    atomic: bool = Field(default=False, description="Create none of the tasks if any is invalid")
+
+
+class TaskSelection(BaseModel):
+    """Tasks picked by id, or by workflow and/or state"""
+    task_ids: Optional[List[str]] = Field(None, max_items=BATCH_MAX_ITEMS, description="Task IDs")
+    workflow_id: Optional[str] = Field(None, description="Select the tasks of this workflow")
+    state: Optional[TaskState] = Field(None, description="Select the tasks in this state")
+
+
+class TaskBatchExecute(TaskSelection):
+    """Tasks to execute in one request"""
+    priority: int = Field(default=0, description="Queue priority; higher runs first")
+
+
+class TaskBatchItem(BaseModel):
+    """Outcome for one item of a bulk request"""
+    index: int = Field(..., description="Position of the item in the request or selection")
+    id: Optional[str] = Field(None, description="Task ID")
+    status: str = Field(..., description="created, queued, started, already_active, deleted, not_found or invalid")
+    error: Optional[str] = Field(None, description="Why the item was not applied")
+    task: Optional[TaskResponse] = Field(None, description="The task, for created items")
+
+
 class TaskExecution(BaseModel):
     """Task execution details"""
     task_id: str = Field(..., description="Task ID")
@@ -32,6 +32,7 @@ class WorkflowResponse(WorkflowBase):
     """Workflow response model"""
     id: str = Field(..., description="Workflow ID")
     workflow_data: Dict[str, Any] = Field(..., description="Canvas workflow JSON data")
+    version: int = Field(default=1, description="Incremented on every change")
     created_at: datetime = Field(..., description="Creation timestamp")
     updated_at: datetime = Field(..., description="Last update timestamp")
     
@@ -39,6 +40,54 @@ class WorkflowResponse(WorkflowBase):
         from_attributes = True
 
 
+class WorkflowPatchResult(BaseModel):
+    """Outcome of a JSON Patch applied to a workflow"""
+    id: str = Field(..., description="Workflow ID")
+    version: int = Field(..., description="Version after the patch")
+    updated_at: datetime = Field(..., description="Last update timestamp")
+    plan: str = Field(..., description="What happened to the compiled plan: unchanged, patched or recompiled")
+    recompiled_nodes: List[str] = Field(default_factory=list, description="Nodes recompiled in place")
+
+
+class WorkflowVersionInfo(BaseModel):
+    """One recorded version of a workflow"""
+    version: int = Field(..., description="Workflow version")
+    timestamp: datetime = Field(..., description="When the version was saved")
+    reason: str = Field(..., description="What produced it: create, update, patch, rollback or baseline")
+    checkpoint: bool = Field(..., description="Stored in full rather than as a diff")
+    changes: int = Field(..., description="Patch operations in the diff against the version before")
+    size_bytes: int = Field(..., description="Size of the stored entry")
+
+
+class WorkflowVersion(BaseModel):
+    """A workflow as of one version"""
+    id: str = Field(..., description="Workflow ID")
+    version: int = Field(..., description="Workflow version")
+    name: str = Field(..., description="Workflow name")
+    description: Optional[str] = Field(None, description="Workflow description")
+    tags: List[str] = Field(default_factory=list, description="Workflow tags")
+    workflow_data: Dict[str, Any] = Field(..., description="Canvas workflow JSON data")
+
+
+class WorkflowBatchCreate(BaseModel):
+    """Workflows to create in one request"""
+    workflows: List[WorkflowCreate] = Field(..., max_items=1000, description="Workflows to create")
+    atomic: bool = Field(default=False, description="Create none of the workflows if any is invalid")
+
+
+class WorkflowBatchDelete(BaseModel):
+    """Workflows to delete in one request"""
+    workflow_ids: List[str] = Field(..., max_items=1000, description="Workflow IDs to delete")
+
+
+class WorkflowBatchItem(BaseModel):
+    """Outcome for one item of a bulk workflow request"""
+    index: int = Field(..., description="Position of the item in the request")
+    id: Optional[str] = Field(None, description="Workflow ID")
+    status: str = Field(..., description="created, deleted, not_found or invalid")
+    error: Optional[str] = Field(None, description="Why the item was not applied")
+
+
 class WorkflowExecution(BaseModel):
     """Workflow execution data"""
     workflow_id: str = Field(..., description="Workflow ID")
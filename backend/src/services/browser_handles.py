@@ -0,0 +1,177 @@
+"""
+Browser Handle Registry
+浏览器句柄注册表 - 节点间按ID传递句柄，引用计数与延迟读取
+"""
+
+import inspect
+import logging
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .state_manager import StateManager
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[], Awaitable[Dict[str, Any]]]
+ReleaseCallback = Callable[['BrowserHandle'], Any]
+
+
+class BrowserHandleRef(str):
+    """Handle id carried on workflow edges instead of the handle itself
+
+    It is a plain string on the wire, but the executor can tell it apart
+    from ordinary string outputs to keep the reference counts.
+    """
+
+    __slots__ = ()
+
+
+@dataclass
+class BrowserHandle:
+    """Live browser session state shared by the nodes of one workflow run"""
+    id: str
+    instance_id: str
+    session_id: str
+    current_url: str = ""
+    window_handles: List[str] = field(default_factory=list)
+    current_window: str = ""
+    page_state: Dict[str, Any] = field(default_factory=lambda: {
+        'loading': False,
+        'ready_state': 'complete',
+        'scroll_position': {'x': 0, 'y': 0}
+    })
+    refcount: int = 0
+    cookie_loader: Optional[Loader] = None
+    storage_loader: Optional[Loader] = None
+    on_release: Optional[ReleaseCallback] = None
+    # Filled on first read, then shared by every consumer
+    cookies: Optional[Dict[str, Any]] = None
+    local_storage: Optional[Dict[str, Any]] = None
+
+
+class BrowserHandleRegistry:
+    """Owns browser handles in ``StateManager.state['browser_handles']``
+
+    Handles start with no references. The executor retains a handle once per
+    downstream edge that carries its ref and releases it when that consumer
+    finishes, so the handle is freed (and ``on_release`` runs) after its last
+    consumer. Cookies and local storage are only fetched when a node asks.
+    """
+
+    def __init__(self, state_manager: StateManager):
+        self.state_manager = state_manager
+        self.stats = {'created': 0, 'released': 0, 'cookie_loads': 0, 'storage_loads': 0}
+
+    @property
+    def handles(self) -> Dict[str, BrowserHandle]:
+        return self.state_manager.state.setdefault('browser_handles', {})
+
+    def create(
+        self,
+        instance_id: str,
+        session_id: Optional[str] = None,
+        current_url: str = "",
+        cookie_loader: Optional[Loader] = None,
+        storage_loader: Optional[Loader] = None,
+        on_release: Optional[ReleaseCallback] = None
+    ) -> BrowserHandleRef:
+        """Register a handle and return the ref nodes pass downstream"""
+        handle = BrowserHandle(
+            id=f"handle_{uuid.uuid4().hex[:12]}",
+            instance_id=instance_id,
+            session_id=session_id or uuid.uuid4().hex,
+            current_url=current_url,
+            cookie_loader=cookie_loader,
+            storage_loader=storage_loader,
+            on_release=on_release
+        )
+        self.handles[handle.id] = handle
+        self.stats['created'] += 1
+        return BrowserHandleRef(handle.id)
+
+    def get(self, ref: str) -> BrowserHandle:
+        handle = self.handles.get(ref)
+        if handle is None:
+            raise KeyError(f"Browser handle not found: {ref}")
+        return handle
+
+    def retain(self, ref: str, count: int = 1) -> None:
+        self.get(ref).refcount += count
+
+    async def release(self, ref: str) -> bool:
+        """Drop one reference; returns True if the handle was freed"""
+        handle = self.handles.get(ref)
+        if handle is None:
+            return False
+        handle.refcount = max(handle.refcount - 1, 0)
+        if handle.refcount:
+            return False
+        await self._free(handle)
+        return True
+
+    async def release_if_unused(self, ref: str) -> bool:
+        """Free a handle nobody retained, e.g. one produced by a sink node"""
+        handle = self.handles.get(ref)
+        if handle is None or handle.refcount:
+            return False
+        await self._free(handle)
+        return True
+
+    def update(self, ref: str, **changes: Any) -> BrowserHandle:
+        """Update session fields in place; cached cookies/storage can be replaced too"""
+        handle = self.get(ref)
+        for key, value in changes.items():
+            if not hasattr(handle, key) or key in ('id', 'refcount'):
+                raise ValueError(f"Unknown browser handle field: {key}")
+            setattr(handle, key, value)
+        return handle
+
+    async def get_cookies(self, ref: str) -> Dict[str, Any]:
+        handle = self.get(ref)
+        if handle.cookies is None:
+            handle.cookies = await handle.cookie_loader() if handle.cookie_loader else {}
+            self.stats['cookie_loads'] += 1
+        return handle.cookies
+
+    async def get_local_storage(self, ref: str) -> Dict[str, Any]:
+        handle = self.get(ref)
+        if handle.local_storage is None:
+            handle.local_storage = await handle.storage_loader() if handle.storage_loader else {}
+            self.stats['storage_loads'] += 1
+        return handle.local_storage
+
+    async def snapshot(self, ref: str) -> Dict[str, Any]:
+        """Materialize the full handle, e.g. for a browser_handle_update message"""
+        handle = self.get(ref)
+        return {
+            'instance_id': handle.instance_id,
+            'session_id': handle.session_id,
+            'current_url': handle.current_url,
+            'cookies': await self.get_cookies(ref),
+            'local_storage': await self.get_local_storage(ref),
+            'window_handles': list(handle.window_handles),
+            'current_window': handle.current_window,
+            'page_state': handle.page_state
+        }
+
+    async def clear(self) -> None:
+        """Free every handle, e.g. on shutdown"""
+        for handle in list(self.handles.values()):
+            await self._free(handle)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'live_handles': len(self.handles), **self.stats}
+
+    async def _free(self, handle: BrowserHandle) -> None:
+        if self.handles.pop(handle.id, None) is None:
+            return
+        self.stats['released'] += 1
+        if handle.on_release is None:
+            return
+        try:
+            outcome = handle.on_release(handle)
+            if inspect.isawaitable(outcome):
+                await outcome
+        except Exception as e:
+            logger.warning(f"Error releasing browser handle {handle.id}: {e}")
@@ -0,0 +1,527 @@
+"""
+Browser Pool
+浏览器实例池 - 预热、租借与按域名亲和复用
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set
+from urllib.parse import urlparse
+
+from ..utils.config import Settings
+from .browser_handles import BrowserHandleRef, BrowserHandleRegistry
+from .workflow_planner import CompiledOperation, Locator
+
+logger = logging.getLogger(__name__)
+
+# Locator types of operation units -> Selenium locator strategies
+LOCATOR_STRATEGIES = {'css': 'css selector', 'xpath': 'xpath', 'id': 'id', 'class': 'class name'}
+
+
+def normalize_domain(target: Optional[str]) -> Optional[str]:
+    """Reduce a URL or host name to the domain used for cookie affinity"""
+    if not target:
+        return None
+    host = urlparse(target).hostname if '://' in target else target.split('/')[0].split(':')[0]
+    if not host:
+        return None
+    host = host.lower().lstrip('.')
+    return host[4:] if host.startswith('www.') else host
+
+
+class BrowserDriver(ABC):
+    """Launches and inspects browser instances; subclass for a real browser"""
+
+    def is_available(self) -> bool:
+        return True
+
+    @abstractmethod
+    async def launch(self, instance_id: str) -> Any:
+        ...
+
+    @abstractmethod
+    async def close(self, handle: Any) -> None:
+        ...
+
+    @abstractmethod
+    async def navigate(self, handle: Any, url: str) -> None:
+        """Load a URL in the instance"""
+
+    @abstractmethod
+    async def run_operation(self, handle: Any, operation: CompiledOperation) -> Any:
+        """Check an operation unit's observation, then perform its action
+
+        Returns what the action produced (the text or attribute an extract
+        reads, else None); raises if the observation fails or the action
+        cannot be performed.
+        """
+
+    async def cookie_domains(self, handle: Any) -> Set[str]:
+        """Domains the instance currently holds cookies for"""
+        return set()
+
+    async def memory_usage(self, handle: Any) -> int:
+        """Resident memory of the instance in bytes, or 0 if unknown"""
+        return 0
+
+    async def read_cookies(self, handle: Any) -> Dict[str, Any]:
+        return {}
+
+    async def read_local_storage(self, handle: Any) -> Dict[str, Any]:
+        return {}
+
+
+class CamoufoxDriver(BrowserDriver):
+    """Drives Camoufox (a Firefox build) through Selenium's Firefox driver"""
+
+    def __init__(self, binary_path: str, profile_root: str, headless: bool = True):
+        self.binary_path = binary_path
+        self.profile_root = profile_root
+        self.headless = headless
+
+    def is_available(self) -> bool:
+        if not self.binary_path or not os.path.exists(self.binary_path):
+            return False
+        try:
+            import selenium  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    async def launch(self, instance_id: str) -> Any:
+        return await asyncio.to_thread(self._launch, instance_id)
+
+    def _launch(self, instance_id: str) -> Any:
+        from selenium import webdriver
+
+        profile_path = os.path.join(self.profile_root, instance_id)
+        os.makedirs(profile_path, exist_ok=True)
+
+        options = webdriver.FirefoxOptions()
+        options.binary_location = self.binary_path
+        if self.headless:
+            options.add_argument('-headless')
+        options.add_argument('-profile')
+        options.add_argument(profile_path)
+        return webdriver.Firefox(options=options)
+
+    async def close(self, handle: Any) -> None:
+        await asyncio.to_thread(handle.quit)
+
+    async def navigate(self, handle: Any, url: str) -> None:
+        await asyncio.to_thread(handle.get, url)
+
+    async def run_operation(self, handle: Any, operation: CompiledOperation) -> Any:
+        return await asyncio.to_thread(self._run_operation, handle, operation)
+
+    def _run_operation(self, handle: Any, operation: CompiledOperation) -> Any:
+        observation = operation.observation
+        timeout = (observation.get('timeout_ms') or 5000) / 1000
+        if operation.observation_type == 'page_loaded':
+            self._poll(lambda: handle.execute_script("return document.readyState") == 'complete', timeout, operation)
+        elif operation.observation_type in ('element_exists', 'text_contains', 'attribute_equals'):
+            expected = observation.get('expected_value')
+            attribute = observation.get('attribute')
+            checks = {
+                'element_exists': lambda element: True,
+                'text_contains': lambda element: str(expected or '') in element.text,
+                'attribute_equals': lambda element: element.get_attribute(attribute) == expected
+            }
+            check = checks[operation.observation_type]
+            self._poll(lambda: any(check(e) for e in self._find(handle, operation.observation_target)), timeout, operation)
+        elif operation.observation_type:
+            raise ValueError(f"Unsupported observation type '{operation.observation_type}' in unit {operation.unit_id}")
+
+        action = operation.action_type
+        parameters = operation.action.get('parameters') or {}
+        if action is None:
+            return None
+        if action == 'navigate':
+            handle.get(parameters['url'])
+            return None
+        if action == 'wait':
+            time.sleep((parameters.get('duration_ms') or 1000) / 1000)
+            return None
+        if action == 'scroll' and operation.action_target is None:
+            handle.execute_script("window.scrollBy(arguments[0], arguments[1]);", parameters.get('x', 0), parameters.get('y', 0))
+            return None
+
+        elements = self._find(handle, operation.action_target)
+        if not elements:
+            raise LookupError(f"No element found for unit {operation.unit_id}")
+        element = elements[0]
+        if action == 'click':
+            element.click()
+        elif action == 'input':
+            element.clear()
+            element.send_keys(str(parameters.get('text', '')))
+        elif action == 'hover':
+            from selenium.webdriver import ActionChains
+            ActionChains(handle).move_to_element(element).perform()
+        elif action == 'scroll':
+            handle.execute_script("arguments[0].scrollIntoView({block: 'center'});", element)
+        elif action == 'extract':
+            attribute = parameters.get('attribute')
+            return element.get_attribute(attribute) if attribute else element.text
+        else:
+            raise ValueError(f"Unsupported action type '{action}' in unit {operation.unit_id}")
+        return None
+
+    @staticmethod
+    def _find(handle: Any, locator: Optional[Locator]) -> list:
+        """Elements matching a locator's primary selector, else its first matching fallback"""
+        if locator is None:
+            return []
+        for kind, value in ((locator.type, locator.value), *locator.fallbacks):
+            if kind == 'attributes' and isinstance(value, dict):
+                kind, value = 'css', ''.join(f'[{name}="{text}"]' for name, text in value.items())
+            strategy = LOCATOR_STRATEGIES.get(kind)
+            if strategy and value:
+                elements = handle.find_elements(strategy, value)
+                if elements:
+                    return elements
+        return []
+
+    @staticmethod
+    def _poll(predicate, timeout: float, operation: CompiledOperation) -> None:
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"Observation '{operation.observation_type}' of unit {operation.unit_id} not met within {timeout}s"
+                )
+            time.sleep(0.1)
+
+    async def cookie_domains(self, handle: Any) -> Set[str]:
+        cookies = await asyncio.to_thread(handle.get_cookies)
+        return {normalize_domain(c.get('domain')) for c in cookies if c.get('domain')}
+
+    async def read_cookies(self, handle: Any) -> Dict[str, Any]:
+        cookies = await asyncio.to_thread(handle.get_cookies)
+        return {cookie['name']: cookie for cookie in cookies}
+
+    async def read_local_storage(self, handle: Any) -> Dict[str, Any]:
+        return await asyncio.to_thread(
+            handle.execute_script, "return Object.assign({}, window.localStorage);"
+        ) or {}
+
+    async def memory_usage(self, handle: Any) -> int:
+        pid = (getattr(handle, 'capabilities', None) or {}).get('moz:processID')
+        if not pid:
+            return 0
+        try:
+            with open(f'/proc/{pid}/statm') as statm:
+                return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            return 0
+
+
+@dataclass
+class BrowserInstance:
+    """A pooled browser instance"""
+    id: str
+    handle: Any
+    created_at: float = field(default_factory=time.monotonic)
+    domains: Set[str] = field(default_factory=set)
+    uses: int = 0
+    baseline_memory: int = 0
+    in_use: bool = False
+
+
+class BrowserPool:
+    """Keeps up to max_browser_instances warm browsers and leases them out
+
+    ``acquire(domain)`` prefers an idle instance that already holds cookies
+    for the domain, then any idle instance, and only launches a new browser
+    when none is idle and the pool is below capacity. Instances are recycled
+    after ``browser_max_uses`` leases or once their memory has grown past
+    ``browser_max_memory_growth_mb``; a replacement is warmed in the
+    background.
+    """
+
+    def __init__(self, settings: Settings, driver: BrowserDriver):
+        self.driver = driver
+        self.max_instances = max(settings.max_browser_instances, 1)
+        self.acquire_timeout = settings.browser_timeout
+        self.max_uses = settings.browser_max_uses
+        self.max_memory_growth = settings.browser_max_memory_growth_mb * 1024 * 1024
+
+        self._instances: Dict[str, BrowserInstance] = {}
+        self._idle: Dict[str, BrowserInstance] = {}
+        self._idle_by_domain: Dict[str, Set[str]] = {}
+        self._launching = 0
+        self._available: Optional[asyncio.Condition] = None
+        self._background: Set[asyncio.Task] = set()
+        self.stats = {
+            'affinity_hits': 0,
+            'warm_hits': 0,
+            'cold_launches': 0,
+            'recycled': 0,
+            'launch_failures': 0
+        }
+        self.running = False
+
+    async def start(self) -> None:
+        """Pre-warm the pool up to max_browser_instances"""
+        if self.running:
+            return
+
+        self._available = asyncio.Condition()
+        self.running = True
+
+        if not self.driver.is_available():
+            logger.warning("Browser driver is not available; browser pool will not pre-warm")
+            return
+
+        logger.info(f"Pre-warming {self.max_instances} browser instances...")
+        results = await asyncio.gather(
+            *(self._launch() for _ in range(self.max_instances)), return_exceptions=True
+        )
+        for instance in results:
+            if isinstance(instance, BrowserInstance):
+                self._mark_idle(instance)
+        logger.info(f"Browser pool ready with {len(self._idle)} warm instances")
+
+    async def stop(self) -> None:
+        """Close every browser instance"""
+        if not self.running:
+            return
+
+        logger.info("Stopping browser pool...")
+        self.running = False
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+
+        await asyncio.gather(
+            *(self._close(instance) for instance in list(self._instances.values())),
+            return_exceptions=True
+        )
+        self._instances.clear()
+        self._idle.clear()
+        self._idle_by_domain.clear()
+
+    def is_running(self) -> bool:
+        return self.running
+
+    async def acquire(self, domain: Optional[str] = None, timeout: Optional[float] = None) -> BrowserInstance:
+        """Lease a browser instance, preferring one with cookies for ``domain``"""
+        if not self.running:
+            raise RuntimeError("Browser pool is not running")
+
+        domain = normalize_domain(domain)
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        async with self._available:
+            while True:
+                instance = self._take_idle(domain)
+                if instance is not None:
+                    break
+
+                if len(self._instances) + self._launching < self.max_instances:
+                    self._launching += 1
+                    self._available.release()
+                    try:
+                        instance = await self._launch()
+                    finally:
+                        await self._available.acquire()
+                        self._launching -= 1
+                        if instance is None:
+                            # The launch failed; another waiter may use the slot
+                            self._available.notify()
+                    self.stats['cold_launches'] += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No browser instance available within {timeout}s")
+                try:
+                    await asyncio.wait_for(self._available.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"No browser instance available within {timeout}s")
+
+        instance.in_use = True
+        instance.uses += 1
+        if domain:
+            instance.domains.add(domain)
+        return instance
+
+    async def release(
+        self,
+        instance: BrowserInstance,
+        domains: Iterable[str] = (),
+        discard: bool = False
+    ) -> None:
+        """Return a leased instance; recycle it if it is worn out or broken"""
+        instance.in_use = False
+        instance.domains.update(d for d in (normalize_domain(d) for d in domains) if d)
+        try:
+            instance.domains.update(await self.driver.cookie_domains(instance.handle))
+        except Exception as e:
+            logger.debug(f"Could not read cookie domains of browser {instance.id}: {e}")
+
+        if discard or not self.running or await self._needs_recycle(instance):
+            await self._retire(instance)
+            return
+
+        async with self._available:
+            self._mark_idle(instance)
+            self._available.notify()
+
+    @asynccontextmanager
+    async def lease(self, domain: Optional[str] = None) -> AsyncIterator[BrowserInstance]:
+        """``async with pool.lease(url) as browser:`` - released on exit"""
+        instance = await self.acquire(domain)
+        failed = False
+        try:
+            yield instance
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            await self.release(instance, discard=failed)
+
+    async def navigate(self, instance_id: str, url: str) -> None:
+        """Load a URL in a leased instance"""
+        instance = self._instances.get(instance_id)
+        if instance is None:
+            raise LookupError(f"Browser instance not found: {instance_id}")
+        await self.driver.navigate(instance.handle, url)
+        domain = normalize_domain(url)
+        if domain:
+            instance.domains.add(domain)
+
+    async def run_operation(self, instance_id: str, operation: CompiledOperation) -> Any:
+        """Run an operation unit in a leased instance"""
+        instance = self._instances.get(instance_id)
+        if instance is None:
+            raise LookupError(f"Browser instance not found: {instance_id}")
+        result = await self.driver.run_operation(instance.handle, operation)
+        if operation.action_type == 'navigate':
+            domain = normalize_domain((operation.action.get('parameters') or {}).get('url'))
+            if domain:
+                instance.domains.add(domain)
+        return result
+
+    async def open_handle(self, registry: BrowserHandleRegistry, domain: Optional[str] = None) -> BrowserHandleRef:
+        """Lease an instance behind a browser handle; it returns to the pool when the handle is freed"""
+        instance = await self.acquire(domain)
+        return registry.create(
+            instance.id,
+            current_url=domain if domain and '://' in domain else "",
+            cookie_loader=lambda: self.driver.read_cookies(instance.handle),
+            storage_loader=lambda: self.driver.read_local_storage(instance.handle),
+            on_release=lambda handle: self.release(instance)
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool occupancy and hit counters"""
+        return {
+            'max_instances': self.max_instances,
+            'instances': len(self._instances),
+            'idle': len(self._idle),
+            'in_use': len(self._instances) - len(self._idle),
+            'launching': self._launching,
+            **self.stats
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _take_idle(self, domain: Optional[str]) -> Optional[BrowserInstance]:
+        instance_id = None
+        if domain and self._idle_by_domain.get(domain):
+            instance_id = next(iter(self._idle_by_domain[domain]))
+            self.stats['affinity_hits'] += 1
+        elif self._idle:
+            # Hand out the instance with the fewest cookie jars to spare the others
+            instance_id = min(self._idle.values(), key=lambda i: len(i.domains)).id
+            self.stats['warm_hits'] += 1
+        if instance_id is None:
+            return None
+
+        instance = self._idle.pop(instance_id)
+        for cookie_domain in instance.domains:
+            bucket = self._idle_by_domain.get(cookie_domain)
+            if bucket is not None:
+                bucket.discard(instance_id)
+                if not bucket:
+                    del self._idle_by_domain[cookie_domain]
+        return instance
+
+    def _mark_idle(self, instance: BrowserInstance) -> None:
+        self._idle[instance.id] = instance
+        for cookie_domain in instance.domains:
+            self._idle_by_domain.setdefault(cookie_domain, set()).add(instance.id)
+
+    async def _launch(self) -> BrowserInstance:
+        instance_id = f"browser_{uuid.uuid4().hex[:12]}"
+        try:
+            handle = await asyncio.wait_for(self.driver.launch(instance_id), timeout=self.acquire_timeout)
+        except Exception as e:
+            self.stats['launch_failures'] += 1
+            logger.error(f"Failed to launch browser instance: {e}")
+            raise
+        instance = BrowserInstance(id=instance_id, handle=handle)
+        try:
+            instance.baseline_memory = await self.driver.memory_usage(handle)
+        except Exception:
+            instance.baseline_memory = 0
+        self._instances[instance_id] = instance
+        return instance
+
+    async def _needs_recycle(self, instance: BrowserInstance) -> bool:
+        if self.max_uses and instance.uses >= self.max_uses:
+            return True
+        if self.max_memory_growth and instance.baseline_memory:
+            try:
+                memory = await self.driver.memory_usage(instance.handle)
+            except Exception:
+                return False
+            return memory - instance.baseline_memory > self.max_memory_growth
+        return False
+
+    async def _retire(self, instance: BrowserInstance) -> None:
+        self.stats['recycled'] += 1
+        await self._close(instance)
+        async with self._available:
+            # A waiter may launch into the freed slot
+            self._available.notify()
+        if self.running and self.driver.is_available():
+            task = asyncio.create_task(self._replace())
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    async def _replace(self) -> None:
+        async with self._available:
+            if len(self._instances) + self._launching >= self.max_instances:
+                return
+            self._launching += 1
+        instance = None
+        try:
+            instance = await self._launch()
+        except Exception as e:
+            logger.error(f"Failed to launch a replacement browser instance: {e}")
+        finally:
+            async with self._available:
+                self._launching -= 1
+                if instance is not None:
+                    self._mark_idle(instance)
+                # Wake a waiter for the new instance, or to launch one itself
+                self._available.notify()
+
+    async def _close(self, instance: BrowserInstance) -> None:
+        self._instances.pop(instance.id, None)
+        self._idle.pop(instance.id, None)
+        try:
+            await self.driver.close(instance.handle)
+        except Exception as e:
+            logger.warning(f"Error closing browser instance {instance.id}: {e}")
@@ -0,0 +1,111 @@
+"""
+Browser Node Runner
+浏览器节点执行器 - 工作流节点从浏览器池按域名租借实例，并以句柄在节点间传递
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from .browser_handles import BrowserHandleRef, BrowserHandleRegistry
+from .browser_pool import BrowserPool
+from .workflow_planner import CompiledNode
+
+logger = logging.getLogger(__name__)
+
+# Node types that drive a browser even without operation units
+BROWSER_NODE_TYPES = frozenset({'browser_navigator'})
+
+# Output socket carrying the browser handle ref to downstream nodes
+HANDLE_SOCKET = 'browser_handle'
+
+# Output socket carrying each operation unit's result, by unit id
+RESULTS_SOCKET = 'operation_results'
+
+
+def node_url(node: CompiledNode) -> Optional[str]:
+    """URL a node works on: its url property, else its first navigate action"""
+    url = node.properties.get('url')
+    if url:
+        return url
+    for operation in node.operations:
+        if operation.action_type == 'navigate':
+            parameters = operation.action.get('parameters') or {}
+            if parameters.get('url'):
+                return parameters['url']
+    return None
+
+
+class BrowserNodeRunner:
+    """Executor node runner that runs browser nodes on pooled browsers
+
+    A node that drives a browser (a browser navigator, or any node with
+    operation units) works on the handle it received on an input. A node
+    with no handle opens one: it leases an instance for the domain of its
+    URL, so the pool can hand it a browser that already holds that site's
+    cookies. Navigator nodes load their ``url`` property, then the node's
+    operation units run in order on the instance; their results are
+    returned on the ``operation_results`` output. Units with conditions or
+    loops are not supported here and fail the node.
+
+    The handle ref is returned on the ``browser_handle`` output. The
+    executor retains it once per downstream edge that carries it and frees
+    it after the last consumer, which returns the instance to the pool; a
+    handle nothing consumes is freed as soon as its node finishes.
+
+    Without a usable browser driver, navigator nodes that would open a
+    handle pass their inputs through; nodes with operation units fail.
+    """
+
+    def __init__(self, pool: BrowserPool, handles: BrowserHandleRegistry):
+        self.pool = pool
+        self.handles = handles
+
+    async def __call__(self, node: CompiledNode, inputs: Dict[str, Any]) -> Any:
+        ref = self._received_handle(inputs)
+        if ref is None and not self._needs_browser(node):
+            return dict(inputs)
+        for operation in node.operations:
+            if '.' in operation.path or operation.condition_type or operation.loop:
+                raise NotImplementedError(
+                    f"Node {node.id}: unit {operation.unit_id} uses a condition or loop, "
+                    "which the backend runner does not execute"
+                )
+
+        opened = False
+        url = node_url(node)
+        if ref is None:
+            if not self.pool.is_running() or not self.pool.driver.is_available():
+                if node.operations:
+                    raise RuntimeError(f"Node {node.id} has operation units but no browser is available")
+                logger.debug(f"No browser available; passing through node {node.id}")
+                return dict(inputs)
+            ref = await self.pool.open_handle(self.handles, url)
+            opened = True
+
+        results: Dict[str, Any] = {}
+        try:
+            instance_id = self.handles.get(ref).instance_id
+            if node.type in BROWSER_NODE_TYPES and node.properties.get('url'):
+                await self.pool.navigate(instance_id, url)
+                self.handles.update(ref, current_url=url)
+            for operation in node.operations:
+                results[operation.unit_id] = await self.pool.run_operation(instance_id, operation)
+                if operation.action_type == 'navigate':
+                    self.handles.update(ref, current_url=(operation.action.get('parameters') or {}).get('url', ''))
+        except BaseException:
+            if opened:
+                await self.handles.release_if_unused(ref)
+            raise
+        if node.operations:
+            return {**inputs, HANDLE_SOCKET: ref, RESULTS_SOCKET: results}
+        return {**inputs, HANDLE_SOCKET: ref}
+
+    def _received_handle(self, inputs: Dict[str, Any]) -> Optional[BrowserHandleRef]:
+        for value in inputs.values():
+            if isinstance(value, BrowserHandleRef) and value in self.handles.handles:
+                return value
+        return None
+
+    @staticmethod
+    def _needs_browser(node: CompiledNode) -> bool:
+        return node.type in BROWSER_NODE_TYPES or bool(node.operations)
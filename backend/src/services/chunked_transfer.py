@@ -0,0 +1,182 @@
+"""
+Chunked Transfer
+分块传输 - 大载荷分块接收并写入溢出到磁盘的临时文件
+"""
+
+import hashlib
+import logging
+import shutil
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+import uuid
+
+from ..utils.codecs import Codec
+
+logger = logging.getLogger(__name__)
+
+# Binary chunk frames: MAGIC + 16-byte transfer id + data. The magic is a
+# bare integer in MessagePack, so it never collides with a msgpack message.
+CHUNK_MAGIC = b"WMCK"
+CHUNK_HEADER_SIZE = len(CHUNK_MAGIC) + 16
+
+TRANSFER_START = 'chunked_transfer_start'
+TRANSFER_END = 'chunked_transfer_end'
+TRANSFER_ABORT = 'chunked_transfer_abort'
+TRANSFER_ERROR = 'chunked_transfer_error'
+TRANSFER_CONTROL_TYPES = (TRANSFER_START, TRANSFER_END, TRANSFER_ABORT)
+
+
+class ChunkedTransfer:
+    """A payload received in chunks, spooled to a temporary file
+
+    Small payloads stay in memory; past ``spool_memory`` bytes the spool
+    rolls over to disk, so receiving never holds the whole payload in RAM.
+    Handlers get it as ``data['transfer']`` and may read it, ``load()`` it,
+    or ``copy_to()`` a permanent path; it is closed after the handler runs.
+    """
+
+    def __init__(
+        self,
+        transfer_id: str,
+        message_type: str,
+        metadata: Dict[str, Any],
+        total_size: Optional[int],
+        sha256: Optional[str],
+        spool_memory: int,
+        spool_dir: Optional[str] = None
+    ):
+        self.transfer_id = transfer_id
+        self.message_type = message_type
+        self.metadata = metadata
+        self.total_size = total_size
+        self.sha256 = sha256
+        self.size = 0
+        self.file = tempfile.SpooledTemporaryFile(max_size=spool_memory, dir=spool_dir)
+        self._hasher = hashlib.sha256() if sha256 else None
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.total_size is not None and self.size > self.total_size:
+            raise ValueError(f"Transfer {self.transfer_id} exceeded its declared size")
+        self.file.write(data)
+        if self._hasher is not None:
+            self._hasher.update(data)
+
+    def finish(self) -> None:
+        """Check the received bytes against the declared size and digest"""
+        if self.total_size is not None and self.size != self.total_size:
+            raise ValueError(
+                f"Transfer {self.transfer_id} ended after {self.size} of {self.total_size} bytes"
+            )
+        if self._hasher is not None and self._hasher.hexdigest() != self.sha256.lower():
+            raise ValueError(f"Transfer {self.transfer_id} failed its sha256 check")
+        self.file.seek(0)
+
+    @property
+    def spilled(self) -> bool:
+        return bool(getattr(self.file, '_rolled', False))
+
+    def read(self, size: int = -1) -> bytes:
+        return self.file.read(size)
+
+    def load(self, codec: Codec) -> Any:
+        """Decode the whole payload in memory; only for payloads known to be small"""
+        self.file.seek(0)
+        data = self.file.read()
+        return codec.decode(data if codec.binary else data.decode())
+
+    def copy_to(self, path: str) -> None:
+        self.file.seek(0)
+        with open(path, 'wb') as target:
+            shutil.copyfileobj(self.file, target)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class TransferAssembler:
+    """Tracks in-progress chunked transfers for every connection"""
+
+    def __init__(self, spool_memory: int, max_transfer_size: int, spool_dir: Optional[str] = None):
+        self.spool_memory = spool_memory
+        self.max_transfer_size = max_transfer_size
+        self.spool_dir = spool_dir
+        self.transfers: Dict[Tuple[str, bytes], ChunkedTransfer] = {}
+        self.stats = {'started': 0, 'completed': 0, 'aborted': 0, 'bytes_received': 0}
+
+    def start(self, connection_id: str, payload: Dict[str, Any]) -> ChunkedTransfer:
+        transfer_id = payload.get('transfer_id')
+        message_type = payload.get('message_type')
+        if not transfer_id or not message_type:
+            raise ValueError("chunked_transfer_start needs transfer_id and message_type")
+        key = (connection_id, self._raw_id(transfer_id))
+        if key in self.transfers:
+            raise ValueError(f"Transfer {transfer_id} already started")
+
+        total_size = payload.get('total_size')
+        if total_size is not None and total_size > self.max_transfer_size:
+            raise ValueError(f"Transfer {transfer_id} is larger than {self.max_transfer_size} bytes")
+
+        transfer = ChunkedTransfer(
+            transfer_id,
+            message_type,
+            payload.get('metadata') or {},
+            total_size,
+            payload.get('sha256'),
+            self.spool_memory,
+            self.spool_dir
+        )
+        self.transfers[key] = transfer
+        self.stats['started'] += 1
+        return transfer
+
+    def feed(self, connection_id: str, frame: bytes) -> None:
+        """Append one binary chunk frame to its transfer"""
+        key = (connection_id, frame[len(CHUNK_MAGIC):CHUNK_HEADER_SIZE])
+        transfer = self.transfers.get(key)
+        if transfer is None:
+            raise ValueError(f"Chunk for unknown transfer {key[1].hex()}")
+        data = memoryview(frame)[CHUNK_HEADER_SIZE:]
+        if transfer.size + len(data) > self.max_transfer_size:
+            self.abort(connection_id, transfer.transfer_id)
+            raise ValueError(f"Transfer {transfer.transfer_id} is larger than {self.max_transfer_size} bytes")
+        try:
+            transfer.write(data)
+        except ValueError:
+            self.abort(connection_id, transfer.transfer_id)
+            raise
+        self.stats['bytes_received'] += len(data)
+
+    def end(self, connection_id: str, transfer_id: str) -> ChunkedTransfer:
+        transfer = self.transfers.pop((connection_id, self._raw_id(transfer_id)), None)
+        if transfer is None:
+            raise ValueError(f"Unknown transfer {transfer_id}")
+        try:
+            transfer.finish()
+        except ValueError:
+            transfer.close()
+            self.stats['aborted'] += 1
+            raise
+        self.stats['completed'] += 1
+        return transfer
+
+    def abort(self, connection_id: str, transfer_id: str) -> None:
+        transfer = self.transfers.pop((connection_id, self._raw_id(transfer_id)), None)
+        if transfer is not None:
+            transfer.close()
+            self.stats['aborted'] += 1
+
+    def drop_connection(self, connection_id: str) -> None:
+        for key in [key for key in self.transfers if key[0] == connection_id]:
+            self.transfers.pop(key).close()
+            self.stats['aborted'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'in_progress': len(self.transfers), **self.stats}
+
+    @staticmethod
+    def _raw_id(transfer_id: str) -> bytes:
+        try:
+            return uuid.UUID(transfer_id).bytes
+        except (TypeError, ValueError):
+            raise ValueError(f"transfer_id must be a UUID: {transfer_id!r}")
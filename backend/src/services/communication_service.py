@@ -4,17 +4,51 @@ Communication Service
 """
 
 import asyncio
-import json
 import logging
-from typing import Dict, Set, Optional, Callable, Any
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import urlsplit
+from typing import Dict, Set, Optional, Callable, Any, Hashable, Tuple
 import websockets
+from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
 from websockets.server import WebSocketServerProtocol
 
+from ..utils.codecs import Codec, Frame, available_codecs, default_text_codec, negotiate_codec
 from ..utils.config import WebSocketSettings
+from ..utils.metrics import LatencyHistogram
+from .chunked_transfer import (
+    CHUNK_MAGIC, TRANSFER_ABORT, TRANSFER_CONTROL_TYPES, TRANSFER_END, TRANSFER_ERROR, TRANSFER_START,
+    ChunkedTransfer, TransferAssembler
+)
+from .heartbeat import HeartbeatMonitor
+from .message_dispatcher import ConnectionDispatcher
+from .outbound_queue import OutboundQueue
 
 logger = logging.getLogger(__name__)
 
 
+class RemoteCallError(Exception):
+    """Raised when a node answers a call with success = false"""
+    
+    def __init__(self, node_id: str, error: Any):
+        self.node_id = node_id
+        self.error = error
+        message = error.get('message') if isinstance(error, dict) else error
+        super().__init__(f"Call to node {node_id} failed: {message}")
+
+
+def progress_coalesce_key(message: Dict[str, Any]) -> Optional[Hashable]:
+    """Key under which a lagging client only needs the latest message, if any"""
+    if message.get('type') == 'task_status_update':
+        payload = message.get('payload') or {}
+        if payload.get('status') == 'executing':
+            return ('task_status_update', payload.get('task_id'))
+    return None
+
+
 class CommunicationService:
     """WebSocket communication service for handling plugin-orchestrator communication"""
     
@@ -23,7 +57,24 @@ class CommunicationService:
         self.server = None
         self.connections: Dict[str, WebSocketServerProtocol] = {}
         self.node_connections: Dict[str, str] = {}  # node_id -> connection_id
+        self.connection_nodes: Dict[str, Set[str]] = {}  # connection_id -> node_ids
+        # Wire codecs; connections use the fastest JSON codec unless they negotiate another
+        self.codecs = available_codecs()
+        self.default_codec = default_text_codec(self.codecs)
+        self.connection_codecs: Dict[str, Codec] = {}
+        self.outbound: Dict[str, OutboundQueue] = {}  # connection_id -> send queue
         self.message_handlers: Dict[str, Callable] = {}
+        self.dispatchers: Dict[str, ConnectionDispatcher] = {}  # connection_id -> handler tasks
+        self.handler_latency: Dict[str, LatencyHistogram] = {}  # message_type -> histogram
+        self.pending_calls: Dict[str, asyncio.Future] = {}  # correlation id -> reply future
+        self.connection_calls: Dict[str, Set[str]] = {}  # connection_id -> correlation ids
+        self.heartbeat = HeartbeatMonitor(
+            config.heartbeat_interval,
+            config.heartbeat_max_missed,
+            self._evict_connection
+        )
+        # Large payloads arrive in chunks spooled to temp files
+        self.transfers = TransferAssembler(config.chunk_spool_memory, config.max_transfer_size)
         self.running = False
     
     async def start(self) -> None:
@@ -38,8 +89,9 @@ class CommunicationService:
                 self.handle_connection,
                 self.config.host,
                 self.config.port,
-                path=self.config.path
+                **self._serve_options()
             )
+            self.heartbeat.start()
             self.running = True
             logger.info("WebSocket server started successfully")
             
@@ -53,13 +105,19 @@ class CommunicationService:
             return
             
         logger.info("Stopping WebSocket server...")
+        await self.heartbeat.stop()
         
         # Close all connections
+        for queue in self.outbound.values():
+            await queue.close()
         for connection in self.connections.values():
             await connection.close()
         
         self.connections.clear()
         self.node_connections.clear()
+        self.connection_nodes.clear()
+        self.connection_codecs.clear()
+        self.outbound.clear()
         
         # Stop server
         if self.server:
@@ -74,71 +132,290 @@ class CommunicationService:
         """Check if the service is running"""
         return self.running
     
+    def _serve_options(self) -> Dict[str, Any]:
+        """Frame size, compression and keepalive options for websockets.serve"""
+        options: Dict[str, Any] = {
+            'process_request': self._check_path,
+            'max_size': self.config.max_message_size,
+            # Keepalive is driven by the heartbeat monitor instead
+            'ping_interval': None,
+            'compression': None
+        }
+        if self.config.compression == 'deflate':
+            options['extensions'] = [
+                ServerPerMessageDeflateFactory(
+                    server_max_window_bits=self.config.compression_window_bits,
+                    client_max_window_bits=self.config.compression_window_bits,
+                    compress_settings={
+                        'level': self.config.compression_level,
+                        'memLevel': self.config.compression_memory_level
+                    }
+                )
+            ]
+        elif self.config.compression != 'none':
+            raise ValueError(f"Unknown WebSocket compression: {self.config.compression}")
+        return options
+    
+    async def _check_path(self, path: str, request_headers: Any) -> Optional[Tuple[HTTPStatus, list, bytes]]:
+        """Reject handshakes for anything but the configured path"""
+        if urlsplit(path).path != self.config.path:
+            return HTTPStatus.NOT_FOUND, [], b"Not Found\n"
+        return None
+    
     async def handle_connection(self, websocket: WebSocketServerProtocol, path: str) -> None:
         """Handle new WebSocket connection"""
         connection_id = f"conn_{id(websocket)}"
         self.connections[connection_id] = websocket
+        queue = OutboundQueue(connection_id, websocket, self.config.outbound_queue_size)
+        self.outbound[connection_id] = queue
+        queue.start()
+        # Handlers run concurrently; per-node ordered types stay in order
+        dispatcher = ConnectionDispatcher(
+            connection_id,
+            self._route_message,
+            self.config.max_inflight_handlers,
+            self.config.ordered_message_types
+        )
+        self.dispatchers[connection_id] = dispatcher
+        self.heartbeat.add(connection_id, websocket)
         
         logger.info(f"New WebSocket connection: {connection_id}")
         
         try:
             async for message in websocket:
-                await self.handle_message(connection_id, message)
+                data = self._receive(connection_id, message)
+                if data is not None:
+                    await dispatcher.dispatch(data)
                 
         except websockets.exceptions.ConnectionClosed:
             logger.info(f"WebSocket connection closed: {connection_id}")
         except Exception as e:
             logger.error(f"Error handling WebSocket connection {connection_id}: {e}")
         finally:
+            self.heartbeat.remove(connection_id)
+            
+            # Nobody is going to answer calls made over this connection
+            self._fail_calls(connection_id, ConnectionError(f"Connection {connection_id} closed"))
+            
+            # Let in-flight handlers finish before tearing the connection down
+            await dispatcher.close(cancel=not self.running)
+            if self.dispatchers.get(connection_id) is dispatcher:
+                del self.dispatchers[connection_id]
+            
             # Cleanup connection
             if connection_id in self.connections:
                 del self.connections[connection_id]
+            if self.outbound.get(connection_id) is queue:
+                del self.outbound[connection_id]
+            await queue.close()
             
             # Remove node connections
-            nodes_to_remove = [
-                node_id for node_id, conn_id in self.node_connections.items() 
-                if conn_id == connection_id
-            ]
-            for node_id in nodes_to_remove:
-                del self.node_connections[node_id]
+            self._unbind_connection(connection_id)
+            self.transfers.drop_connection(connection_id)
+            self.connection_codecs.pop(connection_id, None)
+    
+    def _evict_connection(self, connection_id: str) -> None:
+        """Drop a dead peer from the send paths and abort its socket
+        
+        The connection handler's cleanup runs once the read loop notices.
+        """
+        websocket = self.connections.pop(connection_id, None)
+        queue = self.outbound.pop(connection_id, None)
+        if queue is not None:
+            queue.closed = True
+        self._fail_calls(connection_id, ConnectionError(f"Connection {connection_id} is not responding"))
+        self._unbind_connection(connection_id)
+        
+        transport = getattr(websocket, 'transport', None)
+        if transport is not None:
+            transport.abort()
+        elif websocket is not None:
+            asyncio.create_task(websocket.close())
     
     async def handle_message(self, connection_id: str, message: str) -> None:
         """Handle incoming WebSocket message"""
+        data = self._receive(connection_id, message)
+        if data is not None:
+            await self._route_message(connection_id, data)
+    
+    def _receive(self, connection_id: str, message: Frame) -> Optional[Dict[str, Any]]:
+        """Turn one inbound frame into a message to dispatch, or None if it was consumed"""
+        if isinstance(message, bytes) and message.startswith(CHUNK_MAGIC):
+            try:
+                self.transfers.feed(connection_id, message)
+            except ValueError as e:
+                logger.error(f"Bad chunk from {connection_id}: {e}")
+                self._queue_reply(connection_id, {'type': TRANSFER_ERROR, 'payload': {'error': str(e)}})
+            return None
+        
+        data = self._decode_message(connection_id, message)
+        if data is None or self._resolve_call(connection_id, data):
+            return None
+        if data.get('type') in TRANSFER_CONTROL_TYPES:
+            return self._handle_transfer_control(connection_id, data)
+        self._accept_message(connection_id, data)
+        return data
+    
+    def _handle_transfer_control(self, connection_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Start, finish or abort a chunked transfer
+        
+        A finished transfer is dispatched as a message of its declared
+        ``message_type`` with the start message's ``metadata`` as payload and
+        the spooled content under ``transfer``.
+        """
+        payload = data.get('payload') or {}
+        transfer_id = payload.get('transfer_id')
         try:
-            data = json.loads(message)
-            message_type = data.get('type')
-            
-            logger.debug(f"Received message type '{message_type}' from {connection_id}")
-            
-            # Handle node connection requests
-            if message_type == 'node_connection_request':
-                node_id = data.get('payload', {}).get('node_id')
-                if node_id:
-                    self.node_connections[node_id] = connection_id
-                    logger.info(f"Node {node_id} connected via {connection_id}")
+            if data['type'] == TRANSFER_START:
+                self.transfers.start(connection_id, payload)
+                return None
+            if data['type'] == TRANSFER_ABORT:
+                self.transfers.abort(connection_id, transfer_id)
+                return None
+            transfer = self.transfers.end(connection_id, transfer_id)
+        except ValueError as e:
+            logger.error(f"Chunked transfer from {connection_id} failed: {e}")
+            self._queue_reply(connection_id, {
+                'type': TRANSFER_ERROR,
+                'payload': {'transfer_id': transfer_id, 'error': str(e)}
+            })
+            return None
+        
+        logger.info(
+            f"Received chunked {transfer.message_type} from {connection_id}: "
+            f"{transfer.size} bytes{' (spooled to disk)' if transfer.spilled else ''}"
+        )
+        return {
+            'id': data.get('id'),
+            'type': transfer.message_type,
+            'timestamp': data.get('timestamp'),
+            'source': data.get('source'),
+            'payload': transfer.metadata,
+            'transfer': transfer
+        }
+    
+    def _queue_reply(self, connection_id: str, message: Dict[str, Any]) -> None:
+        """Queue a message from the read loop in the connection's current codec"""
+        queue = self.outbound.get(connection_id)
+        if queue is not None:
+            codec = self.connection_codecs.get(connection_id, self.default_codec)
+            queue.put(codec.encode({
+                'timestamp': datetime.now().isoformat(),
+                'source': 'backend',
+                **message
+            }))
+    
+    def _decode_message(self, connection_id: str, message: Frame) -> Optional[Dict[str, Any]]:
+        # Text frames are always JSON; binary frames use the negotiated codec
+        codec = self.connection_codecs.get(connection_id, self.default_codec)
+        if not (codec.binary and isinstance(message, bytes)):
+            codec = self.default_codec
+        try:
+            data = codec.decode(message)
+        except Exception as e:
+            logger.error(f"Invalid {codec.name} message from {connection_id}: {e}")
+            return None
+        if not isinstance(data, dict):
+            logger.error(f"Invalid message from {connection_id}: expected an object")
+            return None
+        return data
+    
+    def _accept_message(self, connection_id: str, data: Dict[str, Any]) -> None:
+        """Bookkeeping done in arrival order, before the handler is scheduled"""
+        message_type = data.get('type')
+        logger.debug(f"Received message type '{message_type}' from {connection_id}")
+        
+        # Handle node connection requests
+        if message_type == 'node_connection_request':
+            node_id = (data.get('payload') or {}).get('node_id')
+            if node_id:
+                self._bind_node(node_id, connection_id)
+                logger.info(f"Node {node_id} connected via {connection_id}")
             
-            # Route message to registered handlers
-            handler = self.message_handlers.get(message_type)
-            if handler:
-                await handler(connection_id, data)
-            else:
+            offered = (data.get('payload') or {}).get('codecs')
+            if offered:
+                self._select_codec(connection_id, offered)
+    
+    def _select_codec(self, connection_id: str, offered: Any) -> None:
+        """Answer a codec offer, then switch the connection to the chosen codec
+        
+        The answer still goes out in the old codec; every later frame uses
+        the new one.
+        """
+        if isinstance(offered, str):
+            offered = [offered]
+        codec = negotiate_codec(offered, self.codecs)
+        self._queue_reply(connection_id, {
+            'type': 'codec_selected',
+            'payload': {'codec': 'json' if not codec.binary else codec.name}
+        })
+        self.connection_codecs[connection_id] = codec
+        logger.info(f"Connection {connection_id} uses the {codec.name} codec")
+    
+    def _bind_node(self, node_id: str, connection_id: str) -> None:
+        """Point a node at a connection, detaching it from any previous one
+        
+        A node that reconnects on a new socket is moved here right away, so
+        the old socket's close, whenever it arrives, no longer touches it.
+        """
+        previous = self.node_connections.get(node_id)
+        if previous is not None and previous != connection_id:
+            nodes = self.connection_nodes.get(previous)
+            if nodes is not None:
+                nodes.discard(node_id)
+                if not nodes:
+                    del self.connection_nodes[previous]
+        self.node_connections[node_id] = connection_id
+        self.connection_nodes.setdefault(connection_id, set()).add(node_id)
+    
+    def _unbind_connection(self, connection_id: str) -> None:
+        """Forget the nodes bound to a connection in O(nodes on it)"""
+        for node_id in self.connection_nodes.pop(connection_id, ()):
+            if self.node_connections.get(node_id) == connection_id:
+                del self.node_connections[node_id]
+    
+    async def _route_message(self, connection_id: str, data: Dict[str, Any]) -> None:
+        """Route message to its registered handler, timing the handler"""
+        message_type = data.get('type')
+        handler = self.message_handlers.get(message_type)
+        started = time.perf_counter()
+        try:
+            if not handler:
                 logger.warning(f"No handler registered for message type: {message_type}")
-                
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON message from {connection_id}: {e}")
+                return
+            await handler(connection_id, data)
         except Exception as e:
             logger.error(f"Error handling message from {connection_id}: {e}")
+        finally:
+            if handler:
+                histogram = self.handler_latency.get(message_type)
+                if histogram is None:
+                    histogram = self.handler_latency[message_type] = LatencyHistogram()
+                histogram.observe(time.perf_counter() - started)
+            # Spooled payloads only live as long as their handler
+            transfer = data.get('transfer')
+            if isinstance(transfer, ChunkedTransfer):
+                transfer.close()
     
-    async def send_message(self, connection_id: str, message: Dict[str, Any]) -> bool:
-        """Send message to specific connection"""
-        connection = self.connections.get(connection_id)
-        if not connection:
+    async def send_message(
+        self,
+        connection_id: str,
+        message: Dict[str, Any],
+        coalesce_key: Optional[Hashable] = None
+    ) -> bool:
+        """Queue message for a specific connection
+        
+        Returns True once the message is accepted by the connection's
+        outbound queue; the queue's writer task delivers it in order.
+        """
+        queue = self.outbound.get(connection_id)
+        if not queue:
             logger.warning(f"Connection {connection_id} not found")
             return False
         
         try:
-            await connection.send(json.dumps(message))
-            return True
+            codec = self.connection_codecs.get(connection_id, self.default_codec)
+            return queue.put(codec.encode(message), coalesce_key)
         except Exception as e:
             logger.error(f"Failed to send message to {connection_id}: {e}")
             return False
@@ -152,15 +429,99 @@ class CommunicationService:
         
         return await self.send_message(connection_id, message)
     
-    async def broadcast_message(self, message: Dict[str, Any], exclude: Optional[Set[str]] = None) -> int:
-        """Broadcast message to all connections"""
+    async def call(
+        self,
+        node_id: str,
+        message: Dict[str, Any],
+        timeout: float = 30.0
+    ) -> Dict[str, Any]:
+        """Send a request to a node and wait for its response message
+        
+        The request is tagged with a correlation id (its ``id``) and
+        ``expect_response``; the node answers with a message whose
+        ``request_id`` is that id. Any number of calls may be in flight per
+        connection. Raises RemoteCallError if the node reports failure,
+        ConnectionError if the node is not connected or disconnects, and
+        asyncio.TimeoutError if no answer arrives in time.
+        """
+        connection_id = self.node_connections.get(node_id)
+        if not connection_id:
+            raise ConnectionError(f"Node {node_id} not connected")
+        
+        call_id = str(uuid.uuid4())
+        request = {
+            'timestamp': datetime.now().isoformat(),
+            'source': 'backend',
+            **message,
+            'id': call_id,
+            'expect_response': True
+        }
+        future = asyncio.get_running_loop().create_future()
+        self.pending_calls[call_id] = future
+        self.connection_calls.setdefault(connection_id, set()).add(call_id)
+        
+        try:
+            if not await self.send_message(connection_id, request):
+                raise ConnectionError(f"Could not send to node {node_id}")
+            response = await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            self.pending_calls.pop(call_id, None)
+            calls = self.connection_calls.get(connection_id)
+            if calls is not None:
+                calls.discard(call_id)
+                if not calls:
+                    del self.connection_calls[connection_id]
+        
+        if response.get('success') is False:
+            raise RemoteCallError(node_id, response.get('error'))
+        return response
+    
+    def _resolve_call(self, connection_id: str, data: Dict[str, Any]) -> bool:
+        """Complete a pending call if this message answers it"""
+        request_id = data.get('request_id')
+        if not request_id:
+            return False
+        future = self.pending_calls.get(request_id)
+        if future is None or request_id not in self.connection_calls.get(connection_id, ()):
+            return False
+        if not future.done():
+            future.set_result(data)
+        return True
+    
+    def _fail_calls(self, connection_id: str, error: Exception) -> None:
+        for call_id in self.connection_calls.pop(connection_id, ()):
+            future = self.pending_calls.pop(call_id, None)
+            if future is not None and not future.done():
+                future.set_exception(error)
+    
+    async def broadcast_message(
+        self,
+        message: Dict[str, Any],
+        exclude: Optional[Set[str]] = None,
+        coalesce_key: Optional[Hashable] = None
+    ) -> int:
+        """Broadcast message to all connections
+        
+        The message is serialized once per codec in use and queued on every connection
+        without waiting, so a slow client never delays the others. Progress
+        updates (see progress_coalesce_key) replace older queued ones for
+        the same task on clients that have fallen behind.
+        """
         exclude = exclude or set()
+        if coalesce_key is None:
+            coalesce_key = progress_coalesce_key(message)
+        frames: Dict[str, Frame] = {}
         sent_count = 0
         
-        for connection_id in self.connections:
-            if connection_id not in exclude:
-                if await self.send_message(connection_id, message):
-                    sent_count += 1
+        for connection_id, queue in list(self.outbound.items()):
+            if connection_id in exclude:
+                continue
+            codec = self.connection_codecs.get(connection_id, self.default_codec)
+            frame = frames.get(codec.name)
+            if frame is None:
+                frame = frames[codec.name] = codec.encode(message)
+            if queue.put(frame, coalesce_key):
+                sent_count += 1
         
         return sent_count
     
@@ -181,4 +542,37 @@ class CommunicationService:
     
     def get_node_connections(self) -> Dict[str, str]:
         """Get node to connection mapping"""
-        return self.node_connections.copy()
\ No newline at end of file
+        return self.node_connections.copy()
+    
+    def get_connection_nodes(self, connection_id: str) -> Set[str]:
+        """Get the nodes registered over a connection"""
+        return set(self.connection_nodes.get(connection_id, ()))
+    
+    def get_backpressure(self) -> Dict[str, Dict[str, Any]]:
+        """Get outbound queue depth and drop counters per connection"""
+        return {connection_id: queue.get_stats() for connection_id, queue in self.outbound.items()}
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get connection counts and the most backed-up connections"""
+        backpressure = self.get_backpressure()
+        return {
+            'connections': len(self.connections),
+            'nodes': len(self.node_connections),
+            'queued': sum(stats['queued'] for stats in backpressure.values()),
+            'dropped': sum(stats['dropped'] for stats in backpressure.values()),
+            'coalesced': sum(stats['coalesced'] for stats in backpressure.values()),
+            'max_backpressure': max((stats['backpressure'] for stats in backpressure.values()), default=0.0),
+            'inflight_handlers': sum(d.inflight() for d in self.dispatchers.values()),
+            'pending_calls': len(self.pending_calls),
+            'codecs': dict(Counter(
+                self.connection_codecs.get(connection_id, self.default_codec).name
+                for connection_id in self.connections
+            )),
+            'heartbeat': self.heartbeat.get_stats(),
+            'transfers': self.transfers.get_stats(),
+            'handler_latency': {
+                message_type: histogram.summary()
+                for message_type, histogram in self.handler_latency.items()
+            },
+            'per_connection': backpressure
+        }
\ No newline at end of file
@@ -0,0 +1,225 @@
+"""
+Execution Engine
+任务执行引擎 - 有界工作池、优先级队列、超时与重试
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+from ..utils.config import Settings
+
+logger = logging.getLogger(__name__)
+
+# (negated priority, sequence, task_id, attempt)
+QueueItem = Tuple[int, int, str, int]
+
+
+class ExecutionEngine:
+    """Runs queued tasks on a bounded pool of asyncio workers
+
+    The listener (normally the TaskService) does the actual work through
+    ``run_task(task_id)`` and is notified of lifecycle transitions through
+    ``on_task_started``, ``on_task_completed`` and ``on_task_failed``.
+    """
+
+    def __init__(self, settings: Settings, listener: Any):
+        self.listener = listener
+        self.max_workers = max(settings.max_concurrent_tasks, 1)
+        self.task_timeout = settings.task_timeout
+        self.retry_attempts = settings.retry_attempts
+        self.retry_delay = settings.retry_delay
+
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._sequence = itertools.count()
+        self._queued: Set[str] = set()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._run_started: Dict[str, float] = {}
+        self._retry_timers: Dict[str, asyncio.TimerHandle] = {}
+        self._workers: list = []
+
+        self._started_at = 0.0
+        self._busy_seconds = 0.0
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'retried': 0,
+            'timed_out': 0,
+            'cancelled': 0
+        }
+        self.running = False
+
+    async def start(self) -> None:
+        """Start the worker pool"""
+        if self.running:
+            return
+
+        logger.info(f"Starting execution engine with {self.max_workers} workers")
+
+        self._queue = asyncio.PriorityQueue()
+        self._started_at = time.monotonic()
+        self._workers = [
+            asyncio.create_task(self._worker(index)) for index in range(self.max_workers)
+        ]
+        self.running = True
+
+    async def stop(self) -> None:
+        """Cancel running tasks and stop the worker pool"""
+        if not self.running:
+            return
+
+        logger.info("Stopping execution engine...")
+        self.running = False
+
+        for timer in self._retry_timers.values():
+            timer.cancel()
+        self._retry_timers.clear()
+
+        for task in list(self._running.values()):
+            task.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+        self._workers.clear()
+        self._running.clear()
+        self._run_started.clear()
+        self._queued.clear()
+        logger.info("Execution engine stopped")
+
+    def is_running(self) -> bool:
+        return self.running
+
+    def is_active(self, task_id: str) -> bool:
+        """Check whether a task is queued, running or waiting for a retry"""
+        return task_id in self._queued or task_id in self._running or task_id in self._retry_timers
+
+    def submit(self, task_id: str, priority: int = 0) -> bool:
+        """Queue a task for execution; higher priority runs first
+
+        Returns False if the task is already queued or running.
+        """
+        if not self.running:
+            raise RuntimeError("Execution engine is not running")
+        if self.is_active(task_id):
+            return False
+
+        self.stats['submitted'] += 1
+        self._enqueue(task_id, priority, attempt=0)
+        return True
+
+    def cancel(self, task_id: str) -> bool:
+        """Remove a queued task or interrupt a running one"""
+        cancelled = False
+
+        if task_id in self._queued:
+            # Lazy deletion: the worker skips it when it reaches the head
+            self._queued.discard(task_id)
+            cancelled = True
+
+        timer = self._retry_timers.pop(task_id, None)
+        if timer:
+            timer.cancel()
+            cancelled = True
+
+        task = self._running.get(task_id)
+        if task and not task.done():
+            task.cancel()
+            cancelled = True
+
+        if cancelled:
+            self.stats['cancelled'] += 1
+            logger.info(f"Cancelled execution of task: {task_id}")
+        return cancelled
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth, utilization and lifetime counters"""
+        now = time.monotonic()
+        uptime = now - self._started_at if self.running else 0.0
+        busy_now = sum(now - started for started in self._run_started.values())
+        capacity = uptime * self.max_workers
+        return {
+            'workers': self.max_workers,
+            'busy_workers': len(self._running),
+            'queue_depth': len(self._queued),
+            'pending_retries': len(self._retry_timers),
+            'utilization': len(self._running) / self.max_workers,
+            'average_utilization': (self._busy_seconds + busy_now) / capacity if capacity else 0.0,
+            **self.stats
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _enqueue(self, task_id: str, priority: int, attempt: int) -> None:
+        self._queued.add(task_id)
+        self._queue.put_nowait((-priority, next(self._sequence), task_id, attempt))
+
+    def _schedule_retry(self, task_id: str, priority: int, attempt: int) -> float:
+        delay = self.retry_delay * (2 ** (attempt - 1))
+        loop = asyncio.get_running_loop()
+
+        def requeue() -> None:
+            if self._retry_timers.pop(task_id, None) is not None and self.running:
+                self._enqueue(task_id, priority, attempt)
+
+        self._retry_timers[task_id] = loop.call_later(delay, requeue)
+        return delay
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            neg_priority, _, task_id, attempt = await self._queue.get()
+            if task_id not in self._queued:
+                continue  # cancelled while queued
+            self._queued.discard(task_id)
+
+            try:
+                await self._execute(task_id, -neg_priority, attempt)
+            except Exception as e:
+                logger.error(f"Worker {index} failed while handling task {task_id}: {e}")
+
+    async def _run(self, task_id: str, attempt: int) -> Any:
+        await self.listener.on_task_started(task_id, attempt)
+        return await asyncio.wait_for(self.listener.run_task(task_id), timeout=self.task_timeout)
+
+    async def _execute(self, task_id: str, priority: int, attempt: int) -> None:
+        # Registered before the first await so stop_task can always interrupt it
+        run = asyncio.create_task(self._run(task_id, attempt))
+        started = time.monotonic()
+        self._running[task_id] = run
+        self._run_started[task_id] = started
+        try:
+            # asyncio.wait does not propagate the run's cancellation to the worker
+            await asyncio.wait({run})
+        finally:
+            self._running.pop(task_id, None)
+            self._run_started.pop(task_id, None)
+            self._busy_seconds += time.monotonic() - started
+
+        if run.cancelled():
+            return  # stopped by the user; the listener has already been told
+
+        error = run.exception()
+        if error is None:
+            self.stats['completed'] += 1
+            await self.listener.on_task_completed(task_id, run.result())
+            return
+
+        if isinstance(error, asyncio.TimeoutError):
+            self.stats['timed_out'] += 1
+            error = TimeoutError(f"Task timed out after {self.task_timeout}s")
+
+        will_retry = attempt < self.retry_attempts and self.running
+        if will_retry:
+            self.stats['retried'] += 1
+            delay = self._schedule_retry(task_id, priority, attempt + 1)
+            logger.warning(f"Task {task_id} failed ({error}); retrying in {delay}s")
+        else:
+            self.stats['failed'] += 1
+            logger.error(f"Task {task_id} failed: {error}")
+
+        await self.listener.on_task_failed(task_id, error, will_retry)
@@ -0,0 +1,136 @@
+"""
+Heartbeat Monitor
+心跳监测 - 单一循环发送ping、统计RTT并清理失联连接
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# RTT samples kept per connection for percentiles
+RTT_WINDOW = 128
+
+
+@dataclass
+class PeerHealth:
+    """Heartbeat state of one connection"""
+    websocket: Any
+    pong_waiter: Optional[asyncio.Future] = None
+    ping_sent_at: float = 0.0
+    missed: int = 0
+    rtts: Deque[float] = field(default_factory=lambda: deque(maxlen=RTT_WINDOW))
+
+    def rtt_percentile(self, pct: float) -> Optional[float]:
+        if not self.rtts:
+            return None
+        ordered = sorted(self.rtts)
+        return ordered[min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+class HeartbeatMonitor:
+    """Pings every connection from one timer loop and evicts dead peers
+
+    Each tick sends a ping to every peer whose previous ping was answered;
+    a peer that has not answered by the following tick misses a beat, and
+    after ``max_missed`` consecutive misses ``evict(connection_id)`` is
+    called so half-open sockets leave the connection maps.
+    """
+
+    def __init__(self, interval: float, max_missed: int, evict: Callable[[str], Any]):
+        self.interval = interval
+        self.max_missed = max(max_missed, 1)
+        self.evict = evict
+        self.peers: Dict[str, PeerHealth] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+        self.stats = {'pings': 0, 'pongs': 0, 'missed': 0, 'evicted': 0}
+
+    def start(self) -> None:
+        if self._loop_task is None and self.interval > 0:
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+        self.peers.clear()
+
+    def add(self, connection_id: str, websocket: Any) -> None:
+        self.peers[connection_id] = PeerHealth(websocket=websocket)
+
+    def remove(self, connection_id: str) -> None:
+        self.peers.pop(connection_id, None)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Heartbeat tick failed: {e}")
+
+    async def tick(self) -> None:
+        """Check last round's pongs and send the next round of pings"""
+        to_ping = []
+        for connection_id, peer in list(self.peers.items()):
+            if peer.pong_waiter is not None and not peer.pong_waiter.done():
+                peer.missed += 1
+                self.stats['missed'] += 1
+                if peer.missed >= self.max_missed:
+                    self._evict(connection_id, f"missed {peer.missed} heartbeats")
+                continue
+            to_ping.append((connection_id, peer))
+
+        if to_ping:
+            await asyncio.gather(*(self._ping(connection_id, peer) for connection_id, peer in to_ping))
+
+    async def _ping(self, connection_id: str, peer: PeerHealth) -> None:
+        try:
+            waiter = await asyncio.wait_for(peer.websocket.ping(), timeout=self.interval)
+        except Exception as e:
+            self._evict(connection_id, f"ping failed: {e!r}")
+            return
+
+        peer.ping_sent_at = time.perf_counter()
+        peer.pong_waiter = waiter
+        self.stats['pings'] += 1
+        waiter.add_done_callback(lambda done: self._on_pong(peer, done))
+
+    def _on_pong(self, peer: PeerHealth, waiter: asyncio.Future) -> None:
+        if waiter.cancelled() or waiter.exception() is not None:
+            return
+        peer.rtts.append(time.perf_counter() - peer.ping_sent_at)
+        peer.missed = 0
+        self.stats['pongs'] += 1
+
+    def _evict(self, connection_id: str, reason: str) -> None:
+        if self.peers.pop(connection_id, None) is None:
+            return
+        self.stats['evicted'] += 1
+        logger.info(f"Evicting dead WebSocket connection {connection_id}: {reason}")
+        self.evict(connection_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'interval': self.interval,
+            'peers': len(self.peers),
+            **self.stats,
+            'rtt_ms': {
+                connection_id: {
+                    'p50': _ms(peer.rtt_percentile(50)),
+                    'p90': _ms(peer.rtt_percentile(90)),
+                    'p99': _ms(peer.rtt_percentile(99)),
+                    'missed': peer.missed
+                }
+                for connection_id, peer in self.peers.items()
+            }
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 3) if seconds is not None else None
@@ -0,0 +1,78 @@
+"""
+Message Dispatcher
+消息分发 - 每连接有限并发处理，按节点保持顺序
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Collection, Dict, Hashable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+MessageRoute = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+class ConnectionDispatcher:
+    """Runs one connection's message handlers as tasks under an in-flight limit
+
+    Messages whose type is in ``ordered_types`` are chained per node_id (or
+    per connection when they carry none), so each waits for the previous
+    message of its lane; everything else runs as soon as a slot is free.
+    When all slots are taken, ``dispatch`` blocks, which stops reading from
+    the socket and pushes back on the peer.
+    """
+
+    def __init__(
+        self,
+        connection_id: str,
+        route: MessageRoute,
+        max_inflight: int,
+        ordered_types: Collection[str]
+    ):
+        self.connection_id = connection_id
+        self.route = route
+        self.ordered_types = frozenset(ordered_types)
+        self._slots = asyncio.Semaphore(max(max_inflight, 1))
+        self._lanes: Dict[Hashable, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def inflight(self) -> int:
+        return len(self._tasks)
+
+    def _lane(self, data: Dict[str, Any]) -> Optional[Hashable]:
+        if data.get('type') not in self.ordered_types:
+            return None
+        payload = data.get('payload')
+        node_id = payload.get('node_id') if isinstance(payload, dict) else None
+        return ('node', node_id) if node_id else ('connection',)
+
+    async def dispatch(self, data: Dict[str, Any]) -> None:
+        await self._slots.acquire()
+        lane = self._lane(data)
+        previous = self._lanes.get(lane) if lane is not None else None
+
+        task = asyncio.create_task(self._run(data, previous))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        if lane is not None:
+            self._lanes[lane] = task
+            task.add_done_callback(lambda done: self._end_lane(lane, done))
+
+    async def close(self, cancel: bool = False) -> None:
+        """Wait for (or cancel) handlers still running for this connection"""
+        if cancel:
+            for task in self._tasks:
+                task.cancel()
+        await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def _run(self, data: Dict[str, Any], previous: Optional[asyncio.Task]) -> None:
+        try:
+            if previous is not None:
+                await asyncio.wait([previous])
+            await self.route(self.connection_id, data)
+        finally:
+            self._slots.release()
+
+    def _end_lane(self, lane: Hashable, task: asyncio.Task) -> None:
+        if self._lanes.get(lane) is task:
+            del self._lanes[lane]
@@ -0,0 +1,135 @@
+"""
+Outbound Queue
+出站队列 - 每个连接一个有界发送队列，合并过期的进度消息
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+Frame = Union[str, bytes]
+
+# Close code sent to a peer that cannot keep up with non-droppable messages
+CLOSE_CODE_TRY_AGAIN_LATER = 1013
+
+
+class OutboundQueue:
+    """Bounded send queue for one connection, drained by a single writer task
+
+    Frames are enqueued already serialized, so a broadcast encodes once and
+    never waits on a slow peer. Frames enqueued with a ``coalesce_key`` are
+    droppable progress updates: a newer frame with the same key replaces the
+    queued one in place, and when the queue is full the oldest droppable
+    frame is evicted. If the queue is full of frames that must be delivered,
+    the peer is too slow to keep and the connection is closed.
+    """
+
+    def __init__(self, connection_id: str, websocket: Any, max_size: int):
+        self.connection_id = connection_id
+        self.websocket = websocket
+        self.max_size = max(max_size, 1)
+
+        self._queue: Deque[List[Any]] = deque()  # [coalesce_key, frame]
+        self._coalescing: Dict[Hashable, List[Any]] = {}
+        self._ready = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self.closed = False
+        self.stats = {
+            'sent': 0,
+            'coalesced': 0,
+            'dropped': 0,
+            'high_watermark': 0
+        }
+
+    def start(self) -> None:
+        self._writer = asyncio.create_task(self._drain())
+
+    async def close(self) -> None:
+        self.closed = True
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self._writer = None
+        self._queue.clear()
+        self._coalescing.clear()
+
+    def put(self, frame: Frame, coalesce_key: Optional[Hashable] = None) -> bool:
+        """Queue a frame without waiting; returns False if it was not queued"""
+        if self.closed:
+            return False
+
+        if coalesce_key is not None:
+            queued = self._coalescing.get(coalesce_key)
+            if queued is not None:
+                queued[1] = frame
+                self.stats['coalesced'] += 1
+                return True
+
+        if len(self._queue) >= self.max_size and not self._evict_droppable():
+            if coalesce_key is not None:
+                self.stats['dropped'] += 1
+                return False
+            logger.warning(f"Outbound queue of {self.connection_id} overflowed; closing slow connection")
+            self.closed = True
+            asyncio.create_task(self._close_slow_peer())
+            return False
+
+        entry = [coalesce_key, frame]
+        self._queue.append(entry)
+        if coalesce_key is not None:
+            self._coalescing[coalesce_key] = entry
+        if len(self._queue) > self.stats['high_watermark']:
+            self.stats['high_watermark'] = len(self._queue)
+        self._ready.set()
+        return True
+
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def backpressure(self) -> float:
+        """Queue fill ratio: 0.0 is keeping up, 1.0 is about to shed messages"""
+        return len(self._queue) / self.max_size
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'queued': len(self._queue),
+            'backpressure': round(self.backpressure(), 3),
+            **self.stats
+        }
+
+    def _evict_droppable(self) -> bool:
+        for index, entry in enumerate(self._queue):
+            if entry[0] is not None:
+                del self._queue[index]
+                del self._coalescing[entry[0]]
+                self.stats['dropped'] += 1
+                return True
+        return False
+
+    async def _drain(self) -> None:
+        while True:
+            while not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+
+            coalesce_key, frame = self._queue.popleft()
+            if coalesce_key is not None:
+                del self._coalescing[coalesce_key]
+
+            try:
+                await self.websocket.send(frame)
+            except Exception as e:
+                # The connection handler notices the close and cleans up
+                logger.debug(f"Stopped sending to {self.connection_id}: {e}")
+                self.closed = True
+                return
+            self.stats['sent'] += 1
+
+    async def _close_slow_peer(self) -> None:
+        try:
+            await self.websocket.close(code=CLOSE_CODE_TRY_AGAIN_LATER, reason="Outbound queue overflow")
+        except Exception as e:
+            logger.debug(f"Error closing slow connection {self.connection_id}: {e}")
@@ -0,0 +1,332 @@
+"""
+SQLite Repository
+SQLite持久化仓库 - WAL模式、批量提交与连接池
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+from ..utils.config import DatabaseSettings
+
+logger = logging.getLogger(__name__)
+
+TABLES = ('workflows', 'tasks')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    data TEXT NOT NULL
+)
+"""
+
+UPSERT_SQL = (
+    "INSERT INTO {table} (id, created_at, updated_at, data) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at, data = excluded.data"
+)
+DELETE_SQL = "DELETE FROM {table} WHERE id = ?"
+SELECT_ALL_SQL = "SELECT data FROM {table} ORDER BY created_at, id"
+
+# (sql, params) pairs queued for the writer
+WriteOp = Tuple[str, Tuple[Any, ...]]
+
+
+def _encode(value: Any) -> Any:
+    """JSON encoder hook for records holding datetimes, enums and pydantic models"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, BaseModel):
+        return value.dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode(data: str) -> Dict[str, Any]:
+    record = json.loads(data)
+    for field in ('created_at', 'updated_at'):
+        if isinstance(record.get(field), str):
+            record[field] = datetime.fromisoformat(record[field])
+    return record
+
+
+def parse_sqlite_url(url: str) -> str:
+    """Extract the database path from a ``sqlite:///`` URL
+    
+    In-memory databases are rejected: each pooled connection would open a
+    database of its own, so readers would never see the writer's commits.
+    """
+    prefix = "sqlite:///"
+    if not url.startswith(prefix):
+        raise ValueError(f"Unsupported database URL: {url}")
+    path = url[len(prefix):]
+    if not path or path == ":memory:" or "mode=memory" in path:
+        raise ValueError(f"SQLite repository needs a database file, not an in-memory database: {url}")
+    return path
+
+
+class SQLiteRepository:
+    """Async record repository backed by SQLite
+
+    All writes go through a single writer connection. Writes that arrive while
+    a commit is in progress are grouped into the next transaction, so a burst
+    of state changes costs one fsync instead of one per write. If a batch
+    fails, its writes are retried one transaction each, so only the write
+    at fault fails; the writes of one ``write_many`` call always share a
+    transaction. Reads use a
+    small pool of connections sized by ``pool_size``/``max_overflow``.
+    """
+
+    def __init__(self, config: DatabaseSettings):
+        self.config = config
+        self.path = parse_sqlite_url(config.url)
+        self.batch_size = max(config.commit_batch_size, 1)
+        self._writer: Optional[sqlite3.Connection] = None
+        self._writer_executor: Optional[ThreadPoolExecutor] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._idle_readers: List[sqlite3.Connection] = []
+        self._reader_slots: Optional[asyncio.Semaphore] = None
+        self._reader_count = 0
+        self.commit_count = 0
+        self.write_count = 0
+        self.running = False
+
+    async def initialize(self) -> None:
+        """Open connections, enable WAL and create tables"""
+        if self.running:
+            return
+
+        logger.info(f"Opening SQLite repository at {self.path}")
+
+        self._writer_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        self._writer = await self._run_writer(self._connect)
+        await self._run_writer(self._create_schema)
+
+        self._queue = asyncio.Queue()
+        self._reader_slots = asyncio.Semaphore(self.config.pool_size + self.config.max_overflow)
+        self._writer_task = asyncio.create_task(self._writer_loop())
+        self.running = True
+
+    async def cleanup(self) -> None:
+        """Flush pending writes and close all connections"""
+        if not self.running:
+            return
+
+        logger.info("Closing SQLite repository...")
+        self.running = False
+
+        await self._queue.join()
+        self._writer_task.cancel()
+        try:
+            await self._writer_task
+        except asyncio.CancelledError:
+            pass
+
+        await self._run_writer(self._writer.close)
+        self._writer_executor.shutdown(wait=True)
+        self._writer = None
+
+        for connection in self._idle_readers:
+            connection.close()
+        self._idle_readers.clear()
+        self._reader_count = 0
+
+    def is_ready(self) -> bool:
+        return self.running
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def save(self, table: str, record: Dict[str, Any]) -> None:
+        """Insert or update a record; returns once the write is committed"""
+        await self._submit(self._upsert(table, record))
+
+    async def delete(self, table: str, record_id: str) -> None:
+        """Delete a record; returns once the write is committed"""
+        await self._submit((DELETE_SQL.format(table=self._table(table)), (record_id,)))
+
+    async def save_many(self, table: str, records: Sequence[Dict[str, Any]]) -> None:
+        """Insert or update records in one transaction"""
+        await self.write_many(table, records)
+
+    async def delete_many(self, table: str, record_ids: Sequence[str]) -> None:
+        """Delete records in one transaction"""
+        await self.write_many(table, (), record_ids)
+
+    async def write_many(
+        self,
+        table: str,
+        records: Sequence[Dict[str, Any]],
+        deleted_ids: Sequence[str] = ()
+    ) -> None:
+        """Save and delete records in one transaction: all of them commit or none do"""
+        delete_sql = DELETE_SQL.format(table=self._table(table))
+        ops = [self._upsert(table, record) for record in records]
+        ops.extend((delete_sql, (record_id,)) for record_id in deleted_ids)
+        if ops:
+            await self._submit(*ops)
+
+    async def load_all(self, table: str) -> List[Dict[str, Any]]:
+        """Load every record of a table in created_at order"""
+        sql = SELECT_ALL_SQL.format(table=self._table(table))
+        connection = await self._acquire_reader()
+        try:
+            rows = await asyncio.to_thread(lambda: connection.execute(sql).fetchall())
+        finally:
+            self._release_reader(connection)
+        return [_decode(row[0]) for row in rows]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get write and pool statistics"""
+        return {
+            'writes': self.write_count,
+            'commits': self.commit_count,
+            'pending_writes': self._queue.qsize() if self._queue else 0,
+            'reader_connections': self._reader_count,
+            'idle_reader_connections': len(self._idle_readers)
+        }
+
+    # ------------------------------------------------------------------
+    # Writer
+    # ------------------------------------------------------------------
+
+    def _upsert(self, table: str, record: Dict[str, Any]) -> WriteOp:
+        data = json.dumps(record, default=_encode)
+        params = (
+            record['id'],
+            _encode(record['created_at']),
+            _encode(record['updated_at']),
+            data
+        )
+        return UPSERT_SQL.format(table=self._table(table)), params
+
+    async def _submit(self, *ops: WriteOp) -> None:
+        """Queue writes that must commit together; returns once they have"""
+        if not self.running:
+            raise RuntimeError("Repository is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((list(ops), future))
+        await future
+
+    async def _writer_loop(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            groups = [ops for ops, _ in batch]
+            try:
+                await self._run_writer(self._commit_batch, [op for ops in groups for op in ops])
+                errors: List[Optional[Exception]] = [None] * len(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    logger.error(f"Failed to commit write: {e}")
+                    errors = [e]
+                else:
+                    # Keep one bad statement from failing unrelated writes
+                    logger.warning(f"Failed to commit batch of {len(batch)} writes, retrying one by one: {e}")
+                    errors = await self._run_writer(self._commit_each, groups)
+
+            for (_, future), error in zip(batch, errors):
+                if not future.done():
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(error)
+                self._queue.task_done()
+
+    def _commit_batch(self, ops: List[WriteOp]) -> None:
+        connection = self._writer
+        connection.execute("BEGIN")
+        try:
+            for sql, params in ops:
+                connection.execute(sql, params)
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        self.commit_count += 1
+        self.write_count += len(ops)
+
+    def _commit_each(self, groups: List[List[WriteOp]]) -> List[Optional[Exception]]:
+        """Commit each group of writes in a transaction of its own; returns the error of each, if any"""
+        errors: List[Optional[Exception]] = []
+        for ops in groups:
+            try:
+                self._commit_batch(ops)
+                errors.append(None)
+            except Exception as e:
+                logger.error(f"Failed to commit write: {e}")
+                errors.append(e)
+        return errors
+
+    async def _run_writer(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer_executor, func, *args)
+
+    # ------------------------------------------------------------------
+    # Reader pool
+    # ------------------------------------------------------------------
+
+    async def _acquire_reader(self) -> sqlite3.Connection:
+        await self._reader_slots.acquire()
+        if self._idle_readers:
+            return self._idle_readers.pop()
+        try:
+            connection = await asyncio.to_thread(self._connect)
+        except Exception:
+            self._reader_slots.release()
+            raise
+        self._reader_count += 1
+        return connection
+
+    def _release_reader(self, connection: sqlite3.Connection) -> None:
+        if len(self._idle_readers) < self.config.pool_size:
+            self._idle_readers.append(connection)
+        else:
+            # Overflow connections are closed instead of kept idle
+            connection.close()
+            self._reader_count -= 1
+        self._reader_slots.release()
+
+    # ------------------------------------------------------------------
+    # Connection setup
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: transactions are managed explicitly so a whole
+        # batch shares one BEGIN/COMMIT; statements stay in the per-connection
+        # prepared statement cache.
+        connection = sqlite3.connect(
+            self.path,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=256
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(f"PRAGMA synchronous={self.config.synchronous}")
+        connection.execute("PRAGMA busy_timeout=5000")
+        if self.config.echo:
+            connection.set_trace_callback(logger.info)
+        return connection
+
+    def _create_schema(self) -> None:
+        for table in TABLES:
+            self._writer.execute(SCHEMA.format(table=table))
+
+    @staticmethod
+    def _table(table: str) -> str:
+        if table not in TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        return table
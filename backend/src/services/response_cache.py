@@ -0,0 +1,150 @@
+"""
+Response Cache
+响应缓存 - 按记录版本缓存已序列化与已压缩的响应，配合ETag条件请求
+"""
+
+import gzip
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+GZIP_SUFFIX = '-gzip'
+
+# A record version as its service reports it: a counter, or a token
+# such as "<epoch>.<seq>" when the counter alone may repeat across restarts
+Version = Union[int, str]
+
+
+def format_etag(version: Version, encoding: Optional[str] = None) -> str:
+    """Strong ETag of one representation of a record version"""
+    return f'"{version}{GZIP_SUFFIX}"' if encoding == 'gzip' else f'"{version}"'
+
+
+def parse_etag(tag: str) -> Optional[str]:
+    """Record version named by an ETag, as a string; None if the tag is empty"""
+    tag = tag.strip()
+    if tag.startswith('W/'):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    if tag.endswith(GZIP_SUFFIX):
+        tag = tag[:-len(GZIP_SUFFIX)]
+    return tag or None
+
+
+def matching_etag(if_none_match: Optional[str], version: Version) -> Optional[str]:
+    """The ETag in an If-None-Match header that names this version, if any
+
+    If-None-Match uses weak comparison, so any representation of the
+    version matches.
+    """
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == '*':
+        return format_etag(version)
+    for tag in if_none_match.split(','):
+        if parse_etag(tag) == str(version):
+            return tag.strip()
+    return None
+
+
+class CachedResponse:
+    """Serialized body of one record version, and its gzip encoding once asked for"""
+
+    __slots__ = ('key', 'version', 'body', 'gzip_body')
+
+    def __init__(self, key: str, version: Version, body: bytes):
+        self.key = key
+        self.version = version
+        self.body = body
+        self.gzip_body: Optional[bytes] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzip_body or b'')
+
+
+class ResponseCache:
+    """LRU cache of serialized responses keyed by record id and version
+
+    Entries are checked against the record version, so a stale body is
+    never served even without invalidation; writers still invalidate to
+    free the memory early. Bodies are compressed at most once per version,
+    the first time a client that accepts gzip asks for them.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 32 * 1024 * 1024,
+        minimum_size: int = 1000,
+        compresslevel: int = 9
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Same thresholds as GZipMiddleware, which leaves these responses alone
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0, 'compressions': 0}
+
+    def get(self, key: str, version: Version) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None or entry.version != version:
+            self.stats['misses'] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return entry
+
+    def put(self, key: str, version: Version, body: bytes) -> CachedResponse:
+        entry = CachedResponse(key, version, body)
+        self._discard(key)
+        if entry.size <= self.max_bytes:
+            self._entries[key] = entry
+            self._bytes += entry.size
+            self._shrink()
+        return entry
+
+    def encode(self, entry: CachedResponse, accept_encoding: str) -> Optional[str]:
+        """Pick the content coding for a client; compresses the entry if needed"""
+        if 'gzip' not in accept_encoding or len(entry.body) < self.minimum_size:
+            return None
+        if entry.gzip_body is None:
+            entry.gzip_body = gzip.compress(entry.body, compresslevel=self.compresslevel)
+            self.stats['compressions'] += 1
+            if self._entries.get(entry.key) is entry:
+                self._bytes += len(entry.gzip_body)
+                self._shrink()
+        return 'gzip'
+
+    def invalidate(self, key: str) -> None:
+        if self._discard(key) is not None:
+            self.stats['invalidations'] += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            **self.stats
+        }
+
+    def _discard(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+        return entry
+
+    def _shrink(self) -> None:
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.stats['evictions'] += 1
@@ -0,0 +1,319 @@
+"""
+Task Scheduler
+任务调度器 - 基于单一最小堆的定时与循环触发
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..models.task import TriggerConfig, TriggerType
+from ..utils.config import Settings
+from ..utils.cron import CronExpression
+
+logger = logging.getLogger(__name__)
+
+MISFIRE_POLICIES = ('skip', 'once', 'all')
+
+# How long a catch-up fire waits while the previous replay is still running
+CATCHUP_RETRY_DELAY = timedelta(seconds=1)
+
+
+@dataclass
+class ScheduleEntry:
+    """Timer state of one scheduled or looping task"""
+    task_id: str
+    trigger: TriggerConfig
+    next_run_at: Optional[datetime]
+    execution_count: int = 0
+    catchup: int = 0
+    generation: int = 0
+    cron: Optional[CronExpression] = None
+
+    def compute_next(self, after: datetime) -> Optional[datetime]:
+        max_executions = self.trigger.max_executions
+        if max_executions is not None and self.execution_count >= max_executions:
+            return None
+        if self.cron is not None:
+            return self.cron.next_after(after)
+        return after + timedelta(seconds=self.trigger.loop_interval)
+
+
+def _coerce_trigger(trigger: Any) -> TriggerConfig:
+    if isinstance(trigger, TriggerConfig):
+        return trigger
+    return TriggerConfig(**trigger)
+
+
+def validate_trigger(trigger: TriggerConfig) -> Optional[CronExpression]:
+    """Validate a trigger; returns the parsed cron expression for scheduled triggers"""
+    if trigger.type == TriggerType.SCHEDULED:
+        if not trigger.cron_expression:
+            raise ValueError("Scheduled triggers require a cron_expression")
+        cron = CronExpression(trigger.cron_expression)
+        # Raises for expressions such as '0 0 31 2 *' that parse but never fire
+        cron.next_after(datetime.now())
+        return cron
+    if trigger.type == TriggerType.LOOP:
+        if not trigger.loop_interval or trigger.loop_interval <= 0:
+            raise ValueError("Loop triggers require a positive loop_interval")
+    if trigger.max_executions is not None and trigger.max_executions < 0:
+        raise ValueError("max_executions must not be negative")
+    return None
+
+
+class TaskScheduler:
+    """Fires SCHEDULED and LOOP triggers from one min-heap of fire times
+
+    A single coroutine sleeps until the earliest fire time, so idle cost is
+    one pending timer no matter how many tasks are scheduled. Rescheduling
+    bumps the entry's generation; stale heap items are skipped when popped.
+
+    The listener (normally the TaskService) is asked ``is_task_active`` to
+    skip fires while a previous run is still going, and is handed each fire
+    through ``on_trigger_fired(task_id, next_run_at, execution_count)``.
+    """
+
+    def __init__(self, settings: Settings, listener: Any):
+        self.listener = listener
+        self.misfire_policy = settings.scheduler_misfire_policy
+        self.max_catchup = settings.scheduler_max_catchup
+        if self.misfire_policy not in MISFIRE_POLICIES:
+            raise ValueError(f"Unknown misfire policy: {self.misfire_policy}")
+
+        self._entries: Dict[str, ScheduleEntry] = {}
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        # In-flight on_trigger_fired calls, and the task ids they are for
+        self._dispatches: Dict[asyncio.Task, str] = {}
+        self._pending: Set[str] = set()
+        self.stats = {'fired': 0, 'skipped_active': 0, 'missed': 0}
+        self.running = False
+
+    async def start(self) -> None:
+        """Start the timer loop"""
+        if self.running:
+            return
+
+        logger.info("Starting task scheduler...")
+        self._wakeup = asyncio.Event()
+        self._loop_task = asyncio.create_task(self._run())
+        self.running = True
+
+    async def stop(self) -> None:
+        """Stop the timer loop"""
+        if not self.running:
+            return
+
+        logger.info("Stopping task scheduler...")
+        self.running = False
+        self._loop_task.cancel()
+        await asyncio.gather(self._loop_task, *self._dispatches, return_exceptions=True)
+        self._loop_task = None
+        self._heap.clear()
+        self._entries.clear()
+
+    def is_running(self) -> bool:
+        return self.running
+
+    def restore(self, tasks: Iterable[Dict[str, Any]], now: Optional[datetime] = None) -> None:
+        """Re-register persisted tasks, applying the misfire policy to missed fires"""
+        now = now or datetime.now()
+        for task_data in tasks:
+            trigger = _coerce_trigger(task_data['trigger_config'])
+            if trigger.type == TriggerType.MANUAL:
+                continue
+
+            entry = self._make_entry(task_data['id'], trigger, task_data.get('execution_count', 0))
+            next_run_at = task_data.get('next_run_at')
+            if next_run_at is None and task_data.get('execution_count', 0) == 0:
+                next_run_at = entry.compute_next(now)
+            if next_run_at is None:
+                continue  # max_executions already reached
+            if next_run_at < now:
+                next_run_at = self._apply_misfire_policy(entry, next_run_at, now)
+            entry.next_run_at = next_run_at
+            self._register(entry)
+
+    def next_run(self, trigger: TriggerConfig, execution_count: int = 0) -> Optional[datetime]:
+        """First fire time of a trigger from now, without scheduling anything
+        
+        Raises ValueError for an invalid trigger, like ``schedule`` would.
+        """
+        trigger = _coerce_trigger(trigger)
+        if trigger.type == TriggerType.MANUAL:
+            return None
+        return self._make_entry('', trigger, execution_count).compute_next(datetime.now())
+
+    def schedule(
+        self,
+        task_id: str,
+        trigger: TriggerConfig,
+        execution_count: int = 0,
+        next_run_at: Optional[datetime] = None
+    ) -> Optional[datetime]:
+        """Schedule (or reschedule) a task; returns its next fire time
+        
+        Pass ``next_run_at`` from ``next_run`` to keep a fire time that was
+        already recorded.
+        """
+        trigger = _coerce_trigger(trigger)
+        if trigger.type == TriggerType.MANUAL:
+            self.unschedule(task_id)
+            return None
+
+        entry = self._make_entry(task_id, trigger, execution_count)
+        entry.next_run_at = next_run_at or entry.compute_next(datetime.now())
+        self._register(entry)
+        return entry.next_run_at
+
+    def unschedule(self, task_id: str) -> bool:
+        """Stop firing a task; its heap item is dropped lazily"""
+        removed = self._entries.pop(task_id, None) is not None
+        if removed and len(self._heap) > 2 * len(self._entries) + 64:
+            self._compact()
+        return removed
+
+    def get_next_run(self, task_id: str) -> Optional[datetime]:
+        entry = self._entries.get(task_id)
+        return entry.next_run_at if entry else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduler counters"""
+        return {
+            'scheduled_tasks': len(self._entries),
+            'heap_size': len(self._heap),
+            'next_fire_in': max(self._heap[0][0] - time.time(), 0.0) if self._heap else None,
+            **self.stats
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _make_entry(self, task_id: str, trigger: TriggerConfig, execution_count: int) -> ScheduleEntry:
+        # Generations come from one counter so they never repeat for a task id
+        return ScheduleEntry(
+            task_id=task_id,
+            trigger=trigger,
+            next_run_at=None,
+            execution_count=execution_count,
+            generation=next(self._sequence),
+            cron=validate_trigger(trigger)
+        )
+
+    def _apply_misfire_policy(self, entry: ScheduleEntry, missed_at: datetime, now: datetime) -> Optional[datetime]:
+        if self.misfire_policy == 'skip':
+            self.stats['missed'] += 1
+            return entry.compute_next(now)
+
+        if self.misfire_policy == 'all':
+            # Count missed fires (bounded) and replay them back to back
+            missed = 0
+            moment = missed_at
+            while moment is not None and moment < now and missed < self.max_catchup:
+                missed += 1
+                moment = entry.compute_next(moment)
+            entry.catchup = missed - 1
+            self.stats['missed'] += missed
+        return now
+
+    def _register(self, entry: ScheduleEntry) -> None:
+        self._entries[entry.task_id] = entry
+        if entry.next_run_at is None:
+            return
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._compact()
+        fire_at = entry.next_run_at.timestamp()
+        earliest = self._heap[0][0] if self._heap else None
+        heapq.heappush(self._heap, (fire_at, next(self._sequence), entry.task_id, entry.generation))
+        if self._wakeup is not None and (earliest is None or fire_at < earliest):
+            self._wakeup.set()
+
+    def _compact(self) -> None:
+        """Drop stale heap items left behind by unschedule/reschedule"""
+        self._heap = [
+            item for item in self._heap
+            if item[2] in self._entries and self._entries[item[2]].generation == item[3]
+        ]
+        heapq.heapify(self._heap)
+
+    async def _run(self) -> None:
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Fire everything that is due before sleeping again
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, task_id, generation = heapq.heappop(self._heap)
+                entry = self._entries.get(task_id)
+                if entry is None or entry.generation != generation:
+                    continue  # unscheduled or rescheduled
+                self._fire(entry)
+
+    def _fire(self, entry: ScheduleEntry) -> None:
+        fired_at = datetime.now()
+        fired = (
+            entry.task_id not in self._pending
+            and not self.listener.is_task_active(entry.task_id)
+        )
+        if fired:
+            entry.execution_count += 1
+            self.stats['fired'] += 1
+        else:
+            self.stats['skipped_active'] += 1
+
+        if entry.catchup > 0:
+            # Replaying missed fires one after another
+            if fired:
+                entry.catchup -= 1
+                next_run_at = fired_at if entry.compute_next(fired_at) is not None else None
+            else:
+                next_run_at = fired_at + CATCHUP_RETRY_DELAY
+        elif entry.cron is not None:
+            next_run_at = entry.compute_next(fired_at)
+        else:
+            # Fixed rate from the planned time so loops do not drift...
+            next_run_at = entry.compute_next(entry.next_run_at)
+            if next_run_at is not None and next_run_at <= fired_at:
+                # ...unless a whole interval was lost; then do not burst
+                next_run_at = entry.compute_next(fired_at)
+        entry.next_run_at = next_run_at
+
+        if next_run_at is None:
+            self._entries.pop(entry.task_id, None)
+        else:
+            entry.generation = next(self._sequence)
+            self._register(entry)
+
+        if fired:
+            dispatch = asyncio.create_task(
+                self.listener.on_trigger_fired(entry.task_id, next_run_at, entry.execution_count)
+            )
+            self._pending.add(entry.task_id)
+            self._dispatches[dispatch] = entry.task_id
+            dispatch.add_done_callback(self._dispatch_done)
+
+    def _dispatch_done(self, dispatch: asyncio.Task) -> None:
+        self._pending.discard(self._dispatches.pop(dispatch, None))
+        if not dispatch.cancelled() and dispatch.exception():
+            logger.error(f"Failed to dispatch scheduled task: {dispatch.exception()}")
@@ -0,0 +1,205 @@
+"""
+Record Store
+记录存储 - 进程内共享、带二级索引的内存存储
+"""
+
+import base64
+import bisect
+import json
+import logging
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (created_at, record_id) - unique and totally ordered
+OrderKey = Tuple[Any, str]
+
+
+def _index_key(value: Any) -> Any:
+    """Normalize index values so that enum members and raw strings collide"""
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def encode_cursor(created_at: datetime, record_id: str) -> str:
+    """Encode a keyset position as an opaque, URL-safe cursor"""
+    raw = json.dumps([created_at.isoformat(), record_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> OrderKey:
+    """Decode a cursor produced by encode_cursor; raises ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, record_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(created_at), str(record_id))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class RecordStore:
+    """In-memory record store kept in created_at order with secondary indexes"""
+
+    def __init__(self, index_fields: Iterable[str] = ()):
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.index_fields = tuple(index_fields)
+        self._order: List[OrderKey] = []
+        self._indexes: Dict[str, Dict[Any, List[OrderKey]]] = {
+            field: {} for field in self.index_fields
+        }
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __contains__(self, record_id: str) -> bool:
+        return record_id in self.records
+
+    def get(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """Get record by ID"""
+        return self.records.get(record_id)
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Insert a new record and index it"""
+        record_id = record['id']
+        if record_id in self.records:
+            raise KeyError(f"Record {record_id} already exists")
+
+        self.records[record_id] = record
+        key = self._order_key(record)
+        bisect.insort(self._order, key)
+        for field in self.index_fields:
+            self._index_insert(field, record.get(field), key)
+
+    def update(self, record_id: str, **changes: Any) -> Optional[Dict[str, Any]]:
+        """Apply field changes to a record, keeping indexes consistent"""
+        record = self.records.get(record_id)
+        if record is None:
+            return None
+
+        key = self._order_key(record)
+        for field, value in changes.items():
+            if field in self._indexes:
+                old_value = record.get(field)
+                if _index_key(old_value) != _index_key(value):
+                    self._index_remove(field, old_value, key)
+                    self._index_insert(field, value, key)
+            record[field] = value
+        return record
+
+    def remove(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """Remove a record and drop it from all indexes"""
+        record = self.records.pop(record_id, None)
+        if record is None:
+            return None
+
+        key = self._order_key(record)
+        self._sorted_remove(self._order, key)
+        for field in self.index_fields:
+            self._index_remove(field, record.get(field), key)
+        return record
+
+    def clear(self) -> None:
+        """Drop all records"""
+        self.records.clear()
+        self._order.clear()
+        for index in self._indexes.values():
+            index.clear()
+
+    def count(self, **filters: Any) -> int:
+        """Count records matching equality filters"""
+        filters = {k: v for k, v in filters.items() if v is not None}
+        if not filters:
+            return len(self.records)
+        return sum(1 for _ in self._iter_matching(filters, descending=False))
+
+    def cursor_for(self, record: Dict[str, Any]) -> str:
+        """Get the cursor that continues a listing after this record"""
+        return encode_cursor(record['created_at'], record['id'])
+
+    def query(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        descending: bool = True,
+        after: Optional[OrderKey] = None,
+        **filters: Any
+    ) -> List[Dict[str, Any]]:
+        """Return a page of records matching equality filters, ordered by created_at
+
+        ``after`` is a keyset position (see decode_cursor); the page starts at the
+        first record strictly past it in iteration order, found by bisection.
+        """
+        filters = {k: v for k, v in filters.items() if v is not None}
+        skip = max(skip, 0)
+        limit = max(limit, 0)
+
+        page: List[Dict[str, Any]] = []
+        if limit == 0:
+            return page
+
+        for position, record in enumerate(self._iter_matching(filters, descending, after)):
+            if position < skip:
+                continue
+            page.append(record)
+            if len(page) >= limit:
+                break
+        return page
+
+    def _iter_matching(
+        self,
+        filters: Dict[str, Any],
+        descending: bool,
+        after: Optional[OrderKey] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Walk the smallest candidate list in order and check the remaining filters"""
+        candidates = self._order
+        residual = dict(filters)
+
+        indexed = [field for field in filters if field in self._indexes]
+        if indexed:
+            driver = min(
+                indexed,
+                key=lambda f: len(self._indexes[f].get(_index_key(filters[f]), ()))
+            )
+            candidates = self._indexes[driver].get(_index_key(filters[driver]), [])
+            residual.pop(driver)
+
+        residual = {field: _index_key(value) for field, value in residual.items()}
+        if descending:
+            stop = len(candidates) if after is None else bisect.bisect_left(candidates, after)
+            positions = range(stop - 1, -1, -1)
+        else:
+            start = 0 if after is None else bisect.bisect_right(candidates, after)
+            positions = range(start, len(candidates))
+
+        for position in positions:
+            record = self.records[candidates[position][1]]
+            if all(_index_key(record.get(f)) == v for f, v in residual.items()):
+                yield record
+
+    def _index_insert(self, field: str, value: Any, key: OrderKey) -> None:
+        bucket = self._indexes[field].setdefault(_index_key(value), [])
+        bisect.insort(bucket, key)
+
+    def _index_remove(self, field: str, value: Any, key: OrderKey) -> None:
+        index = self._indexes[field]
+        value = _index_key(value)
+        bucket = index.get(value)
+        if bucket is None:
+            return
+        self._sorted_remove(bucket, key)
+        if not bucket:
+            del index[value]
+
+    @staticmethod
+    def _sorted_remove(items: List[OrderKey], key: OrderKey) -> None:
+        position = bisect.bisect_left(items, key)
+        if position < len(items) and items[position] == key:
+            del items[position]
+
+    @staticmethod
+    def _order_key(record: Dict[str, Any]) -> OrderKey:
+        return (record['created_at'], record['id'])
@@ -0,0 +1,316 @@
+"""
+Task Event Log
+任务事件日志 - 追加写入的任务生命周期事件、分段文件与快照水位
+"""
+
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from ..models.task import TaskState, TriggerConfig
+
+logger = logging.getLogger(__name__)
+
+TASK_CREATED = 'task_created'
+TASK_UPDATED = 'task_updated'
+TASK_DELETED = 'task_deleted'
+
+# Lifecycle events and the state they move a task to
+STATE_TRANSITIONS = {
+    'execution_started': TaskState.EXECUTING,
+    'execution_completed': TaskState.COMPLETED,
+    'execution_failed': TaskState.ERROR,
+    'execution_retry_scheduled': TaskState.WAITING,
+    'execution_stopped': TaskState.WAITING,
+    'execution_interrupted': TaskState.WAITING
+}
+
+SEGMENT_PREFIX = 'events-'
+SEGMENT_SUFFIX = '.jsonl'
+WATERMARK_FILE = 'snapshot.json'
+
+DATETIME_FIELDS = ('timestamp', 'created_at', 'updated_at', 'next_run_at')
+
+
+def json_default(value: Any) -> Any:
+    """JSON encoder hook for event data holding datetimes, enums and models"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, BaseModel):
+        return value.dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def hydrate(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn task fields read back from JSON into their model types, in place"""
+    for field in DATETIME_FIELDS:
+        if isinstance(fields.get(field), str):
+            fields[field] = datetime.fromisoformat(fields[field])
+    if isinstance(fields.get('state'), str):
+        fields['state'] = TaskState(fields['state'])
+    if isinstance(fields.get('trigger_config'), dict):
+        fields['trigger_config'] = TriggerConfig(**fields['trigger_config'])
+    return fields
+
+
+def project(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Field changes an event makes to its task record"""
+    changes = {field: value for field, value in event['data'].items() if field != 'message'}
+    state = STATE_TRANSITIONS.get(event['type'])
+    if state is not None:
+        changes['state'] = state
+    if state is not None or event['type'] == TASK_UPDATED:
+        changes['updated_at'] = event['timestamp']
+    return changes
+
+
+class TaskEventLog:
+    """Append-only log of task lifecycle events
+
+    Every change to a task is one event with a global sequence number,
+    written as a JSON line to the current segment file. Writes that arrive
+    while a flush is in progress share it, as in the SQLite repository.
+    Once the task records up to some sequence number have been saved
+    elsewhere, ``mark_snapshot`` records that watermark and starts a new
+    segment; on open only the events after the watermark are returned for
+    replay. Older segments are kept, so a task's full history can always
+    be read back with ``read``.
+
+    Without a directory events are numbered but not written anywhere.
+    """
+
+    def __init__(self, directory: Optional[str] = None, fsync: bool = True):
+        self.directory = directory
+        self.fsync = fsync
+        self.seq = 0
+        self.watermark = 0
+        self._segment = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self.stats = {'appended': 0, 'flushes': 0, 'snapshots': 0, 'replayed': 0}
+        self.running = False
+
+    @property
+    def durable(self) -> bool:
+        return self.directory is not None
+
+    async def open(self, min_seq: int = 0) -> List[Dict[str, Any]]:
+        """Open the log; returns the events after the snapshot watermark, in order
+
+        ``min_seq`` is the highest sequence number already reflected in the
+        snapshot, so numbering never goes backwards if the log was removed.
+        """
+        if self.running:
+            return []
+
+        events: List[Dict[str, Any]] = []
+        if self.durable:
+            os.makedirs(self.directory, exist_ok=True)
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-events")
+            self.watermark = await self._run(self._read_watermark)
+            events = await self._run(self._read_since, self.watermark)
+            self._queue = asyncio.Queue()
+            self._writer_task = asyncio.create_task(self._writer_loop())
+            self.stats['replayed'] = len(events)
+            logger.info(f"Opened task event log at {self.directory}: {len(events)} events after snapshot {self.watermark}")
+
+        self.seq = max(self.watermark, min_seq, events[-1]['seq'] if events else 0)
+        self.running = True
+        return events
+
+    async def close(self) -> None:
+        if not self.running:
+            return
+
+        self.running = False
+        if self.durable:
+            await self._queue.join()
+            self._writer_task.cancel()
+            await asyncio.gather(self._writer_task, return_exceptions=True)
+            await self._run(self._close_segment)
+            self._executor.shutdown(wait=True)
+
+    def new_event(self, task_id: str, event_type: str, **data: Any) -> Dict[str, Any]:
+        """Number a new event; events are ordered by when this is called"""
+        self.seq += 1
+        return {
+            'seq': self.seq,
+            'timestamp': datetime.now(),
+            'task_id': task_id,
+            'type': event_type,
+            'data': data
+        }
+
+    async def append(self, event: Dict[str, Any]) -> None:
+        """Write an event; returns once it is flushed to the current segment"""
+        await self.append_many([event])
+
+    async def append_many(self, events: List[Dict[str, Any]]) -> None:
+        """Write events in order; they are queued together and share a flush"""
+        self.stats['appended'] += len(events)
+        if not self.durable or not events:
+            return
+        await self._submit(*[
+            ('event', event['seq'], json.dumps(event, default=json_default).encode() + b"\n")
+            for event in events
+        ])
+
+    async def mark_snapshot(self, seq: int) -> None:
+        """Record that every event up to seq is reflected in a saved snapshot"""
+        self.watermark = max(self.watermark, seq)
+        self.stats['snapshots'] += 1
+        if self.durable:
+            await self._submit(('watermark', seq, None))
+
+    async def read(self, task_id: str) -> List[Dict[str, Any]]:
+        """Every event of one task still on disk, oldest first"""
+        if not self.durable:
+            return []
+        return await self._run(self._read_task, task_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'durable': self.durable,
+            'seq': self.seq,
+            'watermark': self.watermark,
+            'pending_writes': self._queue.qsize() if self._queue else 0,
+            **self.stats
+        }
+
+    # ------------------------------------------------------------------
+    # Writer
+    # ------------------------------------------------------------------
+
+    async def _submit(self, *items: Tuple[str, int, Optional[bytes]]) -> None:
+        if not self.running:
+            raise RuntimeError("Task event log is not open")
+        loop = asyncio.get_running_loop()
+        futures = []
+        for item in items:
+            future = loop.create_future()
+            self._queue.put_nowait((item, future))
+            futures.append(future)
+        await asyncio.gather(*futures)
+
+    async def _writer_loop(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                await self._run(self._write_batch, [item for item, _ in batch])
+                error = None
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} task events: {e}")
+                error = e
+
+            for _, future in batch:
+                if not future.done():
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(error)
+                self._queue.task_done()
+
+    def _write_batch(self, items: List[Tuple[str, int, Optional[bytes]]]) -> None:
+        for kind, seq, line in items:
+            if kind == 'event':
+                if self._segment is None:
+                    # Segments are named after the first event they hold
+                    self._segment = open(self._segment_path(seq), 'ab')
+                self._segment.write(line)
+            else:
+                self._close_segment()
+                self._write_watermark(seq)
+        if self._segment is not None:
+            self._sync(self._segment)
+        self.stats['flushes'] += 1
+
+    def _close_segment(self) -> None:
+        if self._segment is not None:
+            self._sync(self._segment)
+            self._segment.close()
+            self._segment = None
+
+    def _sync(self, handle) -> None:
+        handle.flush()
+        if self.fsync:
+            os.fsync(handle.fileno())
+
+    def _write_watermark(self, seq: int) -> None:
+        path = os.path.join(self.directory, WATERMARK_FILE)
+        with open(path + '.tmp', 'w') as handle:
+            json.dump({'seq': seq, 'written_at': datetime.now().isoformat()}, handle)
+            self._sync(handle)
+        os.replace(path + '.tmp', path)
+
+    # ------------------------------------------------------------------
+    # Reading (runs on the executor thread)
+    # ------------------------------------------------------------------
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _segment_path(self, first_seq: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{first_seq:012d}{SEGMENT_SUFFIX}")
+
+    def _segments(self) -> List[Tuple[int, str]]:
+        """(first seq, path) of every segment, oldest first"""
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                first_seq = int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+                segments.append((first_seq, os.path.join(self.directory, name)))
+        return sorted(segments)
+
+    def _read_watermark(self) -> int:
+        path = os.path.join(self.directory, WATERMARK_FILE)
+        if not os.path.exists(path):
+            return 0
+        with open(path) as handle:
+            return int(json.load(handle)['seq'])
+
+    def _read_since(self, after_seq: int) -> List[Dict[str, Any]]:
+        segments = self._segments()
+        events = []
+        for i, (_, path) in enumerate(segments):
+            # Skip segments that end at or before the watermark
+            if i + 1 < len(segments) and segments[i + 1][0] - 1 <= after_seq:
+                continue
+            events.extend(event for event in self._read_segment(path) if event['seq'] > after_seq)
+        return events
+
+    def _read_task(self, task_id: str) -> List[Dict[str, Any]]:
+        return [
+            event
+            for _, path in self._segments()
+            for event in self._read_segment(path)
+            if event['task_id'] == task_id
+        ]
+
+    @staticmethod
+    def _read_segment(path: str) -> List[Dict[str, Any]]:
+        events = []
+        with open(path, 'rb') as handle:
+            for line in handle:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # A write torn by a crash; nothing after it was acknowledged
+                    logger.warning(f"Ignoring truncated event in {path}")
+                    break
+                hydrate(event)
+                hydrate(event['data'])
+                events.append(event)
+        return events
@@ -0,0 +1,223 @@
+"""
+Task Log Store
+任务日志存储 - 每个任务固定大小的内存环形缓冲区，旧日志压缩分段写入磁盘
+"""
+
+import asyncio
+import bisect
+import gzip
+import json
+import logging
+import os
+import shutil
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = '.jsonl.gz'
+COMPRESS_LEVEL = 6
+
+
+class TaskLog:
+    """Execution log entries of one task that are still in memory"""
+
+    __slots__ = ('entries', 'count')
+
+    def __init__(self, entries: Optional[List[Dict[str, Any]]] = None, count: int = 0):
+        self.entries: Deque[Dict[str, Any]] = deque(entries or ())
+        # Total entries ever logged; the in-memory ones are the last of them
+        self.count = max(count, len(self.entries))
+
+    @property
+    def first_index(self) -> int:
+        return self.count - len(self.entries)
+
+
+class TaskLogStore:
+    """Bounded execution logs with older entries spilled to disk
+
+    Each task keeps at most ``2 * ring_size`` entries in memory. When that
+    fills up, the oldest ``ring_size`` are written to a gzip-compressed
+    JSON-lines segment under ``directory/<task_id>/``, named after the
+    index of its first entry, so reading any page touches only the
+    segments that overlap it. Without a directory spilled entries are
+    dropped.
+    """
+
+    def __init__(self, directory: Optional[str] = None, ring_size: int = 100):
+        self.directory = directory
+        self.ring_size = max(ring_size, 1)
+        self.logs: Dict[str, TaskLog] = {}
+        # Spilled entries whose segment is still being written, by task and first index
+        self._spilling: Dict[str, Dict[int, List[Dict[str, Any]]]] = {}
+        self._writes: Set[asyncio.Task] = set()
+        # Sorted segment start indexes, listed lazily per task
+        self._segments: Dict[str, List[int]] = {}
+        self.stats = {'appended': 0, 'spilled_entries': 0, 'segments_written': 0, 'segments_read': 0}
+
+    def load(self, task_id: str, entries: List[Dict[str, Any]], count: int) -> None:
+        """Restore the in-memory part of a task's log from a snapshot"""
+        self.logs[task_id] = TaskLog(entries, count)
+
+    def append(self, task_id: str, event: str, message: str, timestamp: str) -> Dict[str, Any]:
+        """Log an entry; returns it with its index"""
+        log = self.logs.get(task_id)
+        if log is None:
+            log = self.logs[task_id] = TaskLog()
+        entry = {'index': log.count, 'timestamp': timestamp, 'event': event, 'message': message}
+        log.entries.append(entry)
+        log.count += 1
+        self.stats['appended'] += 1
+        if len(log.entries) >= 2 * self.ring_size:
+            self._spill(task_id, log)
+        return entry
+
+    def count(self, task_id: str) -> int:
+        log = self.logs.get(task_id)
+        return log.count if log else 0
+
+    def tail(self, task_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The latest entries, at most ring_size of them by default"""
+        log = self.logs.get(task_id)
+        if log is None:
+            return []
+        limit = self.ring_size if limit is None else limit
+        if limit <= 0:
+            return []
+        return list(log.entries)[-limit:]
+
+    def unspilled(self, task_id: str) -> List[Dict[str, Any]]:
+        """Every entry still in memory; these go into task snapshots"""
+        log = self.logs.get(task_id)
+        return list(log.entries) if log else []
+
+    async def read(self, task_id: str, start: int, limit: int) -> List[Dict[str, Any]]:
+        """Entries [start, start + limit), from memory and spilled segments"""
+        log = self.logs.get(task_id)
+        if log is None or limit <= 0:
+            return []
+        start = max(start, 0)
+        end = min(start + limit, log.count)
+        if start >= end:
+            return []
+
+        entries: List[Dict[str, Any]] = []
+        if start < log.first_index:
+            entries = await self._read_spilled(task_id, start, min(end, log.first_index))
+        if end > log.first_index:
+            offset = log.first_index
+            entries.extend(list(log.entries)[max(start - offset, 0):end - offset])
+        return entries
+
+    def forget(self, task_id: str) -> None:
+        """Drop a task's log from memory"""
+        self.logs.pop(task_id, None)
+        self._segments.pop(task_id, None)
+
+    async def drop(self, task_id: str) -> None:
+        """Forget a task's log and remove its segments"""
+        self.forget(task_id)
+        if self.directory:
+            await self.flush()
+            self._spilling.pop(task_id, None)
+            await asyncio.to_thread(shutil.rmtree, self._task_dir(task_id), True)
+
+    async def flush(self) -> None:
+        """Wait for segments being written"""
+        while self._writes:
+            await asyncio.gather(*list(self._writes), return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'tasks': len(self.logs),
+            'entries_in_memory': sum(len(log.entries) for log in self.logs.values()),
+            'segment_writes_pending': len(self._writes),
+            **self.stats
+        }
+
+    # ------------------------------------------------------------------
+    # Spilling
+    # ------------------------------------------------------------------
+
+    def _spill(self, task_id: str, log: TaskLog) -> None:
+        first_index = log.first_index
+        chunk = [log.entries.popleft() for _ in range(self.ring_size)]
+        self.stats['spilled_entries'] += len(chunk)
+        if not self.directory:
+            return
+
+        self._spilling.setdefault(task_id, {})[first_index] = chunk
+        write = asyncio.create_task(asyncio.to_thread(self._write_segment, task_id, first_index, chunk))
+        self._writes.add(write)
+        write.add_done_callback(lambda done: self._spill_done(task_id, first_index, done))
+
+    def _spill_done(self, task_id: str, first_index: int, write: asyncio.Task) -> None:
+        self._writes.discard(write)
+        if write.cancelled() or write.exception() is not None:
+            error = 'cancelled' if write.cancelled() else write.exception()
+            logger.error(f"Failed to spill execution log of task {task_id}: {error}")
+            return
+        pending = self._spilling.get(task_id)
+        if pending is not None:
+            pending.pop(first_index, None)
+            if not pending:
+                del self._spilling[task_id]
+        starts = self._segments.get(task_id)
+        if starts is not None and first_index not in starts:
+            bisect.insort(starts, first_index)
+        self.stats['segments_written'] += 1
+
+    def _write_segment(self, task_id: str, first_index: int, chunk: List[Dict[str, Any]]) -> None:
+        directory = self._task_dir(task_id)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{first_index:012d}{SEGMENT_SUFFIX}")
+        data = b''.join(json.dumps(entry).encode() + b"\n" for entry in chunk)
+        with gzip.open(path + '.tmp', 'wb', compresslevel=COMPRESS_LEVEL) as handle:
+            handle.write(data)
+        os.replace(path + '.tmp', path)
+
+    # ------------------------------------------------------------------
+    # Reading spilled entries
+    # ------------------------------------------------------------------
+
+    async def _read_spilled(self, task_id: str, start: int, end: int) -> List[Dict[str, Any]]:
+        if not self.directory:
+            return []
+        pending = self._spilling.get(task_id, {})
+        starts = self._segments.get(task_id)
+        if starts is None:
+            starts = self._segments[task_id] = await asyncio.to_thread(self._list_segments, task_id)
+        starts = sorted(set(starts) | set(pending))
+
+        entries: List[Dict[str, Any]] = []
+        # The segment holding `start` is the last one that begins at or before it
+        i = max(bisect.bisect_right(starts, start) - 1, 0)
+        while i < len(starts) and starts[i] < end:
+            first_index = starts[i]
+            if first_index in pending:
+                chunk = pending[first_index]
+            else:
+                chunk = await asyncio.to_thread(self._read_segment, task_id, first_index)
+                self.stats['segments_read'] += 1
+            entries.extend(entry for entry in chunk if start <= entry['index'] < end)
+            i += 1
+        return entries
+
+    def _list_segments(self, task_id: str) -> List[int]:
+        directory = self._task_dir(task_id)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            int(name[:-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _read_segment(self, task_id: str, first_index: int) -> List[Dict[str, Any]]:
+        path = os.path.join(self._task_dir(task_id), f"{first_index:012d}{SEGMENT_SUFFIX}")
+        with gzip.open(path, 'rb') as handle:
+            return [json.loads(line) for line in handle]
+
+    def _task_dir(self, task_id: str) -> str:
+        return os.path.join(self.directory, task_id)
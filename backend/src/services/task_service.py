@@ -3,136 +3,671 @@ Task Service
 任务服务
 """
 
+import asyncio
 import logging
-from typing import List, Optional
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 from datetime import datetime
 import uuid
 
-from ..models.task import TaskCreate, TaskResponse, TaskState, TaskUpdate
+from ..models.task import TaskBatchItem, TaskCreate, TaskResponse, TaskState, TaskUpdate
+from .execution_engine import ExecutionEngine
+from .repository import SQLiteRepository
+from .response_cache import CachedResponse, ResponseCache, Version
+from .scheduler import TaskScheduler, validate_trigger
+from .store import RecordStore, decode_cursor
+from .task_events import TASK_CREATED, TASK_DELETED, TASK_UPDATED, TaskEventLog, hydrate, project
+from .task_logs import TaskLogStore
+from .task_stream import TaskEventBroker, TaskSubscription
 
 logger = logging.getLogger(__name__)
 
+# Performs the actual work of a task; receives the stored task record and
+# a progress callback taking (node_id, status, finished, total)
+TaskRunner = Callable[..., Awaitable[Any]]
+
+
+class TaskAlreadyActive(Exception):
+    """Raised when a task asked to execute is already queued or running"""
+    
+    def __init__(self, task_id: str):
+        super().__init__(f"Task {task_id} is already queued or running")
+        self.task_id = task_id
+
 
 class TaskService:
-    """Service for managing tasks"""
+    """Service for managing tasks
+    
+    Tasks are event sourced: every change is an event appended to the task
+    event log and projected onto the record in the store, so the current
+    state is a dict lookup. With a durable log the repository only holds
+    snapshots, written every ``snapshot_interval`` events; on startup the
+    snapshot is loaded and the events after it are replayed. Without one,
+    changed records are written through to the repository as before.
+    
+    Execution logs live in the task log store, which keeps a bounded tail
+    of each task in memory and spills the rest to disk; task responses
+    carry the tail and ``get_task_log`` pages through the whole log.
     
-    def __init__(self):
-        # In-memory storage for now (will be replaced with database in later stages)
-        self.tasks: dict = {}
+    Each event is also published as a delta to the task event broker,
+    which serves the SSE streams.
+    """
+    
+    def __init__(
+        self,
+        store: Optional[RecordStore] = None,
+        repository: Optional[SQLiteRepository] = None,
+        events: Optional[TaskEventLog] = None,
+        logs: Optional[TaskLogStore] = None,
+        stream: Optional[TaskEventBroker] = None,
+        snapshot_interval: int = 1000,
+        responses: Optional[ResponseCache] = None
+    ):
+        # Shared in-memory store, indexed by workflow and state
+        self.store = store or RecordStore(index_fields=('workflow_id', 'state'))
+        # Optional persistent repository; the store stays the read path
+        self.repository = repository
+        self.events = events or TaskEventLog()
+        self.logs = logs or TaskLogStore()
+        self.stream = stream or TaskEventBroker()
+        self.snapshot_interval = max(snapshot_interval, 1)
+        # Serialized GET responses; a task's version is its last event's seq,
+        # prefixed with a per-process epoch when the seq is not durable and
+        # could be handed out again after a restart
+        self.responses = responses or ResponseCache()
+        self.epoch = None if self.events.durable else uuid.uuid4().hex[:8]
+        # Tasks changed or deleted since the last snapshot
+        self._dirty: Set[str] = set()
+        # First seq of each batch being appended and not yet projected
+        self._unapplied: Set[int] = set()
+        self._snapshot_lock = asyncio.Lock()
+        # Execution engine, scheduler and task runner are attached in lifespan()
+        self.engine: Optional[ExecutionEngine] = None
+        self.scheduler: Optional[TaskScheduler] = None
+        self.runner: Optional[TaskRunner] = None
+    
+    async def initialize(self) -> None:
+        """Load the task snapshot and replay the events logged after it"""
+        snapshot_seq = 0
+        if self.repository:
+            for task_data in await self.repository.load_all('tasks'):
+                hydrate(task_data)
+                entries = task_data.pop('execution_log', None) or []
+                task_data['log_count'] = max(task_data.get('log_count', 0), len(entries))
+                self.logs.load(task_data['id'], entries, task_data['log_count'])
+                task_data.setdefault('event_seq', 0)
+                snapshot_seq = max(snapshot_seq, task_data['event_seq'])
+                self.store.add(task_data)
+        
+        replay = await self.events.open(min_seq=snapshot_seq)
+        for event in replay:
+            self._apply(event)
+        self.stream.reset(self.events.seq)
+        
+        for task_id in [task_id for task_id, task in self.store.records.items() if task['state'] == TaskState.EXECUTING]:
+            # The process that was running it is gone
+            await self._record(task_id, 'execution_interrupted', message='Task execution interrupted by restart')
+        
+        logger.info(f"Loaded {len(self.store)} tasks ({len(replay)} events replayed)")
+    
+    async def cleanup(self) -> None:
+        """Snapshot the current state and close the event log"""
+        self.stream.close()
+        await self.snapshot()
+        await self.events.close()
+        await self.logs.flush()
     
     async def create_task(self, task: TaskCreate) -> TaskResponse:
         """Create a new task"""
+        validate_trigger(task.trigger_config)
         task_id = str(uuid.uuid4())
         now = datetime.now()
+        next_run_at = self.scheduler.next_run(task.trigger_config) if self.scheduler else None
         
-        task_data = {
-            'id': task_id,
-            'workflow_id': task.workflow_id,
-            'trigger_config': task.trigger_config,
-            'state': TaskState.WAITING,
-            'created_at': now,
-            'updated_at': now,
-            'execution_log': []
-        }
-        
-        self.tasks[task_id] = task_data
+        task_data = await self._record(
+            task_id,
+            TASK_CREATED,
+            workflow_id=task.workflow_id,
+            trigger_config=task.trigger_config,
+            state=TaskState.WAITING,
+            created_at=now,
+            updated_at=now,
+            next_run_at=next_run_at,
+            execution_count=0
+        )
+        # Only a recorded task may fire
+        if self.scheduler:
+            self.scheduler.schedule(task_id, task.trigger_config, next_run_at=next_run_at)
         
         logger.info(f"Created task: {task_id}")
-        return TaskResponse(**task_data)
+        return self._response(task_data)
+    
+    async def create_tasks(self, tasks: List[TaskCreate], atomic: bool = False) -> List[TaskBatchItem]:
+        """Create many tasks in one pass
+        
+        Every task is validated, and its first fire time worked out, before
+        any is created; the valid ones are then applied to the store together
+        and share one event log flush, and are only scheduled once recorded.
+        With atomic set, a single invalid task means none are created.
+        """
+        invalid: Dict[int, str] = {}
+        next_runs: Dict[int, Optional[datetime]] = {}
+        for index, task in enumerate(tasks):
+            try:
+                validate_trigger(task.trigger_config)
+                next_runs[index] = self.scheduler.next_run(task.trigger_config) if self.scheduler else None
+            except ValueError as e:
+                invalid[index] = str(e)
+        if atomic and invalid:
+            return [
+                TaskBatchItem(index=index, status='invalid', error=invalid.get(index, 'Another task in the batch is invalid'))
+                for index in range(len(tasks))
+            ]
+        
+        now = datetime.now()
+        entries = []
+        for index, next_run_at in next_runs.items():
+            task = tasks[index]
+            entries.append((str(uuid.uuid4()), TASK_CREATED, {
+                'workflow_id': task.workflow_id,
+                'trigger_config': task.trigger_config,
+                'state': TaskState.WAITING,
+                'created_at': now,
+                'updated_at': now,
+                'next_run_at': next_run_at,
+                'execution_count': 0
+            }))
+        records = await self._record_many(entries)
+        if self.scheduler:
+            for task_id, _, data in entries:
+                self.scheduler.schedule(task_id, data['trigger_config'], next_run_at=data['next_run_at'])
+        created = iter(records)
+        
+        results = []
+        for index in range(len(tasks)):
+            if index in invalid:
+                results.append(TaskBatchItem(index=index, status='invalid', error=invalid[index]))
+            else:
+                task_data = next(created)
+                results.append(TaskBatchItem(
+                    index=index,
+                    id=task_data['id'],
+                    status='created',
+                    task=self._response(task_data, include_logs=False)
+                ))
+        logger.info(f"Created {len(entries)} tasks in one batch ({len(invalid)} invalid)")
+        return results
+    
+    def select_tasks(
+        self,
+        task_ids: Optional[List[str]] = None,
+        workflow_id: Optional[str] = None,
+        state: Optional[TaskState] = None
+    ) -> List[Tuple[str, Optional[dict]]]:
+        """Resolve a bulk selection to (task ID, record or None if unknown)
+        
+        Tasks are picked by ID, or else by workflow and/or state from the
+        secondary indexes, oldest first.
+        """
+        if task_ids is not None:
+            if workflow_id is not None or state is not None:
+                raise ValueError("Select tasks by task_ids or by workflow_id/state, not both")
+            return [(task_id, self.store.get(task_id)) for task_id in dict.fromkeys(task_ids)]
+        if workflow_id is None and state is None:
+            raise ValueError("Select tasks by task_ids, workflow_id or state")
+        matching = self.store.query(
+            limit=len(self.store),
+            descending=False,
+            workflow_id=workflow_id,
+            state=state
+        )
+        return [(task_data['id'], task_data) for task_data in matching]
+    
+    async def execute_tasks(
+        self,
+        task_ids: Optional[List[str]] = None,
+        workflow_id: Optional[str] = None,
+        state: Optional[TaskState] = None,
+        priority: int = 0
+    ) -> List[TaskBatchItem]:
+        """Queue (or start) many tasks; their events share one flush"""
+        results = []
+        entries = []
+        for index, (task_id, task_data) in enumerate(self.select_tasks(task_ids, workflow_id, state)):
+            if task_data is None:
+                results.append(TaskBatchItem(index=index, id=task_id, status='not_found'))
+                continue
+            if self.engine:
+                if not self.engine.submit(task_id, priority=priority):
+                    results.append(TaskBatchItem(index=index, id=task_id, status='already_active'))
+                    continue
+                entries.append((task_id, 'execution_queued', {'message': 'Task queued for execution'}))
+                results.append(TaskBatchItem(index=index, id=task_id, status='queued'))
+            else:
+                entries.append((task_id, 'execution_started', {'message': 'Task execution initiated'}))
+                results.append(TaskBatchItem(index=index, id=task_id, status='started'))
+        await self._record_many(entries)
+        
+        logger.info(f"Queued execution of {len(entries)} tasks in one batch")
+        return results
+    
+    async def delete_tasks(
+        self,
+        task_ids: Optional[List[str]] = None,
+        workflow_id: Optional[str] = None,
+        state: Optional[TaskState] = None
+    ) -> List[TaskBatchItem]:
+        """Delete many tasks; their events share one flush"""
+        results = []
+        entries = []
+        for index, (task_id, task_data) in enumerate(self.select_tasks(task_ids, workflow_id, state)):
+            if task_data is None:
+                results.append(TaskBatchItem(index=index, id=task_id, status='not_found'))
+                continue
+            if self.engine:
+                self.engine.cancel(task_id)
+            if self.scheduler:
+                self.scheduler.unschedule(task_id)
+            entries.append((task_id, TASK_DELETED, {}))
+            results.append(TaskBatchItem(index=index, id=task_id, status='deleted'))
+        await self._record_many(entries)
+        await asyncio.gather(*(self.logs.drop(task_id) for task_id, _, _ in entries))
+        
+        logger.info(f"Deleted {len(entries)} tasks in one batch")
+        return results
     
     async def get_task(self, task_id: str) -> Optional[TaskResponse]:
-        """Get task by ID"""
-        task_data = self.tasks.get(task_id)
+        """Get task by ID, with the latest execution log entries"""
+        task_data = self.store.get(task_id)
         if task_data:
-            return TaskResponse(**task_data)
+            return self._response(task_data)
         return None
     
+    def task_version(self, task_id: str) -> Optional[Version]:
+        """Current version of a task, for conditional requests"""
+        task_data = self.store.get(task_id)
+        return self._version(task_data) if task_data else None
+    
+    def get_task_response(self, task_id: str) -> Optional[CachedResponse]:
+        """Serialized TaskResponse of a task, cached until it changes"""
+        task_data = self.store.get(task_id)
+        if task_data is None:
+            return None
+        version = self._version(task_data)
+        cached = self.responses.get(task_id, version)
+        if cached is None:
+            body = self._response(task_data).json(separators=(',', ':'), ensure_ascii=False).encode()
+            cached = self.responses.put(task_id, version, body)
+        return cached
+    
+    def _version(self, task_data: dict) -> Version:
+        if self.epoch is None:
+            return task_data['event_seq']
+        return f"{self.epoch}.{task_data['event_seq']}"
+    
+    async def get_task_log(
+        self,
+        task_id: str,
+        start: Optional[int] = None,
+        limit: int = 100
+    ) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        """A page of a task's execution log, oldest entry first
+        
+        Returns the entries from index ``start`` (or the last ``limit``
+        entries when start is None) and the total number of entries.
+        """
+        if task_id not in self.store:
+            return None
+        total = self.logs.count(task_id)
+        if start is None:
+            start = max(total - limit, 0)
+        return await self.logs.read(task_id, start, limit), total
+    
     async def list_tasks(
         self, 
         workflow_id: Optional[str] = None,
         state: Optional[str] = None,
         skip: int = 0, 
-        limit: int = 100
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include_logs: bool = False
     ) -> List[TaskResponse]:
-        """List tasks with optional filtering"""
-        tasks = list(self.tasks.values())
+        """List tasks with optional filtering, newest first
         
-        # Apply filters
-        if workflow_id:
-            tasks = [t for t in tasks if t['workflow_id'] == workflow_id]
-        if state:
-            tasks = [t for t in tasks if t['state'] == state]
-        
-        # Sort by creation time
-        tasks.sort(key=lambda x: x['created_at'], reverse=True)
-        
-        # Apply pagination
-        paginated = tasks[skip:skip + limit]
-        return [TaskResponse(**task) for task in paginated]
+        Pass the cursor of the last task of the previous page to continue
+        the listing without re-walking the earlier pages. Execution logs
+        are left out unless include_logs is set.
+        """
+        # Filters are served from the secondary indexes, newest first
+        paginated = self.store.query(
+            skip=skip,
+            limit=limit,
+            after=decode_cursor(cursor) if cursor else None,
+            workflow_id=workflow_id or None,
+            state=state or None
+        )
+        return [self._response(task, include_logs) for task in paginated]
     
     async def update_task(self, task_id: str, task_update: TaskUpdate) -> Optional[TaskResponse]:
         """Update task"""
-        if task_id not in self.tasks:
+        if task_id not in self.store:
             return None
         
-        task_data = self.tasks[task_id]
-        
         # Update fields
+        changes = {}
         if task_update.trigger_config is not None:
-            task_data['trigger_config'] = task_update.trigger_config
+            validate_trigger(task_update.trigger_config)
+            changes['trigger_config'] = task_update.trigger_config
+            changes['execution_count'] = 0
+            if self.scheduler:
+                changes['next_run_at'] = self.scheduler.next_run(task_update.trigger_config)
         if task_update.state is not None:
-            task_data['state'] = task_update.state
+            changes['state'] = task_update.state
         
-        task_data['updated_at'] = datetime.now()
+        task_data = await self._record(task_id, TASK_UPDATED, **changes)
+        if self.scheduler and task_update.trigger_config is not None:
+            self.scheduler.schedule(task_id, task_update.trigger_config, next_run_at=changes['next_run_at'])
         
         logger.info(f"Updated task: {task_id}")
-        return TaskResponse(**task_data)
+        return self._response(task_data)
     
-    async def execute_task(self, task_id: str) -> bool:
-        """Execute a task"""
-        if task_id not in self.tasks:
+    async def execute_task(self, task_id: str, priority: int = 0) -> bool:
+        """Execute a task
+        
+        With an execution engine attached the task is queued and runs on the
+        worker pool; higher priority tasks are picked up first. Returns False
+        if the task does not exist and raises TaskAlreadyActive if it is
+        already queued or running.
+        """
+        task_data = self.store.get(task_id)
+        if task_data is None:
             return False
         
-        task_data = self.tasks[task_id]
-        task_data['state'] = TaskState.EXECUTING
-        task_data['updated_at'] = datetime.now()
+        if self.engine:
+            if not self.engine.submit(task_id, priority=priority):
+                raise TaskAlreadyActive(task_id)
+            await self._record(task_id, 'execution_queued', message='Task queued for execution')
+            logger.info(f"Queued execution of task: {task_id}")
+            return True
         
-        # Add execution log entry
-        task_data['execution_log'].append({
-            'timestamp': datetime.now().isoformat(),
-            'event': 'execution_started',
-            'message': 'Task execution initiated'
-        })
+        await self._record(task_id, 'execution_started', message='Task execution initiated')
         
         logger.info(f"Started execution of task: {task_id}")
         return True
     
     async def stop_task(self, task_id: str) -> bool:
-        """Stop a running task"""
-        if task_id not in self.tasks:
+        """Stop a queued or running task"""
+        task_data = self.store.get(task_id)
+        if task_data is None:
             return False
         
-        task_data = self.tasks[task_id]
-        if task_data['state'] != TaskState.EXECUTING:
+        cancelled = self.engine.cancel(task_id) if self.engine else False
+        if not cancelled and task_data['state'] != TaskState.EXECUTING:
             return False
         
-        task_data['state'] = TaskState.WAITING
-        task_data['updated_at'] = datetime.now()
-        
-        # Add execution log entry
-        task_data['execution_log'].append({
-            'timestamp': datetime.now().isoformat(),
-            'event': 'execution_stopped',
-            'message': 'Task execution stopped by user'
-        })
+        await self._record(task_id, 'execution_stopped', message='Task execution stopped by user')
         
         logger.info(f"Stopped execution of task: {task_id}")
         return True
     
+    # ------------------------------------------------------------------
+    # Execution engine callbacks
+    # ------------------------------------------------------------------
+    
+    async def run_task(self, task_id: str) -> Any:
+        """Run the work of a task; called by the execution engine"""
+        task_data = self.store.get(task_id)
+        if task_data is None:
+            raise LookupError(f"Task {task_id} no longer exists")
+        if self.runner is None:
+            return None
+        return await self.runner(task_data, progress=partial(self.report_progress, task_id))
+    
+    def report_progress(self, task_id: str, node_id: str, status: str, finished: int, total: int) -> None:
+        """Publish workflow progress of a running task; not logged"""
+        task_data = self.store.get(task_id)
+        if task_data is None:
+            return
+        self.stream.publish(task_id, task_data['workflow_id'], 'progress', {
+            'task_id': task_id,
+            'node_id': node_id,
+            'status': status,
+            'finished': finished,
+            'total': total
+        })
+    
+    def is_task_active(self, task_id: str) -> bool:
+        """Check whether a task is queued or running; used by the scheduler"""
+        if self.engine:
+            return self.engine.is_active(task_id)
+        task_data = self.store.get(task_id)
+        return task_data is not None and task_data['state'] == TaskState.EXECUTING
+    
+    async def on_trigger_fired(
+        self,
+        task_id: str,
+        next_run_at: Optional[datetime],
+        execution_count: int
+    ) -> None:
+        """Record a scheduler fire and start the task"""
+        task_data = self.store.get(task_id)
+        if task_data is None:
+            return
+        trigger_type = task_data['trigger_config'].type.value
+        await self._record(
+            task_id,
+            'trigger_fired',
+            message=f'{trigger_type} trigger fired (execution {execution_count})',
+            next_run_at=next_run_at,
+            execution_count=execution_count
+        )
+        try:
+            await self.execute_task(task_id)
+        except TaskAlreadyActive:
+            logger.info(f"Task {task_id} is still active; skipping this {trigger_type} fire")
+    
+    async def on_task_started(self, task_id: str, attempt: int) -> None:
+        if task_id not in self.store:
+            return
+        message = 'Task execution initiated'
+        if attempt:
+            message = f'Task execution initiated (retry {attempt})'
+        await self._record(task_id, 'execution_started', message=message)
+        logger.info(f"Started execution of task: {task_id}")
+    
+    async def on_task_completed(self, task_id: str, result: Any) -> None:
+        if task_id not in self.store:
+            return
+        await self._record(task_id, 'execution_completed', message='Task execution completed')
+        logger.info(f"Completed execution of task: {task_id}")
+    
+    async def on_task_failed(self, task_id: str, error: BaseException, will_retry: bool) -> None:
+        if task_id not in self.store:
+            return
+        if will_retry:
+            await self._record(task_id, 'execution_retry_scheduled', message=f'Task execution failed, retrying: {error}')
+        else:
+            await self._record(task_id, 'execution_failed', message=f'Task execution failed: {error}')
+    
     async def delete_task(self, task_id: str) -> bool:
         """Delete task"""
-        if task_id in self.tasks:
-            del self.tasks[task_id]
-            logger.info(f"Deleted task: {task_id}")
-            return True
-        return False
\ No newline at end of file
+        if task_id not in self.store:
+            return False
+        if self.engine:
+            self.engine.cancel(task_id)
+        if self.scheduler:
+            self.scheduler.unschedule(task_id)
+        await self._record(task_id, TASK_DELETED)
+        await self.logs.drop(task_id)
+        logger.info(f"Deleted task: {task_id}")
+        return True
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'tasks': len(self.store),
+            'unsnapshotted_tasks': len(self._dirty),
+            'events': self.events.get_stats(),
+            'logs': self.logs.get_stats(),
+            'stream': self.stream.get_stats()
+        }
+    
+    # ------------------------------------------------------------------
+    # Event sourcing
+    # ------------------------------------------------------------------
+    
+    async def _record(self, task_id: str, event_type: str, **data: Any) -> Optional[dict]:
+        """Append an event, project it onto the task and make it durable"""
+        return (await self._record_many([(task_id, event_type, data)]))[0]
+    
+    async def _record_many(self, entries: List[Tuple[str, str, Dict[str, Any]]]) -> List[Optional[dict]]:
+        """Append (task ID, event type, data) events and make them durable together
+        
+        The events are projected onto the store and published only once the
+        log has accepted them, so a failed append leaves no trace in memory.
+        The whole batch is projected without an await in between, so no
+        other coroutine sees it half applied.
+        """
+        events = [self.events.new_event(task_id, event_type, **data) for task_id, event_type, data in entries]
+        if not events:
+            return []
+        
+        self._unapplied.add(events[0]['seq'])
+        try:
+            await self.events.append_many(events)
+        finally:
+            self._unapplied.discard(events[0]['seq'])
+        
+        records = []
+        for event in events:
+            workflow_id = (self.store.get(event['task_id']) or event['data']).get('workflow_id')
+            records.append(self._apply(event))
+            self._publish(event, workflow_id)
+        
+        if self.events.durable:
+            due = self.events.seq - self.events.watermark >= self.snapshot_interval
+            if due and self.repository and not self._snapshot_lock.locked():
+                await self.snapshot()
+        elif self.repository:
+            # Nothing to replay from, so write the records through
+            latest = {event['task_id']: task_data for event, task_data in zip(events, records)}
+            self._dirty.difference_update(latest)
+            await self.repository.write_many(
+                'tasks',
+                [self._snapshot_record(task_data) for task_data in latest.values() if task_data is not None],
+                [task_id for task_id, task_data in latest.items() if task_data is None]
+            )
+        return records
+    
+    def _apply(self, event: Dict[str, Any]) -> Optional[dict]:
+        """Project one event onto the store; O(1) per event"""
+        task_id = event['task_id']
+        task_data = self.store.get(task_id)
+        
+        if event['type'] == TASK_CREATED:
+            if task_data is not None:
+                return task_data
+            task_data = {
+                'id': task_id,
+                **event['data'],
+                'log_count': 0,
+                'event_seq': event['seq']
+            }
+            self.store.add(task_data)
+            self._dirty.add(task_id)
+            return task_data
+        
+        if task_data is None or event['seq'] <= task_data['event_seq']:
+            # Already part of the snapshot, or for a task deleted since
+            return task_data
+        
+        self._dirty.add(task_id)
+        self.responses.invalidate(task_id)
+        if event['type'] == TASK_DELETED:
+            self.store.remove(task_id)
+            self.logs.forget(task_id)
+            return None
+        
+        changes = project(event)
+        if 'message' in event['data']:
+            self.logs.append(task_id, event['type'], event['data']['message'], event['timestamp'].isoformat())
+            changes['log_count'] = self.logs.count(task_id)
+        return self.store.update(task_id, event_seq=event['seq'], **changes)
+    
+    def subscribe(
+        self,
+        task_id: Optional[str] = None,
+        workflow_id: Optional[str] = None,
+        last_event_id: Optional[str] = None
+    ) -> Tuple[TaskSubscription, List[Dict[str, Any]]]:
+        """Subscribe to task deltas
+        
+        Returns the subscription and the deltas to send before the live
+        ones: nothing when resuming from last_event_id, otherwise a snapshot
+        of every matching task.
+        """
+        subscription, resumed = self.stream.subscribe(task_id, workflow_id, last_event_id)
+        if resumed:
+            return subscription, []
+        
+        if task_id is not None:
+            tasks = [self.store.get(task_id)] if task_id in self.store else []
+        else:
+            tasks = self.store.query(limit=len(self.store), workflow_id=workflow_id)
+        snapshot = [
+            {
+                'position': self.stream.position,
+                'event': 'snapshot',
+                'data': self._response(task).dict()
+            }
+            for task in tasks
+        ]
+        return subscription, snapshot
+    
+    def _publish(self, event: Dict[str, Any], workflow_id: Optional[str]) -> None:
+        task_id = event['task_id']
+        data: Dict[str, Any] = {'task_id': task_id, 'event': event['type']}
+        if event['type'] == TASK_DELETED:
+            name = 'deleted'
+        else:
+            name = 'created' if event['type'] == TASK_CREATED else 'update'
+            data['changes'] = project(event)
+            if 'message' in event['data']:
+                data['log'] = self.logs.tail(task_id, 1)[0]
+        self.stream.publish(task_id, workflow_id, name, data, seq=event['seq'])
+    
+    async def snapshot(self) -> None:
+        """Save the tasks changed since the last snapshot and advance the watermark"""
+        if not self.repository or not self.events.running:
+            return
+        
+        async with self._snapshot_lock:
+            # Events still being appended are not in the store yet; keep
+            # them after the watermark so they are replayed
+            seq = min(self._unapplied) - 1 if self._unapplied else self.events.seq
+            dirty, self._dirty = self._dirty, set()
+            # Entries spilled before the snapshot must be on disk, as the
+            # snapshot only holds the ones still in memory
+            await self.logs.flush()
+            saved = []
+            deleted = []
+            for task_id in dirty:
+                task_data = self.store.get(task_id)
+                if task_data is None:
+                    deleted.append(task_id)
+                else:
+                    saved.append(self._snapshot_record(task_data))
+            try:
+                await self.repository.write_many('tasks', saved, deleted)
+            except Exception:
+                self._dirty |= dirty
+                raise
+            await self.events.mark_snapshot(seq)
+        
+        logger.info(f"Snapshotted {len(dirty)} tasks at event {seq}")
+    
+    def _snapshot_record(self, task_data: dict) -> dict:
+        return {**task_data, 'execution_log': self.logs.unspilled(task_data['id'])}
+    
+    def _response(self, task_data: dict, include_logs: bool = True) -> TaskResponse:
+        execution_log = self.logs.tail(task_data['id']) if include_logs else None
+        return TaskResponse(**task_data, execution_log=execution_log)
@@ -0,0 +1,173 @@
+"""
+Task Event Stream
+任务事件流 - 向SSE订阅者推送任务状态、日志与进度增量，支持Last-Event-ID续传
+"""
+
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (event log seq, n-th transient delta since that event)
+Position = Tuple[int, int]
+
+
+def format_event_id(position: Position) -> str:
+    seq, n = position
+    return f"{seq}-{n}" if n else str(seq)
+
+
+def parse_event_id(event_id: str) -> Optional[Position]:
+    """Parse a Last-Event-ID header; None if it is not one of ours"""
+    seq, _, n = event_id.strip().partition('-')
+    try:
+        return int(seq), int(n or 0)
+    except ValueError:
+        return None
+
+
+def encode_sse(delta: Dict[str, Any], default: Optional[Callable[[Any], Any]] = None) -> str:
+    """Format a delta as one Server-Sent Events message"""
+    data = json.dumps(delta['data'], default=default, separators=(',', ':'))
+    event_id = f"id: {format_event_id(delta['position'])}\n" if delta.get('position') else ""
+    return f"{event_id}event: {delta['event']}\ndata: {data}\n\n"
+
+
+class TaskSubscription:
+    """One SSE client's view of the task deltas"""
+
+    def __init__(self, task_id: Optional[str], workflow_id: Optional[str], max_pending: int):
+        self.task_id = task_id
+        self.workflow_id = workflow_id
+        self.max_pending = max_pending
+        self.pending: Deque[Dict[str, Any]] = deque()
+        self.closed = False
+        self._wakeup = asyncio.Event()
+
+    def matches(self, delta: Dict[str, Any]) -> bool:
+        if self.task_id is not None:
+            return delta['task_id'] == self.task_id
+        if self.workflow_id is not None:
+            return delta['workflow_id'] == self.workflow_id
+        return True
+
+    def push(self, delta: Dict[str, Any]) -> bool:
+        """Queue a delta; False if the client fell too far behind"""
+        if len(self.pending) >= self.max_pending:
+            self.close()
+            return False
+        self.pending.append(delta)
+        self._wakeup.set()
+        return True
+
+    def close(self) -> None:
+        self.closed = True
+        self._wakeup.set()
+
+    async def next_batch(self, timeout: float) -> List[Dict[str, Any]]:
+        """Wait up to timeout for deltas; an empty batch means keep-alive"""
+        if not self.pending and not self.closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._wakeup.clear()
+        batch = list(self.pending)
+        self.pending.clear()
+        return batch
+
+
+class TaskEventBroker:
+    """Fans task deltas out to subscribers and keeps a window for resume
+
+    Deltas carry a position: the event log sequence number of the task
+    event they come from, plus a counter for transient deltas (progress)
+    published after it. Positions survive restarts, so a client
+    reconnecting with ``Last-Event-ID`` gets the deltas it missed if they
+    are still in the window, and is told to resynchronise otherwise.
+
+    A subscriber that falls ``max_pending`` deltas behind is closed; it
+    reconnects with its last id like any other dropped client.
+    """
+
+    def __init__(self, history_size: int = 1024, max_pending: int = 1024):
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        self.max_pending = max_pending
+        self.subscribers: Set[TaskSubscription] = set()
+        # Deltas at or before this position are no longer in the window
+        self.floor: Position = (0, 0)
+        self.position: Position = (0, 0)
+        self.stats = {'published': 0, 'resumed': 0, 'resynced': 0, 'dropped_subscribers': 0}
+
+    def reset(self, seq: int) -> None:
+        """Start the window at an event log position, e.g. after replay"""
+        self.history.clear()
+        self.floor = self.position = (seq, 0)
+
+    def publish(self, task_id: str, workflow_id: Optional[str], event: str, data: Dict[str, Any], seq: Optional[int] = None) -> None:
+        """Publish a delta; seq is given for deltas of logged task events"""
+        if seq is not None:
+            self.position = (seq, 0)
+        else:
+            self.position = (self.position[0], self.position[1] + 1)
+
+        if len(self.history) == self.history.maxlen:
+            self.floor = self.history[0]['position']
+        delta = {
+            'position': self.position,
+            'task_id': task_id,
+            'workflow_id': workflow_id,
+            'event': event,
+            'data': data
+        }
+        self.history.append(delta)
+        self.stats['published'] += 1
+
+        for subscription in list(self.subscribers):
+            if subscription.matches(delta) and not subscription.push(delta):
+                self.subscribers.discard(subscription)
+                self.stats['dropped_subscribers'] += 1
+                logger.info(f"Dropped slow task stream subscriber ({len(subscription.pending)} deltas behind)")
+
+    def subscribe(
+        self,
+        task_id: Optional[str] = None,
+        workflow_id: Optional[str] = None,
+        last_event_id: Optional[str] = None
+    ) -> Tuple[TaskSubscription, bool]:
+        """Subscribe to deltas; returns the subscription and whether it resumed
+
+        When it did not resume, the caller must send the current state first.
+        """
+        subscription = TaskSubscription(task_id, workflow_id, self.max_pending)
+        position = parse_event_id(last_event_id) if last_event_id else None
+        resumed = position is not None and self.floor <= position <= self.position
+        if resumed:
+            for delta in self.history:
+                if delta['position'] > position and subscription.matches(delta):
+                    subscription.pending.append(delta)
+            self.stats['resumed'] += 1
+        elif last_event_id:
+            self.stats['resynced'] += 1
+        self.subscribers.add(subscription)
+        return subscription, resumed
+
+    def unsubscribe(self, subscription: TaskSubscription) -> None:
+        self.subscribers.discard(subscription)
+        subscription.close()
+
+    def close(self) -> None:
+        for subscription in self.subscribers:
+            subscription.close()
+        self.subscribers.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'subscribers': len(self.subscribers),
+            'window': len(self.history),
+            'position': format_event_id(self.position),
+            **self.stats
+        }
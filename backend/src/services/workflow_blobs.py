@@ -0,0 +1,326 @@
+"""
+Workflow Blob Store
+工作流块存储 - 按节点与操作单元切分、内容寻址、压缩去重的工作流文档存储
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zlib is the fallback
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# A document is split into a chunk per element of these lists, one level each:
+# workflow_data -> nodes -> operation_units
+SPLIT_KEYS = ('nodes', 'operation_units')
+
+# First byte of a chunk file names its compression
+CODEC_ZLIB = b'z'
+CODEC_ZSTD = b's'
+
+
+class WorkflowBlobStore:
+    """Content-addressed, compressed storage for workflow documents
+
+    A workflow_data document is cut into chunks: one per operation unit,
+    one per node (referring to its units) and one for the document itself
+    (referring to its nodes), with the rest of each node and of the
+    document in a chunk of its own. Each chunk is stored once under the SHA-256 of
+    its JSON, so workflows cloned from one another share every node they
+    have not changed. Chunks are compressed with zstd when it is installed
+    and zlib otherwise.
+
+    Decoded chunks are kept in an LRU cache and handed out as shared,
+    immutable objects: documents loaded or stored here share identical
+    subtrees in memory as well as on disk, and must never be modified in
+    place. Storing an edited copy re-hashes only the subtrees that are not
+    already cached, so a patch costs the size of the edit.
+
+    Every chunk counts the documents and chunks that refer to it. Storing a
+    document retains it and ``release`` drops it again; a chunk whose count
+    reaches zero is deleted, along with whatever only it referred to.
+    ``collect_garbage`` rebuilds the counts from the live document refs on
+    startup and removes chunks nothing refers to. Without a directory
+    documents are deduplicated in memory only.
+    """
+
+    def __init__(self, directory: Optional[str] = None, cache_entries: int = 65536, level: int = 6):
+        self.directory = directory
+        self.cache_entries = max(cache_entries, 1)
+        self.level = level
+        self.codec = 'zstd' if zstandard is not None else 'zlib'
+        if directory and zstandard is None:
+            logger.warning("zstandard is not installed; workflow chunks are compressed with zlib")
+        self._objects: "OrderedDict[str, Any]" = OrderedDict()
+        # id() of each cached object -> its hash; valid while the cache holds it
+        self._ids: Dict[int, str] = {}
+        # Chunks on disk or queued for writing
+        self._stored: Set[str] = set()
+        # Chunk -> number of documents and chunks referring to it
+        self._refs: Dict[str, int] = {}
+        # Split chunk -> the chunks it refers to (its shell, then its children)
+        self._children: Dict[str, Tuple[str, ...]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if directory:
+            # One file thread keeps writes and deletes of a chunk in order
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="workflow-blobs")
+        self.stats = {
+            'chunks_written': 0,
+            'chunks_deduplicated': 0,
+            'raw_bytes': 0,
+            'unique_raw_bytes': 0,
+            'stored_bytes': 0,
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'chunks_collected': 0
+        }
+
+    async def put(self, document: Any) -> Tuple[str, Any]:
+        """Store and retain a document; returns its ref and its shared copy"""
+        fresh: Dict[str, bytes] = {}
+        ref, shared = self._encode(document, 0, fresh)
+        self._stored.update(fresh)
+        self._retain(ref)
+        if fresh and self.directory:
+            self.stats['stored_bytes'] += await self._run(self._write_chunks, fresh)
+        return ref, shared
+
+    async def release(self, ref: str) -> int:
+        """Drop one reference to a stored document; returns the chunks deleted"""
+        dead: List[str] = []
+        pending = [ref]
+        while pending:
+            chunk = pending.pop()
+            count = self._refs.get(chunk, 0) - 1
+            if count > 0:
+                self._refs[chunk] = count
+                continue
+            self._refs.pop(chunk, None)
+            pending.extend(self._children.pop(chunk, ()))
+            # A later put must write it again rather than reuse it
+            self._forget(chunk)
+            dead.append(chunk)
+
+        self.stats['chunks_collected'] += len(dead)
+        if dead and self.directory:
+            await self._run(self._remove_chunks, dead)
+        return len(dead)
+
+    def load(self, ref: str) -> Any:
+        """Load a stored document; raises LookupError if a chunk is missing"""
+        if ref in self._objects:
+            self._objects.move_to_end(ref)
+            self.stats['cache_hits'] += 1
+            return self._objects[ref]
+
+        self.stats['cache_misses'] += 1
+        envelope = self._read_chunk(ref)
+        split = envelope.get('split')
+        if split is None:
+            value = envelope['data']
+        else:
+            self._children.setdefault(ref, (envelope['shell'], *envelope['children']))
+            value = {**self.load(envelope['shell']), split: [self.load(child) for child in envelope['children']]}
+        self._remember(ref, value)
+        return value
+
+    async def collect_garbage(self, refs: Iterable[str]) -> int:
+        """Count references from these document refs and remove every other chunk
+
+        Each ref counts as one retained document. Run it while nothing is
+        being stored or released, e.g. on startup.
+        """
+        if not self.directory:
+            return 0
+        removed = await self._run(self._sweep, list(refs))
+        self.stats['chunks_collected'] += removed
+        return removed
+
+    async def close(self) -> None:
+        if self._executor is not None:
+            # Let queued writes and deletes finish
+            await self._run(lambda: None)
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        raw = self.stats['raw_bytes']
+        unique = self.stats['unique_raw_bytes']
+        stored = self.stats['stored_bytes']
+        return {
+            'durable': self.directory is not None,
+            'codec': self.codec,
+            'cached_chunks': len(self._objects),
+            'referenced_chunks': len(self._refs),
+            'dedup_ratio': round(raw / unique, 2) if unique else None,
+            'compression_ratio': round(unique / stored, 2) if stored else None,
+            **self.stats
+        }
+
+    # ------------------------------------------------------------------
+    # Encoding
+    # ------------------------------------------------------------------
+
+    def _encode(self, value: Any, depth: int, fresh: Dict[str, bytes]) -> Tuple[str, Any]:
+        """Hash a subtree, collecting chunks not stored yet; returns (hash, shared value)"""
+        known = self._ids.get(id(value))
+        if known in self._objects and self._objects[known] is value:
+            self._objects.move_to_end(known)
+            return known, value
+
+        split = SPLIT_KEYS[depth] if depth < len(SPLIT_KEYS) else None
+        if split is not None and isinstance(value, dict) and isinstance(value.get(split), list):
+            children = [self._encode(child, depth + 1, fresh) for child in value[split]]
+            # Everything but the list is a chunk of its own, shared by clones
+            # whose lists differ; the key stays in place to keep key order
+            shell_ref, shell = self._encode({**value, split: None}, len(SPLIT_KEYS), fresh)
+            envelope = {'shell': shell_ref, 'split': split, 'children': [ref for ref, _ in children]}
+            shared = {**shell, split: [child for _, child in children]}
+        else:
+            envelope = {'data': value}
+            shared = value
+
+        raw = json.dumps(envelope, separators=(',', ':'), ensure_ascii=False).encode()
+        ref = hashlib.sha256(raw).hexdigest()
+        self.stats['raw_bytes'] += len(raw)
+        if 'split' in envelope:
+            self._children.setdefault(ref, (envelope['shell'], *envelope['children']))
+
+        if ref in self._objects:
+            self._objects.move_to_end(ref)
+            self.stats['chunks_deduplicated'] += 1
+            return ref, self._objects[ref]
+
+        if ref in self._stored or ref in fresh:
+            self.stats['chunks_deduplicated'] += 1
+        else:
+            fresh[ref] = raw
+            self.stats['unique_raw_bytes'] += len(raw)
+        self._remember(ref, shared)
+        return ref, shared
+
+    def _retain(self, ref: str) -> None:
+        """Count one more reference to a chunk, and to its children if it was unreferenced"""
+        pending = [ref]
+        while pending:
+            chunk = pending.pop()
+            self._refs[chunk] = self._refs.get(chunk, 0) + 1
+            if self._refs[chunk] == 1:
+                pending.extend(self._children.get(chunk, ()))
+
+    def _forget(self, ref: str) -> None:
+        value = self._objects.pop(ref, None)
+        if value is not None and self._ids.get(id(value)) == ref:
+            del self._ids[id(value)]
+        self._stored.discard(ref)
+
+    def _remember(self, ref: str, value: Any) -> None:
+        self._objects[ref] = value
+        self._ids[id(value)] = ref
+        while len(self._objects) > self.cache_entries:
+            _, evicted = self._objects.popitem(last=False)
+            self._ids.pop(id(evicted), None)
+
+    def _compress(self, raw: bytes) -> bytes:
+        if zstandard is not None:
+            return CODEC_ZSTD + zstandard.ZstdCompressor(level=self.level).compress(raw)
+        return CODEC_ZLIB + zlib.compress(raw, self.level)
+
+    @staticmethod
+    def _decompress(blob: bytes) -> bytes:
+        codec, body = blob[:1], blob[1:]
+        if codec == CODEC_ZLIB:
+            return zlib.decompress(body)
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("Chunk is zstd-compressed but zstandard is not installed")
+            return zstandard.ZstdDecompressor().decompress(body)
+        raise ValueError(f"Unknown chunk codec {codec!r}")
+
+    # ------------------------------------------------------------------
+    # Files (writes, deletes and sweeps run on the file thread)
+    # ------------------------------------------------------------------
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _chunk_path(self, ref: str) -> str:
+        return os.path.join(self.directory, ref[:2], ref)
+
+    def _write_chunks(self, chunks: Dict[str, bytes]) -> int:
+        """Write chunks that are not on disk yet; returns the bytes written"""
+        written = 0
+        for ref, raw in chunks.items():
+            path = self._chunk_path(ref)
+            if os.path.exists(path):
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            blob = self._compress(raw)
+            with open(path + '.tmp', 'wb') as handle:
+                handle.write(blob)
+            os.replace(path + '.tmp', path)
+            written += len(blob)
+            self.stats['chunks_written'] += 1
+        return written
+
+    def _read_chunk(self, ref: str) -> Dict[str, Any]:
+        if not self.directory:
+            raise LookupError(f"Workflow chunk {ref} is not in memory")
+        try:
+            with open(self._chunk_path(ref), 'rb') as handle:
+                blob = handle.read()
+        except FileNotFoundError:
+            raise LookupError(f"Workflow chunk {ref} is missing") from None
+        self._stored.add(ref)
+        return json.loads(self._decompress(blob))
+
+    def _remove_chunks(self, refs: List[str]) -> None:
+        for ref in refs:
+            try:
+                os.remove(self._chunk_path(ref))
+            except FileNotFoundError:
+                pass
+
+    def _sweep(self, roots: List[str]) -> int:
+        refs: Dict[str, int] = {}
+        children: Dict[str, Tuple[str, ...]] = {}
+        pending: List[str] = list(roots)
+        while pending:
+            ref = pending.pop()
+            refs[ref] = refs.get(ref, 0) + 1
+            if refs[ref] > 1:
+                continue
+            try:
+                envelope = self._read_chunk(ref)
+            except LookupError:
+                logger.warning(f"Workflow chunk {ref} is referenced but missing")
+                continue
+            if 'split' in envelope:
+                children[ref] = (envelope['shell'], *envelope['children'])
+                pending.extend(children[ref])
+        self._refs = refs
+        self._children = children
+
+        removed = 0
+        if not os.path.isdir(self.directory):
+            return removed
+        for prefix in os.listdir(self.directory):
+            folder = os.path.join(self.directory, prefix)
+            if len(prefix) != 2 or not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                if name not in refs:
+                    os.remove(os.path.join(folder, name))
+                    self._forget(name)
+                    removed += 1
+        return removed
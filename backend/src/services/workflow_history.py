@@ -0,0 +1,267 @@
+"""
+Workflow History
+工作流版本历史 - 每次修改保存相对上一版本的结构化差异，并定期保存完整检查点
+"""
+
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils.json_patch import apply_patch, make_patch
+
+logger = logging.getLogger(__name__)
+
+HISTORY_SUFFIX = '.jsonl'
+
+
+class HistoryEntry:
+    """Where one version of a workflow is recorded"""
+
+    __slots__ = ('version', 'timestamp', 'reason', 'checkpoint', 'changes', 'offset', 'length', 'payload')
+
+    def __init__(
+        self,
+        version: int,
+        timestamp: str,
+        reason: str,
+        checkpoint: bool,
+        changes: int,
+        offset: int = 0,
+        length: int = 0,
+        payload: Optional[Dict[str, Any]] = None
+    ):
+        self.version = version
+        self.timestamp = timestamp
+        self.reason = reason
+        self.checkpoint = checkpoint
+        self.changes = changes
+        # Position of the line in the history file, or the line itself in memory
+        self.offset = offset
+        self.length = length
+        self.payload = payload
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'timestamp': self.timestamp,
+            'reason': self.reason,
+            'checkpoint': self.checkpoint,
+            'changes': self.changes,
+            'size_bytes': self.length
+        }
+
+
+class WorkflowHistory:
+    """Version history of workflow documents
+
+    Each version is one JSON line in ``directory/<workflow_id>.jsonl``:
+    either a JSON Patch against the version before it, or a checkpoint
+    holding the full document. A new checkpoint is written once the patches
+    since the last one add up to its size, or after ``checkpoint_interval``
+    versions. Reading a version starts from the checkpoint at or before it,
+    so it reads at most about twice the document and applies at most
+    ``checkpoint_interval - 1`` patches, while small edits cost little more
+    than the size of the edit.
+
+    A workflow's index of versions is read from its file on first use.
+    Without a directory the lines are kept in memory.
+    """
+
+    def __init__(self, directory: Optional[str] = None, checkpoint_interval: int = 100):
+        self.directory = directory
+        self.checkpoint_interval = max(checkpoint_interval, 1)
+        self._entries: Dict[str, Dict[int, HistoryEntry]] = {}
+        self._sizes: Dict[str, int] = {}
+        self._loading: Dict[str, asyncio.Lock] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if directory:
+            # One writer thread keeps appends to a file in submission order
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="workflow-history")
+        self.stats = {'checkpoints': 0, 'diffs': 0, 'bytes_written': 0, 'reads': 0, 'patches_applied': 0}
+
+    async def record(
+        self,
+        workflow_id: str,
+        version: int,
+        document: Dict[str, Any],
+        previous: Optional[Dict[str, Any]] = None,
+        reason: str = 'update',
+        timestamp: Optional[datetime] = None
+    ) -> None:
+        """Record a new version; previous is the document of version - 1"""
+        entries = await self._index(workflow_id)
+        timestamp = (timestamp or datetime.now()).isoformat()
+        writes = []
+        if not entries and previous is not None and version > 1:
+            # History starts here; keep the version being replaced as its base
+            writes.append(self._append(workflow_id, {
+                'version': version - 1, 'timestamp': timestamp, 'reason': 'baseline', 'checkpoint': previous
+            }))
+
+        line = {'version': version, 'timestamp': timestamp, 'reason': reason}
+        if previous is not None and self._chain_allows(entries, version):
+            line['diff'] = make_patch(previous, document)
+        else:
+            line['checkpoint'] = document
+        writes.append(self._append(workflow_id, line))
+        for write in writes:
+            if write is not None:
+                await write
+
+    async def list_versions(self, workflow_id: str) -> List[Dict[str, Any]]:
+        """Recorded versions of a workflow, newest first"""
+        entries = await self._index(workflow_id)
+        return [entries[version].info() for version in sorted(entries, reverse=True)]
+
+    async def get_version(self, workflow_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """The document as of a version, or None if that version is not recorded"""
+        entries = await self._index(workflow_id)
+        if version not in entries:
+            return None
+        base = version
+        while not entries[base].checkpoint:
+            base -= 1
+            if base not in entries:
+                logger.warning(f"History of workflow {workflow_id} has no checkpoint before version {version}")
+                return None
+
+        lines = [await self._read(workflow_id, entries[number]) for number in range(base, version + 1)]
+        document = lines[0]['checkpoint']
+        for line in lines[1:]:
+            document = apply_patch(document, line['diff'])
+        self.stats['reads'] += 1
+        self.stats['patches_applied'] += len(lines) - 1
+        return document
+
+    async def drop(self, workflow_id: str) -> None:
+        """Forget a workflow's history and remove its file"""
+        self._entries.pop(workflow_id, None)
+        self._sizes.pop(workflow_id, None)
+        self._loading.pop(workflow_id, None)
+        if self.directory:
+            await self._run(self._remove, workflow_id)
+
+    async def close(self) -> None:
+        if self._executor is not None:
+            # Let queued appends finish
+            await self._run(lambda: None)
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'durable': self.directory is not None,
+            'workflows_indexed': len(self._entries),
+            'versions_indexed': sum(len(entries) for entries in self._entries.values()),
+            **self.stats
+        }
+
+    # ------------------------------------------------------------------
+    # Index and files
+    # ------------------------------------------------------------------
+
+    def _chain_allows(self, entries: Dict[int, HistoryEntry], version: int) -> bool:
+        """Whether version may be a patch on the versions before it"""
+        chain_bytes = 0
+        base = version - 1
+        while base in entries and not entries[base].checkpoint:
+            chain_bytes += entries[base].length
+            base -= 1
+        if base not in entries:
+            return False
+        return version - base < self.checkpoint_interval and chain_bytes < entries[base].length
+
+    async def _index(self, workflow_id: str) -> Dict[int, HistoryEntry]:
+        entries = self._entries.get(workflow_id)
+        if entries is not None:
+            return entries
+        lock = self._loading.setdefault(workflow_id, asyncio.Lock())
+        async with lock:
+            if workflow_id not in self._entries:
+                entries, size = {}, 0
+                if self.directory:
+                    entries, size = await self._run(self._scan, workflow_id)
+                self._entries[workflow_id] = entries
+                self._sizes[workflow_id] = size
+        return self._entries[workflow_id]
+
+    def _append(self, workflow_id: str, line: Dict[str, Any]) -> Optional[asyncio.Future]:
+        """Index a line and queue its write; returns the write, if there is one"""
+        checkpoint = 'checkpoint' in line
+        changes = 0 if checkpoint else len(line['diff'])
+        self.stats['checkpoints' if checkpoint else 'diffs'] += 1
+        entries = self._entries[workflow_id]
+
+        if not self.directory:
+            length = len(json.dumps(line, separators=(',', ':')))
+            entries[line['version']] = HistoryEntry(
+                line['version'], line['timestamp'], line['reason'], checkpoint, changes, length=length, payload=line
+            )
+            return None
+
+        data = json.dumps(line, separators=(',', ':'), ensure_ascii=False).encode() + b"\n"
+        offset = self._sizes[workflow_id]
+        self._sizes[workflow_id] = offset + len(data)
+        entries[line['version']] = HistoryEntry(
+            line['version'], line['timestamp'], line['reason'], checkpoint, changes, offset, len(data)
+        )
+        self.stats['bytes_written'] += len(data)
+        return self._run(self._write, workflow_id, data)
+
+    async def _read(self, workflow_id: str, entry: HistoryEntry) -> Dict[str, Any]:
+        if entry.payload is not None:
+            return entry.payload
+        return await self._run(self._read_line, workflow_id, entry.offset, entry.length)
+
+    def _run(self, func, *args) -> asyncio.Future:
+        return asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _path(self, workflow_id: str) -> str:
+        return os.path.join(self.directory, f"{workflow_id}{HISTORY_SUFFIX}")
+
+    def _scan(self, workflow_id: str) -> Tuple[Dict[int, HistoryEntry], int]:
+        entries: Dict[int, HistoryEntry] = {}
+        path = self._path(workflow_id)
+        if not os.path.exists(path):
+            return entries, 0
+
+        offset = 0
+        with open(path, 'rb') as handle:
+            for data in handle:
+                try:
+                    line = json.loads(data)
+                except ValueError:
+                    break
+                checkpoint = 'checkpoint' in line
+                entries[line['version']] = HistoryEntry(
+                    line['version'], line['timestamp'], line['reason'], checkpoint,
+                    0 if checkpoint else len(line['diff']), offset, len(data)
+                )
+                offset += len(data)
+
+        if offset < os.path.getsize(path):
+            # A write torn by a crash; drop it so the next append starts clean
+            logger.warning(f"Truncating torn entry in {path}")
+            with open(path, 'r+b') as handle:
+                handle.truncate(offset)
+        return entries, offset
+
+    def _write(self, workflow_id: str, data: bytes) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(workflow_id), 'ab') as handle:
+            handle.write(data)
+
+    def _read_line(self, workflow_id: str, offset: int, length: int) -> Dict[str, Any]:
+        with open(self._path(workflow_id), 'rb') as handle:
+            handle.seek(offset)
+            return json.loads(handle.read(length))
+
+    def _remove(self, workflow_id: str) -> None:
+        try:
+            os.remove(self._path(workflow_id))
+        except FileNotFoundError:
+            pass
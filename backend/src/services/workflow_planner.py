@@ -0,0 +1,614 @@
+"""
+Workflow Planner
+工作流执行计划 - 拓扑排序、校验与并行分支执行
+"""
+
+import asyncio
+import logging
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields, is_dataclass, replace
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+from .browser_handles import BrowserHandleRef, BrowserHandleRegistry
+
+logger = logging.getLogger(__name__)
+
+EXECUTION_MODES = ('sequential', 'parallel', 'optimized')
+ERROR_HANDLING = ('stop', 'continue', 'retry')
+
+DEFAULT_TIMEOUT_SECONDS = 300
+DEFAULT_MAX_PARALLEL = 4
+DEFAULT_RETRY_COUNT = 1
+
+# Strings up to this length are interned when compiled, so repeated selectors
+# and property keys across nodes and plans share one object
+INTERN_MAX_LENGTH = 256
+
+EMPTY_MAPPING: Mapping[str, Any] = MappingProxyType({})
+
+# Parts of workflow_data that shape the plan's graph and settings
+PLAN_STRUCTURE_KEYS = ('nodes', 'connections', 'execution_config')
+# Node members compiled into a CompiledNode; 'id' and 'input_connections'
+# shape the graph, anything else (canvas position, UI state) is not planned
+NODE_COMPILED_KEYS = ('type', 'properties', 'operation_units')
+
+
+class WorkflowValidationError(ValueError):
+    """Raised when workflow_data cannot be turned into an execution plan"""
+
+
+@dataclass(frozen=True)
+class Edge:
+    """A resolved connection between an output socket and an input socket"""
+    from_node: str
+    from_socket: str
+    to_node: str
+    to_socket: str
+
+
+@dataclass(frozen=True)
+class Locator:
+    """Element locator with interned selector strings"""
+    type: str
+    value: Any
+    fallbacks: Tuple[Tuple[str, Any], ...] = ()
+
+
+@dataclass(frozen=True)
+class CompiledOperation:
+    """One observation/action step of a node, flattened out of nested units
+
+    ``path`` locates the unit in the original tree: ``"2"`` is the third
+    top-level unit, ``"2.t0"`` the first unit of its condition's true branch.
+    """
+    unit_id: str
+    path: str
+    observation_type: Optional[str]
+    observation_target: Optional[Locator]
+    action_type: Optional[str]
+    action_target: Optional[Locator]
+    observation: Mapping[str, Any]
+    action: Mapping[str, Any]
+    condition_type: Optional[str] = None
+    loop: Mapping[str, Any] = field(default_factory=lambda: EMPTY_MAPPING)
+
+
+@dataclass(frozen=True)
+class CompiledNode:
+    """Immutable node of an execution plan"""
+    id: str
+    type: Optional[str]
+    properties: Mapping[str, Any]
+    operations: Tuple[CompiledOperation, ...]
+
+
+# Runs one node; receives the compiled node and its resolved inputs by socket name
+NodeRunner = Callable[[CompiledNode, Dict[str, Any]], Awaitable[Any]]
+# Called with (node_id, status, finished node count, total node count)
+ProgressCallback = Callable[[str, str, int, int], None]
+
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """Compiled, topologically sorted execution plan of a workflow
+
+    Plans are immutable and shared between concurrent executions.
+    """
+    workflow_id: str
+    version: Any
+    mode: str
+    error_handling: str
+    timeout_seconds: float
+    max_parallel: int
+    nodes: Mapping[str, CompiledNode]
+    order: Tuple[str, ...]
+    levels: Tuple[Tuple[str, ...], ...]
+    inputs: Mapping[str, Tuple[Edge, ...]]
+    dependents: Mapping[str, Tuple[str, ...]]
+    dependency_counts: Mapping[str, int]
+    priority: Mapping[str, int]
+    size_bytes: int = 0
+
+
+@dataclass
+class ExecutionResult:
+    """Outcome of running an execution plan"""
+    success: bool
+    outputs: Dict[str, Any] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    skipped: List[str] = field(default_factory=list)
+
+
+def _collect_edges(workflow_data: Dict[str, Any], node_ids: Set[str]) -> List[Edge]:
+    """Merge top-level connections with per-node input_connections and check them"""
+    edges: Dict[Tuple[str, str], Edge] = {}
+
+    def add(edge: Edge, source: str) -> None:
+        for node_id in (edge.from_node, edge.to_node):
+            if node_id not in node_ids:
+                raise WorkflowValidationError(f"{source} references unknown node '{node_id}'")
+        if not edge.from_socket or not edge.to_socket:
+            raise WorkflowValidationError(f"{source} has a dangling socket: {edge}")
+        existing = edges.get((edge.to_node, edge.to_socket))
+        if existing is not None and existing != edge:
+            raise WorkflowValidationError(
+                f"Input socket '{edge.to_socket}' of node '{edge.to_node}' has more than one connection"
+            )
+        edges[(edge.to_node, edge.to_socket)] = edge
+
+    for connection in workflow_data.get('connections') or []:
+        source = f"Connection '{connection.get('id', '?')}'"
+        add(Edge(
+            from_node=connection.get('from_node'),
+            from_socket=connection.get('from_socket'),
+            to_node=connection.get('to_node'),
+            to_socket=connection.get('to_socket')
+        ), source)
+
+    for node in workflow_data.get('nodes') or []:
+        for socket_name, ref in (node.get('input_connections') or {}).items():
+            source = f"Input '{socket_name}' of node '{node['id']}'"
+            if not isinstance(ref, dict):
+                raise WorkflowValidationError(f"{source} is malformed")
+            add(Edge(
+                from_node=ref.get('node_id'),
+                from_socket=ref.get('socket_name'),
+                to_node=node['id'],
+                to_socket=socket_name
+            ), source)
+
+    return list(edges.values())
+
+
+def _freeze(value: Any) -> Any:
+    """Deep-freeze JSON data into read-only mappings and tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({_freeze(k): _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, str) and len(value) <= INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    return value
+
+
+def _compile_locator(target: Any) -> Optional[Locator]:
+    if not isinstance(target, dict):
+        return None
+    primary = target.get('primary') or {}
+    fallbacks = tuple(
+        (_freeze(f.get('type')), _freeze(f.get('value')))
+        for f in target.get('fallbacks') or [] if isinstance(f, dict)
+    )
+    return Locator(
+        type=_freeze(primary.get('type', 'css')),
+        value=_freeze(primary.get('value')),
+        fallbacks=fallbacks
+    )
+
+
+def _compile_operations(units: Any, prefix: str = '') -> List[CompiledOperation]:
+    """Flatten nested operation units (condition branches) depth-first"""
+    operations: List[CompiledOperation] = []
+    for index, unit in enumerate(units or []):
+        if not isinstance(unit, dict):
+            raise WorkflowValidationError(f"Operation unit {prefix}{index} is malformed")
+        path = f"{prefix}{index}"
+        observation = unit.get('observation') or {}
+        action = unit.get('action') or {}
+        condition = unit.get('condition') or {}
+        operations.append(CompiledOperation(
+            unit_id=_freeze(str(unit.get('id', path))),
+            path=path,
+            observation_type=_freeze(observation.get('type')),
+            observation_target=_compile_locator(observation.get('target')),
+            action_type=_freeze(action.get('type')),
+            action_target=_compile_locator(action.get('target')),
+            observation=_freeze(observation),
+            action=_freeze(action),
+            condition_type=_freeze(condition.get('type')),
+            loop=_freeze(unit.get('loop') or {})
+        ))
+        operations.extend(_compile_operations(condition.get('true_branch'), f"{path}.t"))
+        operations.extend(_compile_operations(condition.get('false_branch'), f"{path}.f"))
+    return operations
+
+
+def _compile_node(node: Dict[str, Any]) -> CompiledNode:
+    properties = dict(node.get('properties') or {})
+    units = node.get('operation_units')
+    if units is None:
+        units = properties.pop('operation_units', None)
+    return CompiledNode(
+        id=_freeze(node['id']),
+        type=_freeze(node.get('type')),
+        properties=_freeze(properties),
+        operations=tuple(_compile_operations(units))
+    )
+
+
+def _deep_sizeof(value: Any, seen: Optional[Set[int]] = None) -> int:
+    """Approximate retained size of a compiled plan, counting shared objects once"""
+    seen = seen if seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, (dict, MappingProxyType)):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in value.items())
+    elif isinstance(value, (tuple, list, set, frozenset)):
+        size += sum(_deep_sizeof(item, seen) for item in value)
+    elif is_dataclass(value):
+        size += sum(_deep_sizeof(getattr(value, f.name), seen) for f in fields(value))
+    return size
+
+
+def build_plan(workflow_id: str, version: Any, workflow_data: Dict[str, Any]) -> ExecutionPlan:
+    """Validate workflow_data and topologically sort it into an ExecutionPlan"""
+    nodes: Dict[str, Dict[str, Any]] = {}
+    for node in workflow_data.get('nodes') or []:
+        node_id = node.get('id') if isinstance(node, dict) else None
+        if not node_id:
+            raise WorkflowValidationError("Every node needs an 'id'")
+        if node_id in nodes:
+            raise WorkflowValidationError(f"Duplicate node id '{node_id}'")
+        nodes[node_id] = node
+
+    edges = _collect_edges(workflow_data, set(nodes))
+    inputs: Dict[str, List[Edge]] = {node_id: [] for node_id in nodes}
+    dependents: Dict[str, Set[str]] = {node_id: set() for node_id in nodes}
+    for edge in edges:
+        inputs[edge.to_node].append(edge)
+        dependents[edge.from_node].add(edge.to_node)
+
+    # Kahn's algorithm, level by level, stable in canvas order
+    position = {node_id: index for index, node_id in enumerate(nodes)}
+    remaining = {node_id: len({e.from_node for e in inputs[node_id]}) for node_id in nodes}
+    level = [node_id for node_id in nodes if remaining[node_id] == 0]
+    levels: List[Tuple[str, ...]] = []
+    order: List[str] = []
+    while level:
+        levels.append(tuple(level))
+        order.extend(level)
+        next_level = []
+        for node_id in level:
+            for dependent in dependents[node_id]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    next_level.append(dependent)
+        level = sorted(next_level, key=position.__getitem__)
+
+    if len(order) != len(nodes):
+        cyclic = sorted(node_id for node_id, count in remaining.items() if count > 0)
+        raise WorkflowValidationError(f"Workflow contains a cycle through nodes: {', '.join(cyclic)}")
+
+    # Longest path to a sink; 'optimized' mode starts the critical path first
+    priority: Dict[str, int] = {}
+    for node_id in reversed(order):
+        priority[node_id] = 1 + max((priority[d] for d in dependents[node_id]), default=0)
+
+    compiled_nodes = {node_id: _compile_node(node) for node_id, node in nodes.items()}
+
+    config = workflow_data.get('execution_config') or {}
+    mode = config.get('mode', 'sequential')
+    if mode not in EXECUTION_MODES:
+        raise WorkflowValidationError(f"Unknown execution mode '{mode}'")
+    error_handling = config.get('error_handling', 'stop')
+    if error_handling not in ERROR_HANDLING:
+        raise WorkflowValidationError(f"Unknown error handling strategy '{error_handling}'")
+    timeout_seconds = config.get('timeout_seconds', DEFAULT_TIMEOUT_SECONDS)
+    is_number = isinstance(timeout_seconds, (int, float)) and not isinstance(timeout_seconds, bool)
+    if not is_number or not 0 < timeout_seconds < float('inf'):
+        raise WorkflowValidationError(f"timeout_seconds must be a positive number, not {timeout_seconds!r}")
+    max_parallel = config.get('max_parallel', DEFAULT_MAX_PARALLEL)
+    if isinstance(max_parallel, bool) or not isinstance(max_parallel, int) or max_parallel < 1:
+        raise WorkflowValidationError(f"max_parallel must be a positive integer, not {max_parallel!r}")
+
+    plan = ExecutionPlan(
+        workflow_id=workflow_id,
+        version=version,
+        mode=mode,
+        error_handling=error_handling,
+        timeout_seconds=timeout_seconds,
+        max_parallel=max_parallel,
+        nodes=MappingProxyType(compiled_nodes),
+        order=tuple(order),
+        levels=tuple(levels),
+        inputs=MappingProxyType({node_id: tuple(edges) for node_id, edges in inputs.items()}),
+        dependents=MappingProxyType({node_id: tuple(sorted(ids)) for node_id, ids in dependents.items()}),
+        dependency_counts=MappingProxyType({
+            node_id: len({edge.from_node for edge in edges}) for node_id, edges in inputs.items()
+        }),
+        priority=MappingProxyType(priority)
+    )
+    return replace(plan, size_bytes=_deep_sizeof(plan))
+
+
+def plan_impact(paths: Iterable[Sequence[str]]) -> Optional[Set[int]]:
+    """Work out what edits at these workflow_data paths do to its plan
+
+    Returns None when the plan has to be rebuilt, otherwise the indexes of
+    the nodes that need recompiling (empty if the plan is unaffected).
+    Indexes refer to the nodes list, which such edits leave in place.
+    """
+    nodes: Set[int] = set()
+    for path in paths:
+        if not path:
+            return None
+        if path[0] not in PLAN_STRUCTURE_KEYS:
+            continue
+        if path[0] != 'nodes' or len(path) < 3 or not path[1].isdigit():
+            return None
+        if path[2] in ('id', 'input_connections'):
+            return None
+        if path[2] in NODE_COMPILED_KEYS:
+            nodes.add(int(path[1]))
+    return nodes
+
+
+class WorkflowPlanner:
+    """Compiles execution plans and keeps them in a size-capped LRU cache
+
+    Entries are keyed by workflow id and checked against the workflow's
+    updated_at, so a stale plan is never served even without invalidation.
+    """
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._plans: "OrderedDict[str, ExecutionPlan]" = OrderedDict()
+        self._bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0, 'partial_recompiles': 0}
+
+    def validate(self, workflow_data: Dict[str, Any]) -> None:
+        """Raise WorkflowValidationError if workflow_data cannot be planned"""
+        build_plan('', None, workflow_data)
+
+    def compile(self, workflow_id: str, version: Any, workflow_data: Dict[str, Any]) -> ExecutionPlan:
+        """Compile a plan without caching it"""
+        return build_plan(workflow_id, version, workflow_data)
+
+    def recompile_nodes(
+        self,
+        plan: ExecutionPlan,
+        version: Any,
+        workflow_data: Dict[str, Any],
+        node_indexes: Set[int]
+    ) -> ExecutionPlan:
+        """Derive a plan from one whose graph is unchanged, recompiling some nodes
+
+        Everything but the listed nodes is shared with the original plan.
+        """
+        node_list = workflow_data.get('nodes') or []
+        nodes = dict(plan.nodes)
+        size_bytes = plan.size_bytes
+        for index in sorted(node_indexes):
+            if index >= len(node_list) or node_list[index].get('id') not in nodes:
+                # The edit did not leave the graph alone after all
+                return self.compile(plan.workflow_id, version, workflow_data)
+            compiled = _compile_node(node_list[index])
+            size_bytes += _deep_sizeof(compiled) - _deep_sizeof(nodes[compiled.id])
+            nodes[compiled.id] = compiled
+        self.stats['partial_recompiles'] += 1
+        return replace(plan, version=version, nodes=MappingProxyType(nodes), size_bytes=size_bytes)
+
+    def get_plan(self, workflow: Dict[str, Any]) -> ExecutionPlan:
+        """Get the plan of a stored workflow record, compiling it on a miss"""
+        plan = self._plans.get(workflow['id'])
+        if plan is not None and plan.version == workflow['updated_at']:
+            self._plans.move_to_end(workflow['id'])
+            self.stats['hits'] += 1
+            return plan
+
+        self.stats['misses'] += 1
+        plan = self.compile(workflow['id'], workflow['updated_at'], workflow['workflow_data'])
+        self.put(plan)
+        return plan
+
+    def peek(self, workflow_id: str) -> Optional[ExecutionPlan]:
+        """Get a cached plan without touching LRU order or counters"""
+        return self._plans.get(workflow_id)
+
+    def put(self, plan: ExecutionPlan) -> None:
+        """Cache a plan, evicting least recently used plans over the caps"""
+        self._discard(plan.workflow_id)
+        if plan.size_bytes > self.max_bytes:
+            logger.warning(f"Plan of workflow {plan.workflow_id} exceeds the plan cache size")
+            return
+        self._plans[plan.workflow_id] = plan
+        self._bytes += plan.size_bytes
+        while len(self._plans) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._plans.popitem(last=False)
+            self._bytes -= evicted.size_bytes
+            self.stats['evictions'] += 1
+
+    def invalidate(self, workflow_id: str) -> Optional[ExecutionPlan]:
+        """Drop the cached plan of a workflow, returning it if there was one"""
+        plan = self._discard(workflow_id)
+        if plan is not None:
+            self.stats['invalidations'] += 1
+        return plan
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counters and cache occupancy"""
+        return {
+            'entries': len(self._plans),
+            'bytes': self._bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            **self.stats
+        }
+
+    def _discard(self, workflow_id: str) -> Optional[ExecutionPlan]:
+        plan = self._plans.pop(workflow_id, None)
+        if plan is not None:
+            self._bytes -= plan.size_bytes
+        return plan
+
+
+class WorkflowExecutor:
+    """Runs execution plans, launching independent branches concurrently
+
+    With a handle registry attached, browser handle refs flowing along edges
+    are retained once per consuming edge and released as each consumer
+    finishes, so a handle is freed right after its last downstream node.
+    """
+
+    def __init__(
+        self,
+        node_runner: Optional[NodeRunner] = None,
+        handles: Optional[BrowserHandleRegistry] = None
+    ):
+        self.node_runner = node_runner or self._default_node_runner
+        self.handles = handles
+
+    async def execute(self, plan: ExecutionPlan, progress: Optional[ProgressCallback] = None) -> ExecutionResult:
+        """Run a plan within its timeout, honouring its mode and error handling
+        
+        ``progress(node_id, status, finished, total)`` is called as each node
+        completes or fails.
+        """
+        result = ExecutionResult(success=True)
+        try:
+            await asyncio.wait_for(self._run(plan, result, progress), timeout=plan.timeout_seconds)
+        except asyncio.TimeoutError:
+            result.success = False
+            result.errors['__workflow__'] = f"Workflow timed out after {plan.timeout_seconds}s"
+        result.success = result.success and not result.errors
+        return result
+
+    async def _run(self, plan: ExecutionPlan, result: ExecutionResult, progress: Optional[ProgressCallback]) -> None:
+        if plan.mode == 'sequential':
+            limit = 1
+        elif plan.mode == 'optimized':
+            limit = plan.max_parallel
+        else:
+            limit = len(plan.order) or 1
+
+        waiting = dict(plan.dependency_counts)
+        ready = [node_id for node_id in plan.order if waiting[node_id] == 0]
+        running: Dict[asyncio.Task, str] = {}
+        blocked: Set[str] = set()
+        # Handle refs retained on behalf of each node that has yet to finish
+        held: Dict[str, List[str]] = {}
+
+        try:
+            while ready or running:
+                if plan.mode == 'optimized':
+                    ready.sort(key=lambda n: plan.priority[n], reverse=True)
+                while ready and len(running) < limit:
+                    node_id = ready.pop(0)
+                    task = asyncio.create_task(self._run_node(plan, node_id, result.outputs))
+                    running[task] = node_id
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    node_id = running.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        result.outputs[node_id] = task.result()
+                        self._report(progress, plan, result, node_id, 'completed')
+                        if self.handles is not None:
+                            await self._hand_over(plan, node_id, result.outputs[node_id], held)
+                        for dependent in plan.dependents[node_id]:
+                            waiting[dependent] -= 1
+                            if waiting[dependent] == 0 and dependent not in blocked:
+                                ready.append(dependent)
+                        continue
+
+                    result.errors[node_id] = str(error)
+                    self._report(progress, plan, result, node_id, 'failed')
+                    await self._release_held(held.pop(node_id, ()))
+                    logger.warning(f"Node {node_id} of workflow {plan.workflow_id} failed: {error}")
+                    if plan.error_handling != 'continue':
+                        ready.clear()
+                        return
+                    blocked.update(self._downstream(plan, node_id))
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            for refs in held.values():
+                await self._release_held(refs)
+            result.skipped = [
+                node_id for node_id in plan.order
+                if node_id not in result.outputs and node_id not in result.errors
+            ]
+
+    @staticmethod
+    def _report(
+        progress: Optional[ProgressCallback],
+        plan: ExecutionPlan,
+        result: ExecutionResult,
+        node_id: str,
+        status: str
+    ) -> None:
+        if progress is None:
+            return
+        try:
+            progress(node_id, status, len(result.outputs) + len(result.errors), len(plan.order))
+        except Exception as e:
+            logger.warning(f"Progress callback failed for node {node_id}: {e}")
+
+    @staticmethod
+    def _edge_value(edge: Edge, upstream: Any) -> Any:
+        return upstream.get(edge.from_socket) if isinstance(upstream, dict) else upstream
+
+    async def _hand_over(self, plan: ExecutionPlan, node_id: str, output: Any, held: Dict[str, List[str]]) -> None:
+        """Retain handle refs for downstream edges, then drop this node's inputs"""
+        for dependent in plan.dependents[node_id]:
+            for edge in plan.inputs[dependent]:
+                if edge.from_node != node_id:
+                    continue
+                value = self._edge_value(edge, output)
+                if isinstance(value, BrowserHandleRef) and value in self.handles.handles:
+                    self.handles.retain(value)
+                    held.setdefault(dependent, []).append(value)
+
+        await self._release_held(held.pop(node_id, ()))
+
+        # Handles produced here with no consumer are done already
+        produced = output.values() if isinstance(output, dict) else (output,)
+        for value in produced:
+            if isinstance(value, BrowserHandleRef):
+                await self.handles.release_if_unused(value)
+
+    async def _release_held(self, refs) -> None:
+        for ref in refs:
+            await self.handles.release(ref)
+
+    async def _run_node(self, plan: ExecutionPlan, node_id: str, outputs: Dict[str, Any]) -> Any:
+        node = plan.nodes[node_id]
+        inputs = {}
+        for edge in plan.inputs[node_id]:
+            inputs[edge.to_socket] = self._edge_value(edge, outputs.get(edge.from_node))
+
+        attempts = 1 + (DEFAULT_RETRY_COUNT if plan.error_handling == 'retry' else 0)
+        for attempt in range(attempts):
+            try:
+                return await self.node_runner(node, inputs)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                if attempt + 1 >= attempts:
+                    raise
+                logger.info(f"Retrying node {node_id} of workflow {plan.workflow_id}")
+
+    @staticmethod
+    def _downstream(plan: ExecutionPlan, node_id: str) -> Set[str]:
+        seen: Set[str] = set()
+        stack = list(plan.dependents[node_id])
+        while stack:
+            current = stack.pop()
+            if current not in seen:
+                seen.add(current)
+                stack.extend(plan.dependents[current])
+        return seen
+
+    @staticmethod
+    async def _default_node_runner(node: CompiledNode, inputs: Dict[str, Any]) -> Any:
+        logger.debug(f"No node runner attached; passing through node {node.id}")
+        return dict(inputs)
@@ -3,64 +3,241 @@ Workflow Service
 工作流服务
 """
 
+import asyncio
 import logging
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
+from dataclasses import replace
 import uuid
 
-from ..models.workflow import WorkflowCreate, WorkflowResponse, WorkflowUpdate
+from ..models.workflow import (
+    WorkflowBatchItem,
+    WorkflowCreate,
+    WorkflowPatchResult,
+    WorkflowResponse,
+    WorkflowUpdate,
+    WorkflowVersion,
+    WorkflowVersionInfo
+)
+from ..utils.json_patch import JsonPatchError, apply_patch, make_patch, touched_paths
+from .browser_handles import BrowserHandleRegistry
+from .repository import SQLiteRepository
+from .response_cache import CachedResponse, ResponseCache
+from .store import RecordStore, decode_cursor
+from .workflow_blobs import WorkflowBlobStore
+from .workflow_history import WorkflowHistory
+from .workflow_planner import (
+    ExecutionPlan,
+    ExecutionResult,
+    NodeRunner,
+    ProgressCallback,
+    WorkflowExecutor,
+    WorkflowPlanner,
+    plan_impact
+)
 
 logger = logging.getLogger(__name__)
 
+# Record members a JSON Patch may touch; also what version history keeps
+PATCHABLE_FIELDS = ('name', 'description', 'tags', 'workflow_data')
+
+
+class WorkflowVersionConflict(Exception):
+    """Raised when a write names a version that is no longer current"""
+    
+    def __init__(self, workflow_id: str, expected: int, current: int):
+        super().__init__(f"Workflow {workflow_id} is at version {current}, not {expected}")
+        self.expected = expected
+        self.current = current
+
 
 class WorkflowService:
     """Service for managing workflows"""
     
-    def __init__(self):
-        # In-memory storage for now (will be replaced with database in later stages)
-        self.workflows: dict = {}
+    def __init__(
+        self,
+        store: Optional[RecordStore] = None,
+        repository: Optional[SQLiteRepository] = None,
+        planner: Optional[WorkflowPlanner] = None,
+        handles: Optional[BrowserHandleRegistry] = None,
+        node_runner: Optional[NodeRunner] = None,
+        blobs: Optional[WorkflowBlobStore] = None,
+        history: Optional[WorkflowHistory] = None,
+        responses: Optional[ResponseCache] = None
+    ):
+        # Shared in-memory store, kept in creation order
+        self.store = store or RecordStore()
+        # Optional persistent repository; the store stays the read path
+        self.repository = repository
+        # Compiled execution plans, cached until the workflow changes
+        self.planner = planner or WorkflowPlanner()
+        # Runs each node; the default passes inputs through
+        self.executor = WorkflowExecutor(node_runner, handles=handles)
+        # Optional chunk store; records then hold only a workflow_ref and
+        # their workflow_data is loaded from it wherever it is read
+        self.blobs = blobs
+        # Every saved version, as diffs with periodic checkpoints
+        self.history = history or WorkflowHistory()
+        # Serialized GET responses, valid for one workflow version
+        self.responses = responses or ResponseCache()
+    
+    async def initialize(self) -> None:
+        """Load persisted workflows into the in-memory store"""
+        if not self.repository:
+            return
+        
+        for workflow_data in await self.repository.load_all('workflows'):
+            workflow_data.setdefault('version', 1)
+            if self.blobs and 'workflow_ref' not in workflow_data:
+                # Stored before chunking; move the document into the blob store
+                await self._store_document(workflow_data, workflow_data.pop('workflow_data'))
+                await self._persist(workflow_data)
+            self.store.add(workflow_data)
+        
+        if self.blobs:
+            refs = [workflow_data['workflow_ref'] for workflow_data in self.store.records.values()]
+            removed = await self.blobs.collect_garbage(refs)
+            logger.info(f"Removed {removed} unreferenced workflow chunks")
+        
+        logger.info(f"Loaded {len(self.store)} workflows from repository")
+    
+    async def cleanup(self) -> None:
+        """Wait for version history and chunk writes to finish"""
+        await self.history.close()
+        if self.blobs:
+            await self.blobs.close()
     
     async def create_workflow(self, workflow: WorkflowCreate) -> WorkflowResponse:
         """Create a new workflow"""
         workflow_id = str(uuid.uuid4())
         now = datetime.now()
         
+        # Reject cycles and dangling sockets up front, not at run time
+        plan = self.planner.compile(workflow_id, now, workflow.workflow_data)
+        
         workflow_data = {
             'id': workflow_id,
             'name': workflow.name,
             'description': workflow.description,
             'tags': workflow.tags,
-            'workflow_data': workflow.workflow_data,
+            'version': 1,
             'created_at': now,
             'updated_at': now
         }
+        await self._store_document(workflow_data, workflow.workflow_data)
         
-        self.workflows[workflow_id] = workflow_data
+        self.store.add(workflow_data)
+        self.planner.put(plan)
+        await self._persist(workflow_data)
+        await self._record_version(workflow_data, None, 'create')
         
         logger.info(f"Created workflow: {workflow_id}")
-        return WorkflowResponse(**workflow_data)
+        return WorkflowResponse(**self._loaded(workflow_data))
+    
+    async def create_workflows(self, workflows: List[WorkflowCreate], atomic: bool = False) -> List[WorkflowBatchItem]:
+        """Create many workflows in one pass
+        
+        Every workflow is compiled before any is stored, then the valid ones
+        are added to the store together and written through in one
+        repository transaction.
+        With atomic set, a single invalid workflow means none are created.
+        """
+        now = datetime.now()
+        plans: Dict[int, ExecutionPlan] = {}
+        invalid: Dict[int, str] = {}
+        for index, workflow in enumerate(workflows):
+            try:
+                plans[index] = self.planner.compile(str(uuid.uuid4()), now, workflow.workflow_data)
+            except ValueError as e:
+                invalid[index] = str(e)
+        if atomic and invalid:
+            return [
+                WorkflowBatchItem(index=index, status='invalid', error=invalid.get(index, 'Another workflow in the batch is invalid'))
+                for index in range(len(workflows))
+            ]
+        
+        records = []
+        for index, plan in plans.items():
+            workflow = workflows[index]
+            workflow_data = {
+                'id': plan.workflow_id,
+                'name': workflow.name,
+                'description': workflow.description,
+                'tags': workflow.tags,
+                'version': 1,
+                'created_at': now,
+                'updated_at': now
+            }
+            await self._store_document(workflow_data, workflow.workflow_data)
+            records.append(workflow_data)
+        
+        for workflow_data, plan in zip(records, plans.values()):
+            self.store.add(workflow_data)
+            self.planner.put(plan)
+        if self.repository:
+            await self.repository.save_many('workflows', records)
+        await asyncio.gather(*(self._record_version(workflow_data, None, 'create') for workflow_data in records))
+        
+        logger.info(f"Created {len(records)} workflows in one batch ({len(invalid)} invalid)")
+        return [
+            WorkflowBatchItem(index=index, status='invalid', error=invalid[index]) if index in invalid
+            else WorkflowBatchItem(index=index, id=plans[index].workflow_id, status='created')
+            for index in range(len(workflows))
+        ]
     
     async def get_workflow(self, workflow_id: str) -> Optional[WorkflowResponse]:
         """Get workflow by ID"""
-        workflow_data = self.workflows.get(workflow_id)
+        workflow_data = self.store.get(workflow_id)
         if workflow_data:
-            return WorkflowResponse(**workflow_data)
+            return WorkflowResponse(**self._loaded(workflow_data))
         return None
     
-    async def list_workflows(self, skip: int = 0, limit: int = 100) -> List[WorkflowResponse]:
-        """List workflows with pagination"""
-        workflows = list(self.workflows.values())
-        workflows.sort(key=lambda x: x['created_at'], reverse=True)
+    def workflow_version(self, workflow_id: str) -> Optional[int]:
+        """Current version of a workflow, for conditional requests"""
+        workflow_data = self.store.get(workflow_id)
+        return workflow_data['version'] if workflow_data else None
+    
+    def get_workflow_response(self, workflow_id: str) -> Optional[CachedResponse]:
+        """Serialized WorkflowResponse of a workflow, cached until it changes"""
+        workflow_data = self.store.get(workflow_id)
+        if workflow_data is None:
+            return None
+        cached = self.responses.get(workflow_id, workflow_data['version'])
+        if cached is None:
+            response = WorkflowResponse(**self._loaded(workflow_data))
+            body = response.json(separators=(',', ':'), ensure_ascii=False).encode()
+            cached = self.responses.put(workflow_id, workflow_data['version'], body)
+        return cached
+    
+    async def list_workflows(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> List[WorkflowResponse]:
+        """List workflows with pagination, newest first
         
-        paginated = workflows[skip:skip + limit]
-        return [WorkflowResponse(**workflow) for workflow in paginated]
+        Pass the cursor of the last workflow of the previous page to continue
+        the listing without re-walking the earlier pages.
+        """
+        paginated = self.store.query(
+            skip=skip,
+            limit=limit,
+            after=decode_cursor(cursor) if cursor else None
+        )
+        return [WorkflowResponse(**self._loaded(workflow)) for workflow in paginated]
     
     async def update_workflow(self, workflow_id: str, workflow_update: WorkflowUpdate) -> Optional[WorkflowResponse]:
         """Update workflow"""
-        if workflow_id not in self.workflows:
+        workflow_data = self.store.get(workflow_id)
+        if workflow_data is None:
             return None
         
-        workflow_data = self.workflows[workflow_id]
+        now = datetime.now()
+        previous = self._versioned(workflow_data)
+        plan = None
+        if workflow_update.workflow_data is not None:
+            plan = self.planner.compile(workflow_id, now, workflow_update.workflow_data)
         
         # Update fields
         if workflow_update.name is not None:
@@ -69,18 +246,256 @@ class WorkflowService:
             workflow_data['description'] = workflow_update.description
         if workflow_update.tags is not None:
             workflow_data['tags'] = workflow_update.tags
+        replaced = None
         if workflow_update.workflow_data is not None:
-            workflow_data['workflow_data'] = workflow_update.workflow_data
+            replaced = await self._store_document(workflow_data, workflow_update.workflow_data)
+        
+        workflow_data['updated_at'] = now
+        workflow_data['version'] += 1
+        self.responses.invalidate(workflow_id)
         
-        workflow_data['updated_at'] = datetime.now()
+        # Swap in the new plan; metadata-only edits keep the compiled one
+        cached = self.planner.invalidate(workflow_id)
+        if plan is None and cached is not None:
+            plan = replace(cached, version=now)
+        if plan is not None:
+            self.planner.put(plan)
+        await self._persist(workflow_data)
+        await self._release_document(replaced)
+        await self._record_version(workflow_data, previous, 'update')
         
         logger.info(f"Updated workflow: {workflow_id}")
-        return WorkflowResponse(**workflow_data)
+        return WorkflowResponse(**self._loaded(workflow_data))
+    
+    async def patch_workflow(
+        self,
+        workflow_id: str,
+        operations: List[Dict[str, Any]],
+        expected_version: Optional[int] = None,
+        reason: str = 'patch'
+    ) -> Optional[WorkflowPatchResult]:
+        """Apply an RFC 6902 JSON Patch to a workflow
+        
+        Paths are relative to the workflow record, e.g.
+        ``/workflow_data/nodes/3/position/x``. With expected_version set the
+        patch only applies to that version (optimistic concurrency). The
+        compiled plan is kept when only unplanned members such as canvas
+        positions change, patched when nodes change in place, and rebuilt
+        only when the graph or execution settings change.
+        """
+        workflow_data = self.store.get(workflow_id)
+        if workflow_data is None:
+            return None
+        if expected_version is not None and expected_version != workflow_data['version']:
+            raise WorkflowVersionConflict(workflow_id, expected_version, workflow_data['version'])
+        
+        paths = touched_paths(operations)
+        for path in paths:
+            if not path or path[0] not in PATCHABLE_FIELDS:
+                raise JsonPatchError(f"Only {', '.join(PATCHABLE_FIELDS)} can be patched")
+        
+        document = self._versioned(workflow_data)
+        patched = apply_patch(document, operations)
+        if not isinstance(patched, dict) or set(patched) != set(PATCHABLE_FIELDS):
+            raise JsonPatchError("A patch may not add or remove workflow fields")
+        if not isinstance(patched['name'], str):
+            raise JsonPatchError("Workflow name must be a string")
+        WorkflowUpdate(**patched)
+        
+        now = datetime.now()
+        impact = plan_impact(path[1:] for path in paths if path[0] == 'workflow_data')
+        previous = self.planner.peek(workflow_id)
+        if previous is not None and previous.version != workflow_data['updated_at']:
+            previous = None
+        
+        recompiled_nodes: List[str] = []
+        if impact is None or (impact and previous is None):
+            plan, outcome = self.planner.compile(workflow_id, now, patched['workflow_data']), 'recompiled'
+        elif impact:
+            plan, outcome = self.planner.recompile_nodes(previous, now, patched['workflow_data'], impact), 'patched'
+            nodes = patched['workflow_data'].get('nodes') or []
+            recompiled_nodes = [nodes[index]['id'] for index in sorted(impact) if index < len(nodes)]
+        else:
+            plan = replace(previous, version=now) if previous is not None else None
+            outcome = 'unchanged'
+        
+        replaced = None
+        if patched['workflow_data'] is not document['workflow_data']:
+            replaced = await self._store_document(workflow_data, patched['workflow_data'])
+        patched.pop('workflow_data')
+        workflow_data.update(patched)
+        workflow_data['updated_at'] = now
+        workflow_data['version'] += 1
+        self.responses.invalidate(workflow_id)
+        self.planner.invalidate(workflow_id)
+        if plan is not None:
+            self.planner.put(plan)
+        await self._persist(workflow_data)
+        await self._release_document(replaced)
+        await self._record_version(workflow_data, document, reason)
+        
+        logger.info(f"Patched workflow {workflow_id} to version {workflow_data['version']} (plan {outcome})")
+        return WorkflowPatchResult(
+            id=workflow_id,
+            version=workflow_data['version'],
+            updated_at=now,
+            plan=outcome,
+            recompiled_nodes=recompiled_nodes
+        )
+    
+    async def list_versions(self, workflow_id: str) -> Optional[List[WorkflowVersionInfo]]:
+        """Recorded versions of a workflow, newest first"""
+        if workflow_id not in self.store:
+            return None
+        return [WorkflowVersionInfo(**info) for info in await self.history.list_versions(workflow_id)]
+    
+    async def get_version(self, workflow_id: str, version: int) -> Optional[WorkflowVersion]:
+        """A workflow as of one of its recorded versions"""
+        if workflow_id not in self.store:
+            return None
+        document = await self.history.get_version(workflow_id, version)
+        if document is None:
+            return None
+        return WorkflowVersion(id=workflow_id, version=version, **document)
+    
+    async def rollback_workflow(
+        self,
+        workflow_id: str,
+        version: int,
+        expected_version: Optional[int] = None
+    ) -> Optional[WorkflowPatchResult]:
+        """Make a recorded version current again
+        
+        The rollback is saved as a new version whose diff undoes the changes
+        made since, so history is never rewritten and the compiled plan is
+        only rebuilt as far as those changes require.
+        """
+        if workflow_id not in self.store:
+            return None
+        target = await self.history.get_version(workflow_id, version)
+        if target is None:
+            raise LookupError(f"Version {version} of workflow {workflow_id} is not recorded")
+        
+        workflow_data = self.store.get(workflow_id)
+        if workflow_data is None:
+            return None
+        operations = make_patch(self._versioned(workflow_data), target)
+        return await self.patch_workflow(workflow_id, operations, expected_version, reason=f"rollback to {version}")
     
     async def delete_workflow(self, workflow_id: str) -> bool:
         """Delete workflow"""
-        if workflow_id in self.workflows:
-            del self.workflows[workflow_id]
+        workflow_data = self.store.remove(workflow_id)
+        if workflow_data is not None:
+            self.planner.invalidate(workflow_id)
+            self.responses.invalidate(workflow_id)
+            await self.history.drop(workflow_id)
+            if self.repository:
+                await self.repository.delete('workflows', workflow_id)
+            await self._release_document(workflow_data.get('workflow_ref'))
             logger.info(f"Deleted workflow: {workflow_id}")
             return True
-        return False
\ No newline at end of file
+        return False
+    
+    async def delete_workflows(self, workflow_ids: List[str]) -> List[WorkflowBatchItem]:
+        """Delete many workflows; the store is updated before anything is awaited"""
+        results = []
+        deleted = []
+        refs = []
+        for index, workflow_id in enumerate(dict.fromkeys(workflow_ids)):
+            workflow_data = self.store.remove(workflow_id)
+            if workflow_data is None:
+                results.append(WorkflowBatchItem(index=index, id=workflow_id, status='not_found'))
+                continue
+            self.planner.invalidate(workflow_id)
+            self.responses.invalidate(workflow_id)
+            deleted.append(workflow_id)
+            refs.append(workflow_data.get('workflow_ref'))
+            results.append(WorkflowBatchItem(index=index, id=workflow_id, status='deleted'))
+        
+        await asyncio.gather(*(self.history.drop(workflow_id) for workflow_id in deleted))
+        if self.repository:
+            await self.repository.delete_many('workflows', deleted)
+        for ref in refs:
+            await self._release_document(ref)
+        logger.info(f"Deleted {len(deleted)} workflows in one batch")
+        return results
+    
+    def get_plan(self, workflow_id: str) -> Optional[ExecutionPlan]:
+        """Get the execution plan of a workflow; cached until the next update"""
+        workflow_data = self.store.get(workflow_id)
+        if workflow_data is None:
+            return None
+        return self.planner.get_plan(self._loaded(workflow_data))
+    
+    async def execute_workflow(
+        self,
+        workflow_id: str,
+        progress: Optional[ProgressCallback] = None
+    ) -> ExecutionResult:
+        """Run a workflow's execution plan"""
+        plan = self.get_plan(workflow_id)
+        if plan is None:
+            raise LookupError(f"Workflow {workflow_id} not found")
+        return await self.executor.execute(plan, progress=progress)
+    
+    async def run_task_workflow(
+        self,
+        task_data: dict,
+        progress: Optional[ProgressCallback] = None
+    ) -> ExecutionResult:
+        """Task runner: execute the task's workflow and fail if any node failed"""
+        result = await self.execute_workflow(task_data['workflow_id'], progress=progress)
+        if not result.success:
+            errors = '; '.join(f"{node_id}: {error}" for node_id, error in result.errors.items())
+            raise RuntimeError(f"Workflow execution failed ({errors})")
+        return result
+    
+    def _document(self, workflow_data: dict) -> dict:
+        """A record's workflow_data, read through the blob store if it holds it"""
+        if 'workflow_ref' in workflow_data:
+            return self.blobs.load(workflow_data['workflow_ref'])
+        return workflow_data['workflow_data']
+    
+    def _loaded(self, workflow_data: dict) -> dict:
+        """A copy of a record with its workflow_data; the record itself keeps only the ref"""
+        if 'workflow_ref' not in workflow_data:
+            return workflow_data
+        return {**workflow_data, 'workflow_data': self._document(workflow_data)}
+    
+    def _versioned(self, workflow_data: dict) -> dict:
+        """The members of a record that version history keeps"""
+        workflow_data = self._loaded(workflow_data)
+        return {name: workflow_data[name] for name in PATCHABLE_FIELDS}
+    
+    async def _record_version(self, workflow_data: dict, previous: Optional[dict], reason: str) -> None:
+        await self.history.record(
+            workflow_data['id'],
+            workflow_data['version'],
+            self._versioned(workflow_data),
+            previous,
+            reason=reason,
+            timestamp=workflow_data['updated_at']
+        )
+    
+    async def _store_document(self, workflow_data: dict, document: dict) -> Optional[str]:
+        """Set a record's workflow_data, storing it as chunks if a blob store is configured
+        
+        Returns the ref of the document it replaces, to release once the
+        record pointing at the new one is persisted.
+        """
+        if not self.blobs:
+            workflow_data['workflow_data'] = document
+            return None
+        replaced = workflow_data.get('workflow_ref')
+        workflow_data['workflow_ref'], _ = await self.blobs.put(document)
+        return replaced
+    
+    async def _release_document(self, ref: Optional[str]) -> None:
+        """Release a document no record points at any more, deleting its unshared chunks"""
+        if self.blobs and ref:
+            await self.blobs.release(ref)
+    
+    async def _persist(self, workflow_data: dict) -> None:
+        """Write a workflow through to the repository, if one is configured"""
+        if self.repository:
+            await self.repository.save('workflows', workflow_data)
\ No newline at end of file
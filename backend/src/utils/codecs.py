@@ -0,0 +1,113 @@
+"""
+Wire Codecs
+消息编解码 - 标准库JSON回退、orjson快速路径与msgpack二进制格式
+"""
+
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional binary format
+    msgpack = None
+
+Frame = Union[str, bytes]
+
+
+class Codec(ABC):
+    """Encodes messages into WebSocket frames and back"""
+
+    name = ""
+    # Binary codecs produce bytes frames; text codecs produce str frames
+    binary = False
+
+    @abstractmethod
+    def encode(self, message: Any) -> Frame:
+        ...
+
+    @abstractmethod
+    def decode(self, frame: Frame) -> Any:
+        ...
+
+
+class JsonCodec(Codec):
+    """Standard library JSON; always available"""
+
+    name = "json"
+
+    def encode(self, message: Any) -> Frame:
+        return json.dumps(message)
+
+    def decode(self, frame: Frame) -> Any:
+        return json.loads(frame)
+
+
+class OrjsonCodec(Codec):
+    """JSON text through orjson; the same wire format as JsonCodec, only faster"""
+
+    name = "orjson"
+
+    def encode(self, message: Any) -> Frame:
+        try:
+            return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            # e.g. integers beyond 64 bits, which the stdlib still handles
+            return json.dumps(message)
+
+    def decode(self, frame: Frame) -> Any:
+        return orjson.loads(frame)
+
+
+class MsgpackCodec(Codec):
+    """Binary MessagePack frames, negotiated by plugins that support it"""
+
+    name = "msgpack"
+    binary = True
+
+    def encode(self, message: Any) -> Frame:
+        return msgpack.packb(message, use_bin_type=True, default=_msgpack_default)
+
+    def decode(self, frame: Frame) -> Any:
+        return msgpack.unpackb(frame, raw=False)
+
+
+def _msgpack_default(value: Any) -> Any:
+    # Match what the JSON codecs do with timestamps
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def available_codecs() -> Dict[str, Codec]:
+    """Codecs usable in this process, keyed by wire name"""
+    codecs: Dict[str, Codec] = {"json": JsonCodec()}
+    if orjson is not None:
+        codecs["orjson"] = OrjsonCodec()
+    if msgpack is not None:
+        codecs["msgpack"] = MsgpackCodec()
+    return codecs
+
+
+def default_text_codec(codecs: Dict[str, Codec]) -> Codec:
+    """Fastest available codec that speaks plain JSON text"""
+    return codecs.get("orjson") or codecs["json"]
+
+
+def negotiate_codec(offered: Optional[Iterable[str]], codecs: Dict[str, Codec]) -> Codec:
+    """Pick the first codec the peer offered that is available here
+
+    ``"json"`` and ``"orjson"`` are the same wire format, so a JSON peer
+    always gets the fastest JSON encoder available.
+    """
+    for name in offered or ():
+        if name in ("json", "orjson"):
+            return default_text_codec(codecs)
+        if name in codecs:
+            return codecs[name]
+    return default_text_codec(codecs)
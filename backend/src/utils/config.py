@@ -16,8 +16,36 @@ class WebSocketSettings(BaseSettings):
     host: str = "localhost"
     path: str = "/ws"
     heartbeat_interval: int = 30
+    # Unanswered pings in a row before a connection is dropped
+    heartbeat_max_missed: int = 2
     reconnect_attempts: int = 5
     reconnect_delay: int = 5
+    # Frames queued per connection before progress updates are shed
+    outbound_queue_size: int = 256
+    # Largest single frame accepted; bigger payloads use chunked transfers
+    max_message_size: int = 16 * 1024 * 1024
+    # permessage-deflate: "deflate" or "none"
+    compression: str = "deflate"
+    compression_level: int = 6
+    compression_memory_level: int = 5
+    compression_window_bits: int = 12
+    # Chunked transfers stay in memory up to this size, then spill to disk
+    chunk_spool_memory: int = 8 * 1024 * 1024
+    max_transfer_size: int = 1024 * 1024 * 1024
+    # Message handlers running at once per connection
+    max_inflight_handlers: int = 16
+    # Message types handled strictly in arrival order per node_id
+    ordered_message_types: List[str] = [
+        "node_connection_request",
+        "node_update",
+        "element_selected",
+        "operation_defined",
+        "connection_status"
+    ]
+    
+    class Config:
+        # Without a prefix, `path` and `host` would be read from $PATH and $HOST
+        env_prefix = "WEBSOCKET_"
 
 
 class DatabaseSettings(BaseSettings):
@@ -26,6 +54,8 @@ class DatabaseSettings(BaseSettings):
     echo: bool = False
     pool_size: int = 5
     max_overflow: int = 10
+    synchronous: str = "FULL"
+    commit_batch_size: int = 512
 
 
 class SecuritySettings(BaseSettings):
@@ -69,6 +99,9 @@ class Settings(BaseSettings):
     camoufox_profile_path: str = "./storage/profiles"
     max_browser_instances: int = 5
     browser_timeout: int = 30
+    # Recycle a pooled browser after this many leases or this much memory growth
+    browser_max_uses: int = 50
+    browser_max_memory_growth_mb: int = 512
     
     # Task execution settings
     max_concurrent_tasks: int = 3
@@ -76,6 +109,40 @@ class Settings(BaseSettings):
     retry_attempts: int = 3
     retry_delay: int = 5
     
+    # Decoded workflow chunks kept in memory and shared between workflows
+    workflow_chunk_cache_entries: int = 65536
+    # Version history stores diffs against the previous version, with the
+    # full document at least every this many versions
+    workflow_checkpoint_interval: int = 100
+    
+    # Serialized GET responses per service, and the size from which
+    # responses are gzip-compressed
+    response_cache_max_entries: int = 1024
+    response_cache_max_bytes: int = 32 * 1024 * 1024
+    gzip_minimum_size: int = 1000
+    
+    # Compiled workflow plan cache
+    plan_cache_max_entries: int = 512
+    plan_cache_max_bytes: int = 64 * 1024 * 1024
+    
+    # Task event log; the repository holds a snapshot every
+    # task_snapshot_interval events
+    task_event_path: str = "./storage/tasks"
+    task_event_fsync: bool = True
+    task_snapshot_interval: int = 1000
+    # Execution log entries kept in memory per task; older ones are spilled
+    # to compressed segments under log_storage_path in chunks of this size
+    task_log_ring_size: int = 100
+    # Task deltas kept for SSE clients resuming with Last-Event-ID, and how
+    # far a client may fall behind before it is disconnected
+    task_stream_history_size: int = 4096
+    task_stream_max_pending: int = 1024
+    
+    # Scheduler settings
+    # Missed fires after a restart: "skip" them, run "once", or replay "all"
+    scheduler_misfire_policy: str = "skip"
+    scheduler_max_catchup: int = 10
+    
     class Config:
         env_file = ".env"
         env_nested_delimiter = "__"
@@ -94,6 +161,7 @@ def create_directories(settings: Settings) -> None:
         settings.workflow_storage_path,
         settings.cookie_storage_path,
         settings.log_storage_path,
+        settings.task_event_path,
         settings.camoufox_profile_path
     ]
     
@@ -0,0 +1,122 @@
+"""
+Cron Expressions
+Cron表达式解析
+"""
+
+from datetime import datetime, timedelta
+from typing import FrozenSet, List
+
+MACROS = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *',
+}
+
+MONTH_NAMES = {
+    name: index + 1 for index, name in enumerate(
+        ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+    )
+}
+WEEKDAY_NAMES = {
+    name: index for index, name in enumerate(['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat'])
+}
+
+# Searching further than this without a match means the expression never fires
+MAX_SEARCH_DAYS = 366 * 5
+
+
+def _parse_value(value: str, names: dict) -> int:
+    lowered = value.lower()
+    if lowered in names:
+        return names[lowered]
+    return int(value)
+
+
+def _parse_field(field: str, low: int, high: int, names: dict) -> FrozenSet[int]:
+    """Parse one cron field (``*``, ``a-b``, ``*/n``, ``a-b/n`` and lists)"""
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step <= 0:
+                raise ValueError(f"Invalid step in cron field: {field}")
+
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start_text, end_text = part.split('-', 1)
+            start, end = _parse_value(start_text, names), _parse_value(end_text, names)
+        else:
+            start = _parse_value(part, names)
+            end = high if step > 1 else start
+
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron field out of range: {field}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronExpression:
+    """Standard five-field cron expression (minute hour day month weekday)"""
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        fields = MACROS.get(expression.strip().lower(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression must have 5 fields: {expression}")
+
+        minute, hour, day, month, weekday = fields
+        self.minutes: List[int] = sorted(_parse_field(minute, 0, 59, {}))
+        self.hours = _parse_field(hour, 0, 23, {})
+        self.days = _parse_field(day, 1, 31, {})
+        self.months = _parse_field(month, 1, 12, MONTH_NAMES)
+        # Both 0 and 7 mean Sunday
+        self.weekdays = frozenset(d % 7 for d in _parse_field(weekday, 0, 7, WEEKDAY_NAMES))
+        # As in Vixie cron, a field starting with '*' (such as '*/2') does not
+        # restrict the day, even if the step skips some days
+        self.day_restricted = not day.startswith('*')
+        self.weekday_restricted = not weekday.startswith('*')
+
+    def __repr__(self) -> str:
+        return f"CronExpression({self.expression!r})"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        # Vixie cron: when both fields are restricted either one may match
+        if self.day_restricted and self.weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, after: datetime) -> datetime:
+        """Get the first fire time strictly after ``after``"""
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=MAX_SEARCH_DAYS)
+
+        while moment < limit:
+            if moment.month not in self.months:
+                year = moment.year + (moment.month == 12)
+                month = moment.month % 12 + 1
+                moment = moment.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+
+            if not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+
+            if moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+                continue
+
+            for minute in self.minutes:
+                if minute >= moment.minute:
+                    return moment.replace(minute=minute)
+            moment = (moment + timedelta(hours=1)).replace(minute=0)
+
+        raise ValueError(f"Cron expression never fires: {self.expression}")
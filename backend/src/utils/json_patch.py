@@ -0,0 +1,254 @@
+"""
+JSON Patch
+JSON补丁 - RFC 6902 补丁应用，写时复制仅复制被修改路径上的容器
+"""
+
+from typing import Any, Dict, Iterable, List, Sequence
+
+OPERATIONS = ('add', 'remove', 'replace', 'move', 'copy', 'test')
+
+
+class JsonPatchError(ValueError):
+    """Raised when a patch is malformed or does not apply to the document"""
+
+
+def parse_pointer(pointer: Any) -> List[str]:
+    """Split an RFC 6901 JSON Pointer into unescaped reference tokens"""
+    if not isinstance(pointer, str):
+        raise JsonPatchError(f"JSON Pointer must be a string: {pointer!r}")
+    if pointer == '':
+        return []
+    if not pointer.startswith('/'):
+        raise JsonPatchError(f"JSON Pointer must start with '/': {pointer!r}")
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def touched_paths(operations: Iterable[Dict[str, Any]]) -> List[List[str]]:
+    """Token paths a patch writes to; 'move' writes both its source and target"""
+    paths = []
+    for operation in operations:
+        if operation.get('op') == 'test':
+            continue
+        paths.append(parse_pointer(operation.get('path')))
+        if operation.get('op') == 'move':
+            paths.append(parse_pointer(operation.get('from')))
+    return paths
+
+
+def apply_patch(document: Any, operations: Sequence[Dict[str, Any]]) -> Any:
+    """Apply a JSON Patch and return the patched document
+
+    The input is never modified: containers along each written path are
+    copied and everything else is shared with the original, so a failing
+    operation leaves no partial changes behind and a small edit to a large
+    document costs only the depth of the edit.
+    """
+    if not isinstance(operations, (list, tuple)):
+        raise JsonPatchError("A JSON Patch must be an array of operations")
+    for index, operation in enumerate(operations):
+        try:
+            document = _apply_operation(document, operation)
+        except JsonPatchError as e:
+            raise JsonPatchError(f"Operation {index}: {e}") from None
+    return document
+
+
+def make_patch(source: Any, target: Any) -> List[Dict[str, Any]]:
+    """Compute a JSON Patch that turns source into target
+
+    Subtrees that are the same object in both are skipped without being
+    compared, so diffing a document against a copy-on-write edit of it
+    costs the size of the edit.
+    """
+    operations: List[Dict[str, Any]] = []
+    _diff(source, target, '', operations)
+    return operations
+
+
+def format_pointer(tokens: Iterable[Any]) -> str:
+    """Join reference tokens into an RFC 6901 JSON Pointer"""
+    return ''.join('/' + str(token).replace('~', '~0').replace('/', '~1') for token in tokens)
+
+
+def _diff(source: Any, target: Any, pointer: str, operations: List[Dict[str, Any]]) -> None:
+    if source is target:
+        return
+    if isinstance(source, dict) and isinstance(target, dict):
+        for key in source:
+            if key not in target:
+                operations.append({'op': 'remove', 'path': pointer + format_pointer([key])})
+        for key, value in target.items():
+            path = pointer + format_pointer([key])
+            if key in source:
+                _diff(source[key], value, path, operations)
+            else:
+                operations.append({'op': 'add', 'path': path, 'value': value})
+        return
+    if isinstance(source, list) and isinstance(target, list):
+        _diff_list(source, target, pointer, operations)
+        return
+    if not _json_equal(source, target):
+        operations.append({'op': 'replace', 'path': pointer, 'value': target})
+
+
+def _diff_list(source: List[Any], target: List[Any], pointer: str, operations: List[Dict[str, Any]]) -> None:
+    # Trim the common head and tail, then diff what is left pairwise and
+    # remove or append the difference in length at the end of it
+    limit = min(len(source), len(target))
+    head = 0
+    while head < limit and (source[head] is target[head] or _json_equal(source[head], target[head])):
+        head += 1
+    tail = 0
+    while tail < limit - head and (
+        source[-1 - tail] is target[-1 - tail] or _json_equal(source[-1 - tail], target[-1 - tail])
+    ):
+        tail += 1
+
+    old = len(source) - head - tail
+    new = len(target) - head - tail
+    for offset in range(min(old, new)):
+        _diff(source[head + offset], target[head + offset], f"{pointer}/{head + offset}", operations)
+    for _ in range(old - new):
+        operations.append({'op': 'remove', 'path': f"{pointer}/{head + new}"})
+    for offset in range(old, new):
+        operations.append({'op': 'add', 'path': f"{pointer}/{head + offset}", 'value': target[head + offset]})
+
+
+def _apply_operation(document: Any, operation: Any) -> Any:
+    if not isinstance(operation, dict):
+        raise JsonPatchError("operation must be an object")
+    op = operation.get('op')
+    if op not in OPERATIONS:
+        raise JsonPatchError(f"unknown op {op!r}")
+    path = parse_pointer(operation.get('path'))
+
+    if op in ('add', 'replace', 'test') and 'value' not in operation:
+        raise JsonPatchError(f"'{op}' needs a value")
+
+    if op == 'add':
+        return _add(document, path, operation['value'])
+    if op == 'remove':
+        return _remove(document, path)
+    if op == 'replace':
+        _get(document, path)
+        if not path:
+            return operation['value']
+        return _update(document, path, lambda parent, key: _assign(parent, key, operation['value']))
+    if op == 'test':
+        if not _json_equal(_get(document, path), operation['value']):
+            raise JsonPatchError(f"test failed at {operation['path']!r}")
+        return document
+
+    source = parse_pointer(operation.get('from'))
+    value = _get(document, source)
+    if op == 'move':
+        if path[:len(source)] == source and len(path) > len(source):
+            raise JsonPatchError("cannot move a value into one of its children")
+        if path == source:
+            return document
+        document = _remove(document, source)
+    # Values are shared, not deep-copied: nothing is ever modified in place
+    return _add(document, path, value)
+
+
+def _get(document: Any, path: List[str]) -> Any:
+    value = document
+    for token in path:
+        if isinstance(value, dict):
+            if token not in value:
+                raise JsonPatchError(f"path /{'/'.join(path)} does not exist")
+            value = value[token]
+        elif isinstance(value, list):
+            index = _index(token, len(value))
+            if index >= len(value):
+                raise JsonPatchError(f"index {token} is out of range")
+            value = value[index]
+        else:
+            raise JsonPatchError(f"path /{'/'.join(path)} does not exist")
+    return value
+
+
+def _update(container: Any, path: List[str], change) -> Any:
+    """Copy container and the containers down to path's parent, then change the parent"""
+    if isinstance(container, dict):
+        copy = dict(container)
+    elif isinstance(container, list):
+        copy = list(container)
+    else:
+        raise JsonPatchError(f"cannot reach {path[0]!r} in a scalar")
+
+    if len(path) == 1:
+        change(copy, path[0])
+        return copy
+
+    key: Any = path[0]
+    if isinstance(copy, list):
+        key = _index(key, len(copy))
+        if key >= len(copy):
+            raise JsonPatchError(f"index {path[0]} is out of range")
+    elif key not in copy:
+        raise JsonPatchError(f"member {key!r} does not exist")
+    copy[key] = _update(copy[key], path[1:], change)
+    return copy
+
+
+def _add(document: Any, path: List[str], value: Any) -> Any:
+    if not path:
+        return value
+
+    def add(parent: Any, key: str) -> None:
+        if isinstance(parent, dict):
+            parent[key] = value
+        elif key == '-':
+            parent.append(value)
+        else:
+            index = _index(key, len(parent))
+            if index > len(parent):
+                raise JsonPatchError(f"index {key} is out of range")
+            parent.insert(index, value)
+
+    return _update(document, path, add)
+
+
+def _remove(document: Any, path: List[str]) -> Any:
+    if not path:
+        raise JsonPatchError("cannot remove the whole document")
+
+    def remove(parent: Any, key: str) -> None:
+        if isinstance(parent, dict):
+            if key not in parent:
+                raise JsonPatchError(f"member {key!r} does not exist")
+            del parent[key]
+        else:
+            index = _index(key, len(parent))
+            if index >= len(parent):
+                raise JsonPatchError(f"index {key} is out of range")
+            del parent[index]
+
+    return _update(document, path, remove)
+
+
+def _assign(parent: Any, key: str, value: Any) -> None:
+    if isinstance(parent, dict):
+        parent[key] = value
+    else:
+        parent[_index(key, len(parent))] = value
+
+
+def _index(token: str, length: int) -> int:
+    if token == '-':
+        return length
+    if not token.isdigit() or (len(token) > 1 and token[0] == '0'):
+        raise JsonPatchError(f"invalid array index {token!r}")
+    return int(token)
+
+
+def _json_equal(a: Any, b: Any) -> bool:
+    # JSON has no booleans-as-numbers, unlike Python
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_json_equal(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_json_equal(x, y) for x, y in zip(a, b))
+    return a == b
@@ -0,0 +1,80 @@
+"""
+Broadcast and outbound queue tests
+广播与出站队列测试
+"""
+
+import asyncio
+
+from src.services.communication_service import CommunicationService
+from src.services.outbound_queue import CLOSE_CODE_TRY_AGAIN_LATER, OutboundQueue
+from src.utils.config import WebSocketSettings
+
+
+class SlowSocket:
+    """WebSocket stand-in whose sends wait until the test lets them through"""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.sent = []
+        self.closed_with = None
+
+    async def send(self, frame):
+        await self.gate.wait()
+        self.sent.append(frame)
+
+    async def close(self, code=1000, reason=''):
+        self.closed_with = code
+
+
+def progress(task_id: str, step: int) -> dict:
+    return {'type': 'task_status_update', 'payload': {'task_id': task_id, 'status': 'executing', 'step': step}}
+
+
+def test_progress_updates_coalesce_while_the_peer_lags():
+    async def scenario():
+        service = CommunicationService(WebSocketSettings(outbound_queue_size=8))
+        sockets = {}
+        for connection_id in ('fast', 'slow'):
+            sockets[connection_id] = SlowSocket()
+            service.outbound[connection_id] = OutboundQueue(connection_id, sockets[connection_id], 8)
+            service.outbound[connection_id].start()
+        sockets['fast'].gate.set()
+
+        for step in range(5):
+            assert await service.broadcast_message(progress('t1', step)) == 2
+            await asyncio.sleep(0)
+        await service.broadcast_message({'type': 'task_completed', 'payload': {'task_id': 't1'}})
+        await asyncio.sleep(0)
+        sockets['slow'].gate.set()
+        await asyncio.sleep(0.01)
+
+        decode = service.default_codec.decode
+        fast_steps = [decode(frame)['payload'].get('step') for frame in sockets['fast'].sent]
+        slow_steps = [decode(frame)['payload'].get('step') for frame in sockets['slow'].sent]
+        assert fast_steps == [0, 1, 2, 3, 4, None]
+        # The first frame was already being sent; the rest collapsed into the latest
+        assert slow_steps == [0, 4, None]
+        assert service.outbound['slow'].stats['coalesced'] == 3
+        for queue in service.outbound.values():
+            await queue.close()
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_sheds_progress_before_closing_a_slow_peer():
+    async def scenario():
+        socket = SlowSocket()
+        queue = OutboundQueue('conn', socket, 2)
+
+        assert queue.put('progress', coalesce_key='t1')
+        assert queue.put('result-1')
+        # Full: the droppable frame makes room
+        assert queue.put('result-2')
+        assert queue.stats['dropped'] == 1
+        # Full of frames that must be delivered: the peer is dropped
+        assert not queue.put('result-3')
+        await asyncio.sleep(0)
+        assert queue.closed and socket.closed_with == CLOSE_CODE_TRY_AGAIN_LATER
+        await queue.close()
+
+    asyncio.run(scenario())
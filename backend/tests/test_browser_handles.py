@@ -0,0 +1,87 @@
+"""
+Browser handle passing tests
+浏览器句柄传递测试
+"""
+
+import asyncio
+
+from src.services.browser_handles import BrowserHandleRef, BrowserHandleRegistry
+from src.services.browser_runner import BrowserNodeRunner
+from src.services.state_manager import StateManager
+from src.services.workflow_planner import WorkflowExecutor, build_plan
+
+from .test_browser_pool import FakeDriver, make_pool
+
+
+def handle_edge(edge_id: str, from_node: str, to_node: str) -> dict:
+    return {
+        'id': edge_id,
+        'from_node': from_node,
+        'from_socket': 'browser_handle',
+        'to_node': to_node,
+        'to_socket': 'browser_handle'
+    }
+
+
+def test_handle_is_freed_after_its_last_consumer():
+    async def scenario():
+        pool = make_pool(FakeDriver(), max_browser_instances=1)
+        await pool.start()
+        handles = BrowserHandleRegistry(StateManager())
+        runner = BrowserNodeRunner(pool, handles)
+        plan = build_plan('wf', None, {
+            'nodes': [
+                {'id': 'open', 'type': 'browser_navigator', 'properties': {'url': 'https://shop.example/'}},
+                {'id': 'first', 'type': 'data_extractor'},
+                {'id': 'second', 'type': 'data_extractor'}
+            ],
+            'connections': [
+                handle_edge('e1', 'open', 'first'),
+                handle_edge('e2', 'open', 'second')
+            ],
+            'execution_config': {'mode': 'sequential'}
+        })
+
+        # References held on each received handle when a consumer starts
+        refcounts = {}
+
+        async def recording_runner(node, inputs):
+            for value in inputs.values():
+                if isinstance(value, BrowserHandleRef):
+                    refcounts[node.id] = handles.get(value).refcount
+            return await runner(node, inputs)
+
+        result = await WorkflowExecutor(recording_runner, handles=handles).execute(plan)
+
+        assert result.success
+        ref = result.outputs['open']['browser_handle']
+        assert result.outputs['first']['browser_handle'] == ref
+        # Both consumers were retained before either ran; the first one's
+        # release left the handle alive for the second
+        assert refcounts == {'first': 2, 'second': 1}
+        assert ref not in handles.handles
+        assert handles.stats['released'] == 1
+        assert pool.get_stats()['in_use'] == 0
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+
+def test_unconsumed_handle_is_freed_when_its_node_finishes():
+    async def scenario():
+        pool = make_pool(FakeDriver(), max_browser_instances=1)
+        await pool.start()
+        handles = BrowserHandleRegistry(StateManager())
+        plan = build_plan('wf', None, {
+            'nodes': [{'id': 'open', 'type': 'browser_navigator', 'properties': {'url': 'shop.example'}}],
+            'connections': []
+        })
+
+        result = await WorkflowExecutor(BrowserNodeRunner(pool, handles), handles=handles).execute(plan)
+
+        assert result.success
+        assert handles.get_stats()['live_handles'] == 0
+        assert pool.get_stats()['idle'] == 1
+        await pool.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,267 @@
+"""
+Browser pool tests
+浏览器实例池测试
+"""
+
+import asyncio
+
+import pytest
+
+from src.services.browser_handles import BrowserHandleRegistry
+from src.services.browser_pool import BrowserDriver, BrowserPool
+from src.services.browser_runner import BrowserNodeRunner
+from src.services.state_manager import StateManager
+from src.services.workflow_planner import build_plan
+from src.utils.config import Settings
+
+
+class FakeDriver(BrowserDriver):
+    """Hands out dicts instead of browsers and records what happened to them"""
+
+    def __init__(self, available: bool = True):
+        self.available = available
+        self.launched = []
+        self.closed = []
+        self.visits = []
+        self.operations = []
+
+    def is_available(self) -> bool:
+        return self.available
+
+    async def launch(self, instance_id):
+        self.launched.append(instance_id)
+        return {'id': instance_id}
+
+    async def close(self, handle):
+        self.closed.append(handle['id'])
+
+    async def navigate(self, handle, url):
+        self.visits.append((handle['id'], url))
+
+    async def run_operation(self, handle, operation):
+        self.operations.append((handle['id'], operation.unit_id))
+        if operation.action_type == 'extract':
+            return f"text of {operation.action_target.value}"
+        return None
+
+
+def make_pool(driver: BrowserDriver, **settings) -> BrowserPool:
+    settings.setdefault('browser_max_memory_growth_mb', 0)
+    return BrowserPool(Settings(**settings), driver)
+
+
+async def settle(pool: BrowserPool) -> None:
+    """Wait for background replacement launches"""
+    while pool._background:
+        await asyncio.gather(*pool._background)
+
+
+def test_driver_must_implement_launch_and_close():
+    class Incomplete(BrowserDriver):
+        async def launch(self, instance_id):
+            return instance_id
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_acquire_prefers_instance_with_cookies_for_domain():
+    async def scenario():
+        pool = make_pool(FakeDriver(), max_browser_instances=2)
+        await pool.start()
+
+        shop = await pool.acquire("https://www.shop.example/cart")
+        await pool.release(shop)
+        other = await pool.acquire("news.example")
+        assert other.id != shop.id
+        await pool.release(other)
+
+        again = await pool.acquire("http://shop.example/login")
+        assert again.id == shop.id
+        assert pool.stats['affinity_hits'] == 1
+        assert pool.stats['cold_launches'] == 0
+        await pool.release(again)
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+
+def test_instance_is_recycled_after_max_uses():
+    async def scenario():
+        driver = FakeDriver()
+        pool = make_pool(driver, max_browser_instances=1, browser_max_uses=2)
+        await pool.start()
+        first = driver.launched[0]
+
+        for _ in range(2):
+            await pool.release(await pool.acquire())
+        await settle(pool)
+
+        assert driver.closed == [first]
+        assert pool.stats['recycled'] == 1
+        assert len(driver.launched) == 2
+        assert pool.get_stats()['idle'] == 1
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+
+def test_failed_lease_is_replaced_by_a_warm_instance():
+    async def scenario():
+        driver = FakeDriver()
+        pool = make_pool(driver, max_browser_instances=1)
+        await pool.start()
+
+        with pytest.raises(RuntimeError):
+            async with pool.lease("shop.example"):
+                raise RuntimeError("page crashed")
+        await settle(pool)
+
+        assert driver.closed == driver.launched[:1]
+        instance = await pool.acquire("shop.example")
+        assert instance.id == driver.launched[1]
+        assert pool.stats['warm_hits'] == 2
+        assert pool.stats['cold_launches'] == 0
+        await pool.release(instance)
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+
+def test_waiter_wakes_when_a_replacement_launch_fails():
+    class FlakyDriver(FakeDriver):
+        fail = False
+
+        async def launch(self, instance_id):
+            if self.fail:
+                raise RuntimeError("browser crashed on launch")
+            return await super().launch(instance_id)
+
+    async def scenario():
+        driver = FlakyDriver()
+        pool = make_pool(driver, max_browser_instances=1, browser_timeout=30)
+        await pool.start()
+        leased = await pool.acquire()
+        waiter = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0)
+
+        driver.fail = True
+        await pool.release(leased, discard=True)
+        await settle(pool)
+        # The waiter tries the free slot itself instead of sleeping out its timeout
+        with pytest.raises(RuntimeError, match="crashed on launch"):
+            await asyncio.wait_for(waiter, timeout=2)
+
+        driver.fail = False
+        await pool.release(await asyncio.wait_for(pool.acquire(), timeout=2))
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+
+def test_node_runner_leases_browser_for_node_domain():
+    async def scenario():
+        driver = FakeDriver()
+        pool = make_pool(driver, max_browser_instances=2)
+        await pool.start()
+        plan = build_plan('wf', None, {
+            'nodes': [
+                {'id': 'open', 'type': 'browser_navigator', 'properties': {'url': 'https://www.shop.example/'}},
+                {'id': 'pause', 'type': 'delay_wait', 'properties': {'seconds': 1}}
+            ],
+            'connections': []
+        })
+        handles = BrowserHandleRegistry(StateManager())
+        runner = BrowserNodeRunner(pool, handles)
+
+        assert await runner(plan.nodes['pause'], {'value': 1}) == {'value': 1}
+        assert driver.visits == []
+
+        output = await runner(plan.nodes['open'], {})
+        visited, url = driver.visits[0]
+        assert url == 'https://www.shop.example/'
+        assert pool._instances[visited].domains == {'shop.example'}
+        assert pool.get_stats()['in_use'] == 1
+
+        await handles.release_if_unused(output['browser_handle'])
+        assert pool.get_stats()['in_use'] == 0
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+
+def test_node_runner_runs_operation_units_on_the_leased_browser():
+    async def scenario():
+        driver = FakeDriver()
+        pool = make_pool(driver, max_browser_instances=1)
+        await pool.start()
+        units = [
+            {'id': 'go', 'action': {'type': 'navigate', 'parameters': {'url': 'https://shop.example/cart'}}},
+            {
+                'id': 'total',
+                'observation': {'type': 'element_exists', 'target': {'primary': {'type': 'css', 'value': '.total'}}},
+                'action': {'type': 'extract', 'target': {'primary': {'type': 'css', 'value': '.total'}}}
+            }
+        ]
+        plan = build_plan('wf', None, {
+            'nodes': [
+                {'id': 'read', 'type': 'web_action', 'properties': {}, 'operation_units': units},
+                {'id': 'branchy', 'type': 'web_action', 'properties': {}, 'operation_units': [
+                    {'id': 'check', 'condition': {'type': 'if', 'true_branch': units}}
+                ]}
+            ],
+            'connections': []
+        })
+        handles = BrowserHandleRegistry(StateManager())
+        runner = BrowserNodeRunner(pool, handles)
+
+        output = await runner(plan.nodes['read'], {})
+        instance_id = handles.get(output['browser_handle']).instance_id
+        assert driver.operations == [(instance_id, 'go'), (instance_id, 'total')]
+        assert output['operation_results'] == {'go': None, 'total': 'text of .total'}
+        assert handles.get(output['browser_handle']).current_url == 'https://shop.example/cart'
+        assert 'shop.example' in pool._instances[instance_id].domains
+        await handles.release_if_unused(output['browser_handle'])
+
+        with pytest.raises(NotImplementedError):
+            await runner(plan.nodes['branchy'], {})
+        assert len(driver.operations) == 2
+        assert pool.get_stats()['in_use'] == 0
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+
+def test_node_runner_fails_units_without_a_browser():
+    async def scenario():
+        pool = make_pool(FakeDriver(available=False))
+        await pool.start()
+        plan = build_plan('wf', None, {
+            'nodes': [{'id': 'click', 'type': 'web_action', 'properties': {}, 'operation_units': [
+                {'id': 'buy', 'action': {'type': 'click', 'target': {'primary': {'type': 'css', 'value': '#buy'}}}}
+            ]}],
+            'connections': []
+        })
+
+        with pytest.raises(RuntimeError, match="no browser is available"):
+            await BrowserNodeRunner(pool, BrowserHandleRegistry(StateManager()))(plan.nodes['click'], {})
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+
+def test_node_runner_passes_through_without_driver():
+    async def scenario():
+        driver = FakeDriver(available=False)
+        pool = make_pool(driver)
+        await pool.start()
+        plan = build_plan('wf', None, {
+            'nodes': [{'id': 'open', 'type': 'browser_navigator', 'properties': {'url': 'shop.example'}}],
+            'connections': []
+        })
+
+        assert await BrowserNodeRunner(pool, BrowserHandleRegistry(StateManager()))(plan.nodes['open'], {'a': 1}) == {'a': 1}
+        assert driver.launched == []
+        await pool.stop()
+
+    asyncio.run(scenario())
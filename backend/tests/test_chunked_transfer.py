@@ -0,0 +1,94 @@
+"""
+Chunked transfer and compression tests
+分块传输与压缩测试
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+
+import pytest
+
+from src.services.chunked_transfer import (
+    CHUNK_MAGIC, TRANSFER_END, TRANSFER_ERROR, TRANSFER_START, TransferAssembler
+)
+
+from .test_rpc import connect_node, running_service, wait_for
+
+
+def chunk(transfer_id: str, data: bytes) -> bytes:
+    return CHUNK_MAGIC + uuid.UUID(transfer_id).bytes + data
+
+
+def test_large_payload_arrives_in_chunks_and_spills_to_disk():
+    async def scenario():
+        received = []
+
+        async def on_snapshot(connection_id, data):
+            transfer = data['transfer']
+            received.append((data['payload'], transfer.spilled, transfer.read()))
+
+        async with running_service(chunk_spool_memory=1024) as service:
+            service.register_message_handler('page_snapshot', on_snapshot)
+            client = await connect_node(service, 'n1')
+            # permessage-deflate is negotiated by default
+            assert [extension.name for extension in client.extensions] == ['permessage-deflate']
+
+            payload = os.urandom(5000)
+            transfer_id = str(uuid.uuid4())
+            await client.send(json.dumps({'type': TRANSFER_START, 'payload': {
+                'transfer_id': transfer_id,
+                'message_type': 'page_snapshot',
+                'total_size': len(payload),
+                'sha256': hashlib.sha256(payload).hexdigest(),
+                'metadata': {'url': 'https://example.com'}
+            }}))
+            for start in range(0, len(payload), 2048):
+                await client.send(chunk(transfer_id, payload[start:start + 2048]))
+            await client.send(json.dumps({'type': TRANSFER_END, 'payload': {'transfer_id': transfer_id}}))
+
+            await wait_for(lambda: received)
+            assert received == [({'url': 'https://example.com'}, True, payload)]
+            assert service.transfers.get_stats()['completed'] == 1
+            await client.close()
+
+    asyncio.run(scenario())
+
+
+def test_corrupt_transfer_is_reported_to_the_sender():
+    async def scenario():
+        async with running_service() as service:
+            client = await connect_node(service, 'n1')
+            transfer_id = str(uuid.uuid4())
+            await client.send(json.dumps({'type': TRANSFER_START, 'payload': {
+                'transfer_id': transfer_id,
+                'message_type': 'page_snapshot',
+                'sha256': hashlib.sha256(b'expected').hexdigest()
+            }}))
+            await client.send(chunk(transfer_id, b'tampered'))
+            await client.send(json.dumps({'type': TRANSFER_END, 'payload': {'transfer_id': transfer_id}}))
+
+            error = json.loads(await client.recv())
+            assert error['type'] == TRANSFER_ERROR and 'sha256' in error['payload']['error']
+            assert service.transfers.get_stats()['aborted'] == 1
+            await client.close()
+
+    asyncio.run(scenario())
+
+
+def test_oversized_transfers_are_refused_and_dropped_with_their_connection():
+    assembler = TransferAssembler(spool_memory=16, max_transfer_size=10)
+    first, second = str(uuid.uuid4()), str(uuid.uuid4())
+
+    with pytest.raises(ValueError):
+        assembler.start('conn', {'transfer_id': first, 'message_type': 'm', 'total_size': 11})
+    assembler.start('conn', {'transfer_id': first, 'message_type': 'm'})
+    with pytest.raises(ValueError):
+        assembler.feed('conn', chunk(first, b'x' * 11))
+    assert assembler.get_stats()['in_progress'] == 0
+
+    assembler.start('conn', {'transfer_id': second, 'message_type': 'm'})
+    assembler.drop_connection('conn')
+    assert assembler.get_stats() == {'in_progress': 0, 'started': 2, 'completed': 0, 'aborted': 2, 'bytes_received': 0}
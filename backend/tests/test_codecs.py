@@ -0,0 +1,67 @@
+"""
+Wire codec tests
+消息编解码测试
+"""
+
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+
+from src.utils.codecs import JsonCodec, MsgpackCodec, OrjsonCodec, available_codecs, negotiate_codec
+
+from .test_rpc import connect_node, running_service, wait_for
+
+MESSAGE = {
+    'type': 'node_update',
+    'payload': {'node_id': 'n1', 'values': [1, 2.5, None, True], 'text': 'héllo 世界'}
+}
+
+
+@pytest.mark.parametrize('name', ['json', 'orjson', 'msgpack'])
+def test_codecs_round_trip(name):
+    codecs = available_codecs()
+    if name not in codecs:
+        pytest.skip(f"{name} is not installed")
+    codec = codecs[name]
+
+    frame = codec.encode(MESSAGE)
+    assert isinstance(frame, bytes if codec.binary else str)
+    assert codec.decode(frame) == MESSAGE
+
+
+def test_text_codecs_share_one_wire_format():
+    # Integers beyond 64 bits are passed to the stdlib by orjson
+    message = {**MESSAGE, 'big': 2 ** 70}
+    for codec in available_codecs().values():
+        if not codec.binary:
+            assert json.loads(codec.encode(message)) == message
+
+
+def test_negotiation_prefers_the_peers_first_available_codec():
+    codecs = {'json': JsonCodec(), 'orjson': OrjsonCodec(), 'msgpack': MsgpackCodec()}
+    assert negotiate_codec(['msgpack', 'json'], codecs).name == 'msgpack'
+    assert negotiate_codec(['json', 'msgpack'], codecs).name == 'orjson'
+    assert negotiate_codec(['cbor'], codecs).name == 'orjson'
+    assert negotiate_codec(None, {'json': JsonCodec()}).name == 'json'
+    assert negotiate_codec(['msgpack'], {'json': JsonCodec()}).name == 'json'
+
+
+def test_connection_switches_codec_after_the_answer():
+    async def scenario():
+        async with running_service() as service:
+            client = await connect_node(service, 'n1', codecs=['msgpack', 'json'])
+            selected = json.loads(await client.recv())
+            assert selected['type'] == 'codec_selected'
+            codec = service.connection_codecs[service.node_connections['n1']]
+            assert selected['payload']['codec'] == ('msgpack' if codec.binary else 'json')
+
+            assert await service.send_to_node('n1', {'type': 'ping', 'payload': {'at': datetime(2024, 1, 1).isoformat()}})
+            frame = await client.recv()
+            assert isinstance(frame, bytes if codec.binary else str)
+            assert codec.decode(frame)['payload'] == {'at': '2024-01-01T00:00:00'}
+            await client.close()
+            await wait_for(lambda: not service.connections)
+
+    asyncio.run(scenario())
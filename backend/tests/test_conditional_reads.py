@@ -0,0 +1,83 @@
+"""
+Conditional read tests
+条件请求与响应缓存测试
+"""
+
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.routes import router
+from src.services.response_cache import format_etag, matching_etag, parse_etag
+from src.services.task_service import TaskService
+from src.services.workflow_service import WorkflowService
+
+WORKFLOW = {
+    'name': 'Shop',
+    'workflow_data': {'nodes': [{'id': 'start', 'type': 'start', 'properties': {'note': 'x' * 2000}}], 'connections': []}
+}
+
+
+def make_client(task_service: TaskService = None) -> TestClient:
+    task_service = task_service or TaskService()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await task_service.initialize()
+        yield
+        await task_service.cleanup()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(router, prefix="/api/v1")
+    app.state.workflow_service = WorkflowService()
+    app.state.task_service = task_service
+    return TestClient(app)
+
+
+def test_etags_match_any_representation_of_a_version():
+    assert format_etag(3) == '"3"' and format_etag('a1.3', 'gzip') == '"a1.3-gzip"'
+    assert parse_etag('W/"3-gzip"') == '3'
+    assert matching_etag('"2", "3-gzip"', 3) == '"3-gzip"'
+    assert matching_etag('"2"', 3) is None
+    assert matching_etag('*', 'a1.3') == '"a1.3"'
+
+
+def test_workflow_get_answers_304_until_the_workflow_changes():
+    with make_client() as client:
+        workflow_id = client.post("/api/v1/workflows", json=WORKFLOW).json()['id']
+        first = client.get(f"/api/v1/workflows/{workflow_id}", headers={'Accept-Encoding': 'gzip'})
+        assert first.status_code == 200 and first.headers['content-encoding'] == 'gzip'
+        etag = first.headers['etag']
+        assert etag == '"1-gzip"'
+
+        assert client.get(f"/api/v1/workflows/{workflow_id}", headers={'If-None-Match': etag}).status_code == 304
+        client.put(f"/api/v1/workflows/{workflow_id}", json={'name': 'Renamed'})
+        changed = client.get(f"/api/v1/workflows/{workflow_id}", headers={'If-None-Match': etag})
+        assert changed.status_code == 200 and changed.json()['name'] == 'Renamed'
+        assert changed.headers['etag'] == '"2-gzip"'
+
+
+def test_stale_if_match_fails_a_patch_with_412():
+    with make_client() as client:
+        workflow_id = client.post("/api/v1/workflows", json=WORKFLOW).json()['id']
+        patch = [{'op': 'replace', 'path': '/name', 'value': 'Next'}]
+        assert client.patch(f"/api/v1/workflows/{workflow_id}", json=patch, headers={'If-Match': '"1"'}).status_code == 200
+        assert client.patch(f"/api/v1/workflows/{workflow_id}", json=patch, headers={'If-Match': '"1"'}).status_code == 412
+        assert client.patch(f"/api/v1/workflows/{workflow_id}", json=patch, headers={'If-Match': '"one"'}).status_code == 400
+
+
+def test_task_etags_differ_across_restarts_without_a_durable_log():
+    task = {'workflow_id': 'wf', 'trigger_config': {'type': 'manual'}}
+    with make_client() as client:
+        task_id = client.post("/api/v1/tasks", json=task).json()['id']
+        response = client.get(f"/api/v1/tasks/{task_id}")
+        epoch = client.app.state.task_service.epoch
+        assert response.headers['etag'] == f'"{epoch}.1"'
+        assert client.get(f"/api/v1/tasks/{task_id}", headers={'If-None-Match': response.headers['etag']}).status_code == 304
+        # A bare seq from an earlier process never matches
+        assert client.get(f"/api/v1/tasks/{task_id}", headers={'If-None-Match': '"1"'}).status_code == 200
+
+    with make_client() as client:
+        restarted = client.post("/api/v1/tasks", json=task).json()['id']
+        assert client.get(f"/api/v1/tasks/{restarted}").headers['etag'] != response.headers['etag']
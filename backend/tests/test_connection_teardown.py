@@ -0,0 +1,60 @@
+"""
+Connection teardown tests
+连接清理测试
+"""
+
+import asyncio
+import json
+
+from src.services.communication_service import CommunicationService
+from src.utils.config import WebSocketSettings
+
+from .test_rpc import connect_node, running_service, wait_for
+
+
+def test_closing_a_connection_drops_only_its_own_nodes():
+    async def scenario():
+        async with running_service() as service:
+            first = await connect_node(service, 'n1')
+            await first.send(json.dumps({'type': 'node_connection_request', 'payload': {'node_id': 'n2'}}))
+            second = await connect_node(service, 'n3')
+            await wait_for(lambda: 'n2' in service.node_connections)
+            first_id = service.node_connections['n1']
+            assert service.get_connection_nodes(first_id) == {'n1', 'n2'}
+
+            await first.close()
+            await wait_for(lambda: first_id not in service.connections)
+            assert set(service.node_connections) == {'n3'}
+            assert first_id not in service.connection_nodes and first_id not in service.outbound
+            await second.close()
+
+    asyncio.run(scenario())
+
+
+def test_node_that_reconnects_survives_the_old_socket_closing():
+    async def scenario():
+        async with running_service() as service:
+            old = await connect_node(service, 'n1')
+            old_id = service.node_connections['n1']
+            new = await connect_node(service, 'n1')
+            await wait_for(lambda: service.node_connections['n1'] != old_id)
+            new_id = service.node_connections['n1']
+            assert old_id not in service.connection_nodes
+
+            await old.close()
+            await wait_for(lambda: old_id not in service.connections)
+            assert service.node_connections == {'n1': new_id}
+            await new.close()
+
+    asyncio.run(scenario())
+
+
+def test_unbinding_visits_only_the_connections_nodes():
+    service = CommunicationService(WebSocketSettings())
+    for number in range(1000):
+        service._bind_node(f"node{number}", f"conn{number % 10}")
+
+    service._unbind_connection('conn3')
+    assert len(service.node_connections) == 900
+    assert all(connection_id != 'conn3' for connection_id in service.node_connections.values())
+    assert 'conn3' not in service.connection_nodes
@@ -0,0 +1,110 @@
+"""
+Execution engine tests
+任务执行引擎测试
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.routes import router
+from src.services.execution_engine import ExecutionEngine
+from src.services.task_service import TaskService
+from src.utils.config import Settings
+
+
+class Recorder:
+    """Engine listener that records runs; runs of a held task wait for the gate"""
+
+    def __init__(self, failures: int = 0):
+        self.gate = asyncio.Event()
+        self.held = set()
+        self.failures = failures
+        self.order = []
+        self.outcomes = []
+
+    async def run_task(self, task_id):
+        if task_id in self.held:
+            await self.gate.wait()
+        self.order.append(task_id)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("flaky")
+        return task_id
+
+    async def on_task_started(self, task_id, attempt):
+        pass
+
+    async def on_task_completed(self, task_id, result):
+        self.outcomes.append((task_id, 'completed'))
+
+    async def on_task_failed(self, task_id, error, will_retry):
+        self.outcomes.append((task_id, 'retrying' if will_retry else 'failed'))
+
+
+async def drain(engine: ExecutionEngine, *task_ids: str) -> None:
+    while any(engine.is_active(task_id) for task_id in task_ids):
+        await asyncio.sleep(0.01)
+
+
+def test_higher_priority_tasks_run_first():
+    async def scenario():
+        listener = Recorder()
+        engine = ExecutionEngine(Settings(max_concurrent_tasks=1), listener)
+        await engine.start()
+        listener.held.add('busy')
+        assert engine.submit('busy')
+        await asyncio.sleep(0)
+
+        assert engine.submit('low', priority=0)
+        assert engine.submit('high', priority=5)
+        assert not engine.submit('low')
+        listener.gate.set()
+        await drain(engine, 'busy', 'low', 'high')
+
+        assert listener.order == ['busy', 'high', 'low']
+        await engine.stop()
+
+    asyncio.run(scenario())
+
+
+def test_failed_run_is_retried():
+    async def scenario():
+        listener = Recorder(failures=1)
+        engine = ExecutionEngine(Settings(retry_attempts=1, retry_delay=0), listener)
+        await engine.start()
+        engine.submit('job')
+        await drain(engine, 'job')
+
+        assert listener.outcomes == [('job', 'retrying'), ('job', 'completed')]
+        assert engine.stats['retried'] == 1
+        await engine.stop()
+
+    asyncio.run(scenario())
+
+
+def test_executing_an_active_task_is_a_conflict():
+    service = TaskService()
+    listener = Recorder()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        service.engine = ExecutionEngine(Settings(max_concurrent_tasks=1), listener)
+        await service.engine.start()
+        await service.initialize()
+        yield
+        await service.engine.stop()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(router, prefix="/api/v1")
+    app.state.task_service = service
+
+    with TestClient(app) as client:
+        task_id = client.post("/api/v1/tasks", json={'workflow_id': 'wf', 'trigger_config': {'type': 'manual'}}).json()['id']
+        listener.held.add(task_id)
+
+        assert client.post(f"/api/v1/tasks/{task_id}/execute").status_code == 200
+        assert client.post(f"/api/v1/tasks/{task_id}/execute").status_code == 409
+        assert client.post("/api/v1/tasks/missing/execute").status_code == 404
@@ -0,0 +1,70 @@
+"""
+Heartbeat tests
+心跳监测测试
+"""
+
+import asyncio
+
+import pytest
+
+from src.services.heartbeat import HeartbeatMonitor
+
+from .test_rpc import connect_node, running_service, wait_for
+
+
+class Peer:
+    """WebSocket stand-in that answers pings, or never does once it goes silent"""
+
+    def __init__(self, silent: bool = False, broken: bool = False):
+        self.silent = silent
+        self.broken = broken
+
+    async def ping(self):
+        if self.broken:
+            raise ConnectionResetError("gone")
+        waiter = asyncio.get_running_loop().create_future()
+        if not self.silent:
+            waiter.set_result(None)
+        return waiter
+
+
+def test_silent_peers_are_evicted_after_max_missed():
+    async def scenario():
+        evicted = []
+        monitor = HeartbeatMonitor(interval=1, max_missed=2, evict=evicted.append)
+        monitor.add('alive', Peer())
+        monitor.add('silent', Peer(silent=True))
+        monitor.add('broken', Peer(broken=True))
+
+        await monitor.tick()
+        await asyncio.sleep(0)
+        assert evicted == ['broken']
+        await monitor.tick()
+        assert 'silent' not in evicted
+        await monitor.tick()
+
+        assert evicted == ['broken', 'silent']
+        assert list(monitor.peers) == ['alive']
+        stats = monitor.get_stats()
+        assert stats['pongs'] == 3 and stats['evicted'] == 2
+        assert stats['rtt_ms']['alive']['p50'] is not None
+
+    asyncio.run(scenario())
+
+
+def test_eviction_unbinds_nodes_and_fails_their_calls():
+    async def scenario():
+        async with running_service() as service:
+            client = await connect_node(service, 'n1')
+            connection_id = service.node_connections['n1']
+            call = asyncio.create_task(service.call('n1', {'type': 'query'}))
+            await wait_for(lambda: service.pending_calls)
+
+            service.heartbeat._evict(connection_id, "test")
+            assert 'n1' not in service.node_connections
+            assert connection_id not in service.outbound
+            with pytest.raises(ConnectionError):
+                await call
+            await wait_for(lambda: client.closed)
+
+    asyncio.run(scenario())
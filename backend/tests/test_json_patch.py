@@ -0,0 +1,109 @@
+"""
+JSON Patch tests
+JSON补丁测试
+"""
+
+import asyncio
+import copy
+
+import pytest
+
+from src.models.workflow import WorkflowCreate
+from src.services.workflow_service import WorkflowService
+from src.utils.json_patch import JsonPatchError, apply_patch, make_patch, parse_pointer, touched_paths
+
+DOCUMENT = {
+    'name': 'wf',
+    'tags': ['a', 'b'],
+    'a/b': {'m~n': 1},
+    'nodes': [{'id': 'n1', 'properties': {'url': 'https://a'}}, {'id': 'n2', 'properties': {}}]
+}
+
+
+def test_rfc6902_operations():
+    original = copy.deepcopy(DOCUMENT)
+    patched = apply_patch(DOCUMENT, [
+        {'op': 'test', 'path': '/name', 'value': 'wf'},
+        {'op': 'replace', 'path': '/nodes/0/properties/url', 'value': 'https://b'},
+        {'op': 'add', 'path': '/tags/-', 'value': 'c'},
+        {'op': 'remove', 'path': '/tags/0'},
+        {'op': 'move', 'from': '/a~1b/m~0n', 'path': '/moved'},
+        {'op': 'copy', 'from': '/nodes/1', 'path': '/nodes/2'}
+    ])
+
+    assert patched['nodes'][0]['properties']['url'] == 'https://b'
+    assert patched['tags'] == ['b', 'c']
+    assert patched['moved'] == 1 and patched['a/b'] == {}
+    assert patched['nodes'][2] == {'id': 'n2', 'properties': {}}
+    # Copy on write: the input is untouched and unchanged subtrees are shared
+    assert DOCUMENT == original
+    assert patched['nodes'][1] is DOCUMENT['nodes'][1]
+
+
+@pytest.mark.parametrize('operations', [
+    [{'op': 'test', 'path': '/name', 'value': 'other'}],
+    [{'op': 'remove', 'path': '/missing'}],
+    [{'op': 'replace', 'path': '/tags/5', 'value': 'x'}],
+    [{'op': 'jump', 'path': '/name'}],
+    [{'op': 'move', 'from': '/nodes', 'path': '/nodes/0/child'}],
+    {'op': 'add', 'path': '/x', 'value': 1}
+])
+def test_invalid_patches_are_rejected_without_partial_changes(operations):
+    original = copy.deepcopy(DOCUMENT)
+    with pytest.raises(JsonPatchError):
+        apply_patch(DOCUMENT, operations)
+    assert DOCUMENT == original
+
+
+def test_diff_round_trips():
+    target = copy.deepcopy(DOCUMENT)
+    target['tags'].insert(1, 'x')
+    target['nodes'][1]['properties']['wait'] = 5
+    del target['a/b']
+
+    operations = make_patch(DOCUMENT, target)
+    assert apply_patch(DOCUMENT, operations) == target
+    assert {'op': 'add', 'path': '/tags/1', 'value': 'x'} in operations
+    assert make_patch(DOCUMENT, DOCUMENT) == []
+
+
+def test_pointers():
+    assert parse_pointer('/a~1b/m~0n') == ['a/b', 'm~n']
+    assert parse_pointer('') == []
+    with pytest.raises(JsonPatchError):
+        parse_pointer('nodes')
+    assert touched_paths([
+        {'op': 'test', 'path': '/name'},
+        {'op': 'move', 'from': '/a', 'path': '/b'}
+    ]) == [['b'], ['a']]
+
+
+def test_workflow_patch_recompiles_only_the_edited_nodes():
+    async def scenario():
+        service = WorkflowService()
+        await service.initialize()
+        workflow = await service.create_workflow(WorkflowCreate(name='wf', workflow_data={
+            'nodes': [{'id': 'n1', 'type': 'step'}, {'id': 'n2', 'type': 'step'}],
+            'connections': [{'from_node': 'n1', 'from_socket': 'out', 'to_node': 'n2', 'to_socket': 'in'}]
+        }))
+        plan = service.get_plan(workflow.id)
+
+        result = await service.patch_workflow(workflow.id, [
+            {'op': 'add', 'path': '/workflow_data/nodes/1/properties', 'value': {'url': 'https://a'}}
+        ])
+        assert result.plan == 'patched' and result.recompiled_nodes == ['n2'] and result.version == 2
+        patched = service.get_plan(workflow.id)
+        assert patched.nodes['n1'] is plan.nodes['n1']
+        assert patched.nodes['n2'].properties['url'] == 'https://a'
+
+        result = await service.patch_workflow(workflow.id, [{'op': 'replace', 'path': '/name', 'value': 'renamed'}])
+        assert result.plan == 'unchanged'
+        result = await service.patch_workflow(workflow.id, [{'op': 'remove', 'path': '/workflow_data/connections/0'}])
+        assert result.plan == 'recompiled'
+
+        with pytest.raises(JsonPatchError):
+            await service.patch_workflow(workflow.id, [{'op': 'remove', 'path': '/name'}])
+        assert (await service.get_workflow(workflow.id)).version == 4
+        await service.cleanup()
+
+    asyncio.run(scenario())
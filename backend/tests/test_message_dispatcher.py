@@ -0,0 +1,87 @@
+"""
+Message dispatcher tests
+消息分发测试
+"""
+
+import asyncio
+
+from src.services.message_dispatcher import ConnectionDispatcher
+
+
+class Handlers:
+    """Route that records handler starts and finishes; handlers wait for release"""
+
+    def __init__(self):
+        self.started = []
+        self.finished = []
+        self.running = 0
+        self.peak = 0
+        self.release = asyncio.Event()
+
+    async def route(self, connection_id, data):
+        self.started.append(data['id'])
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await self.release.wait()
+        self.running -= 1
+        self.finished.append(data['id'])
+
+
+def message(message_id: str, message_type: str = 'query', node_id: str = None) -> dict:
+    return {'id': message_id, 'type': message_type, 'payload': {'node_id': node_id} if node_id else {}}
+
+
+def test_handlers_run_concurrently_up_to_the_limit():
+    async def scenario():
+        handlers = Handlers()
+        dispatcher = ConnectionDispatcher('conn', handlers.route, max_inflight=2, ordered_types=())
+        await dispatcher.dispatch(message('a'))
+        await dispatcher.dispatch(message('b'))
+
+        # No free slot: dispatch blocks, which stops the read loop
+        blocked = asyncio.create_task(dispatcher.dispatch(message('c')))
+        await asyncio.sleep(0.01)
+        assert not blocked.done() and handlers.started == ['a', 'b']
+
+        handlers.release.set()
+        await blocked
+        await dispatcher.close()
+        assert handlers.peak == 2 and sorted(handlers.finished) == ['a', 'b', 'c']
+
+    asyncio.run(scenario())
+
+
+def test_ordered_types_keep_arrival_order_per_node():
+    async def scenario():
+        order = []
+
+        async def route(connection_id, data):
+            # Earlier messages take longer, so only chaining keeps them in order
+            await asyncio.sleep(0.03 - 0.01 * int(data['id'][-1]))
+            order.append(data['id'])
+
+        dispatcher = ConnectionDispatcher('conn', route, max_inflight=8, ordered_types=('node_update',))
+        for number in range(3):
+            await dispatcher.dispatch(message(f"n1-{number}", 'node_update', 'n1'))
+            await dispatcher.dispatch(message(f"n2-{number}", 'node_update', 'n2'))
+        await dispatcher.dispatch(message('free-0', 'query'))
+        await dispatcher.close()
+
+        assert [item for item in order if item.startswith('n1')] == ['n1-0', 'n1-1', 'n1-2']
+        assert [item for item in order if item.startswith('n2')] == ['n2-0', 'n2-1', 'n2-2']
+        # Unordered messages do not wait behind a lane
+        assert order.index('free-0') < order.index('n1-1')
+
+    asyncio.run(scenario())
+
+
+def test_close_can_cancel_running_handlers():
+    async def scenario():
+        handlers = Handlers()
+        dispatcher = ConnectionDispatcher('conn', handlers.route, max_inflight=4, ordered_types=())
+        await dispatcher.dispatch(message('a'))
+        await asyncio.sleep(0)
+        await dispatcher.close(cancel=True)
+        assert dispatcher.inflight() == 0 and handlers.finished == []
+
+    asyncio.run(scenario())
@@ -0,0 +1,86 @@
+"""
+Cursor pagination tests
+游标分页测试
+"""
+
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.routes import NEXT_CURSOR_HEADER, router
+from src.services.store import RecordStore, decode_cursor, encode_cursor
+from src.services.task_service import TaskService
+from src.services.workflow_service import WorkflowService
+
+SINGLE = {'nodes': [{'id': 'a', 'type': 'step'}], 'connections': []}
+
+
+def make_client() -> TestClient:
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await app.state.task_service.initialize()
+        yield
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(router, prefix="/api/v1")
+    app.state.workflow_service = WorkflowService()
+    app.state.task_service = TaskService()
+    return TestClient(app)
+
+
+def walk(client: TestClient, path: str, limit: int, **params) -> list:
+    pages = []
+    cursor = None
+    while True:
+        query = {'limit': limit, **params, **({'cursor': cursor} if cursor else {})}
+        response = client.get(path, params=query)
+        assert response.status_code == 200
+        pages.append([item['id'] for item in response.json()])
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return pages
+
+
+def test_cursor_walks_every_workflow_once_newest_first():
+    with make_client() as client:
+        created = [
+            client.post("/api/v1/workflows", json={'name': f"wf{number}", 'workflow_data': SINGLE}).json()['id']
+            for number in range(7)
+        ]
+        pages = walk(client, "/api/v1/workflows", 3)
+
+        assert [len(page) for page in pages] == [3, 3, 1]
+        assert [workflow_id for page in pages for workflow_id in page] == created[::-1]
+
+
+def test_cursor_is_stable_under_inserts_and_filters_tasks():
+    with make_client() as client:
+        def create(workflow_id: str) -> str:
+            task = {'workflow_id': workflow_id, 'trigger_config': {'type': 'manual'}}
+            return client.post("/api/v1/tasks", json=task).json()['id']
+
+        created = [create('ours' if number % 2 == 0 else 'theirs') for number in range(8)]
+        ours = created[::2]
+        first = client.get("/api/v1/tasks", params={'limit': 2, 'workflow_id': 'ours'})
+        cursor = first.headers[NEXT_CURSOR_HEADER]
+        # A task created after the first page is not seen by the rest of the walk
+        create('ours')
+        rest = client.get("/api/v1/tasks", params={'limit': 10, 'workflow_id': 'ours', 'cursor': cursor})
+
+        seen = [task['id'] for task in first.json() + rest.json()]
+        assert seen == ours[::-1]
+        assert NEXT_CURSOR_HEADER not in rest.headers
+        assert client.get("/api/v1/tasks", params={'cursor': 'not-a-cursor'}).status_code == 400
+
+
+def test_records_created_at_the_same_instant_are_ordered_by_id():
+    now = datetime(2024, 1, 1)
+    store = RecordStore()
+    for record_id in ('b', 'a', 'c'):
+        store.add({'id': record_id, 'created_at': now})
+
+    assert decode_cursor(encode_cursor(now, 'b')) == (now, 'b')
+    assert [record['id'] for record in store.query(after=(now, 'b'), descending=False)] == ['c']
+    assert [record['id'] for record in store.query(after=(now, 'b'))] == ['a']
@@ -0,0 +1,77 @@
+"""
+Plan cache tests
+执行计划缓存测试
+"""
+
+import asyncio
+from datetime import datetime
+
+from src.models.workflow import WorkflowCreate, WorkflowUpdate
+from src.services.workflow_planner import WorkflowPlanner, plan_impact
+from src.services.workflow_service import WorkflowService
+
+
+def chain(*node_ids: str) -> dict:
+    return {
+        'nodes': [{'id': node_id, 'type': 'step'} for node_id in node_ids],
+        'connections': [
+            {'from_node': source, 'from_socket': 'out', 'to_node': target, 'to_socket': 'in'}
+            for source, target in zip(node_ids, node_ids[1:])
+        ]
+    }
+
+
+def test_plan_is_compiled_once_and_replaced_on_update():
+    async def scenario():
+        service = WorkflowService()
+        await service.initialize()
+        workflow = await service.create_workflow(WorkflowCreate(name='wf', workflow_data=chain('a', 'b')))
+
+        plan = service.get_plan(workflow.id)
+        assert service.get_plan(workflow.id) is plan
+        assert service.planner.stats['hits'] == 2 and service.planner.stats['misses'] == 0
+
+        await service.update_workflow(workflow.id, WorkflowUpdate(workflow_data=chain('a', 'b', 'c')))
+        updated = service.get_plan(workflow.id)
+        assert updated is not plan and updated.levels == (('a',), ('b',), ('c',))
+
+        await service.delete_workflow(workflow.id)
+        assert service.get_plan(workflow.id) is None
+        assert service.planner.get_stats()['entries'] == 0
+        await service.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_stale_plan_is_never_served():
+    planner = WorkflowPlanner()
+    record = {'id': 'wf', 'updated_at': datetime(2024, 1, 1), 'workflow_data': chain('a')}
+    planner.get_plan(record)
+
+    changed = {**record, 'updated_at': datetime(2024, 1, 2), 'workflow_data': chain('a', 'b')}
+    assert planner.get_plan(changed).levels == (('a',), ('b',))
+    assert planner.stats['misses'] == 2
+
+
+def test_least_recently_used_plans_are_evicted():
+    planner = WorkflowPlanner(max_entries=2)
+    records = [{'id': f"wf{number}", 'updated_at': datetime(2024, 1, 1), 'workflow_data': chain('a')} for number in range(3)]
+    planner.get_plan(records[0])
+    planner.get_plan(records[1])
+    planner.get_plan(records[0])
+    planner.get_plan(records[2])
+
+    assert planner.peek('wf1') is None and planner.peek('wf0') is not None
+    assert planner.stats['evictions'] == 1
+
+    tiny = WorkflowPlanner(max_bytes=1)
+    tiny.get_plan(records[0])
+    assert tiny.get_stats()['entries'] == 0
+
+
+def test_plan_impact_of_edits():
+    assert plan_impact([('name',), ('nodes', '0', 'position', 'x')]) == set()
+    assert plan_impact([('nodes', '1', 'properties', 'url'), ('nodes', '3', 'type')]) == {1, 3}
+    assert plan_impact([('connections', '0', 'to_node')]) is None
+    assert plan_impact([('nodes', '0', 'id')]) is None
+    assert plan_impact([('nodes', '-')]) is None
@@ -0,0 +1,88 @@
+"""
+SQLite repository tests
+SQLite持久化仓库测试
+"""
+
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.models.task import TaskState
+from src.services.repository import SQLiteRepository, parse_sqlite_url
+from src.utils.config import DatabaseSettings
+
+START = datetime(2024, 1, 1)
+
+
+def make_repository(tmp_path, **settings) -> SQLiteRepository:
+    return SQLiteRepository(DatabaseSettings(url=f"sqlite:///{tmp_path}/state.db", **settings))
+
+
+def record(number: int, **fields) -> dict:
+    created_at = START + timedelta(seconds=number)
+    return {'id': f"r{number}", 'created_at': created_at, 'updated_at': created_at, **fields}
+
+
+def test_concurrent_writes_share_commits_and_round_trip(tmp_path):
+    async def scenario():
+        repository = make_repository(tmp_path)
+        await repository.initialize()
+
+        await asyncio.gather(*(repository.save('tasks', record(number, state=TaskState.WAITING)) for number in range(50)))
+        assert repository.write_count == 50
+        assert repository.commit_count < 50
+
+        rows = await repository.load_all('tasks')
+        assert [row['id'] for row in rows] == [f"r{number}" for number in range(50)]
+        assert rows[0]['created_at'] == START and rows[0]['state'] == 'waiting'
+        with sqlite3.connect(repository.path) as connection:
+            assert connection.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        await repository.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_failed_write_does_not_fail_the_rest_of_its_batch(tmp_path):
+    async def scenario():
+        repository = make_repository(tmp_path)
+        await repository.initialize()
+        with sqlite3.connect(repository.path) as connection:
+            connection.execute(
+                "CREATE TRIGGER reject BEFORE INSERT ON tasks WHEN NEW.id = 'r3' "
+                "BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+            )
+
+        outcomes = await asyncio.gather(
+            *(repository.save('tasks', record(number)) for number in range(6)),
+            return_exceptions=True
+        )
+        assert [isinstance(outcome, sqlite3.IntegrityError) for outcome in outcomes] == [
+            False, False, False, True, False, False
+        ]
+        assert len(await repository.load_all('tasks')) == 5
+        await repository.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_readers_are_pooled(tmp_path):
+    async def scenario():
+        repository = make_repository(tmp_path, pool_size=2, max_overflow=1)
+        await repository.initialize()
+        await repository.save('workflows', record(1))
+
+        await asyncio.gather(*(repository.load_all('workflows') for _ in range(10)))
+        stats = repository.get_stats()
+        assert stats['reader_connections'] <= 2
+        assert stats['idle_reader_connections'] == stats['reader_connections']
+        await repository.cleanup()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize('url', ['sqlite:///:memory:', 'sqlite:///file:db?mode=memory', 'postgresql://localhost/db'])
+def test_unusable_database_urls_are_rejected(url):
+    with pytest.raises(ValueError):
+        parse_sqlite_url(url)
@@ -0,0 +1,127 @@
+"""
+WebSocket RPC tests
+WebSocket请求/响应测试
+"""
+
+import asyncio
+import json
+import socket
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import pytest
+import websockets
+
+from src.services.communication_service import CommunicationService, RemoteCallError
+from src.utils.config import WebSocketSettings
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+@asynccontextmanager
+async def running_service(**settings) -> AsyncIterator[CommunicationService]:
+    service = CommunicationService(WebSocketSettings(host="127.0.0.1", port=free_port(), **settings))
+    await service.start()
+    try:
+        yield service
+    finally:
+        await service.stop()
+
+
+def service_url(service: CommunicationService) -> str:
+    return f"ws://127.0.0.1:{service.config.port}{service.config.path}"
+
+
+async def connect_node(service: CommunicationService, node_id: str, **payload):
+    """Open a client connection and register a node over it"""
+    client = await websockets.connect(service_url(service))
+    await client.send(json.dumps({'type': 'node_connection_request', 'payload': {'node_id': node_id, **payload}}))
+    await wait_for(lambda: node_id in service.node_connections)
+    return client
+
+
+async def wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+async def answer(client, reply) -> None:
+    """Answer every call the client receives with reply(request)"""
+    async for frame in client:
+        request = json.loads(frame)
+        if request.get('expect_response'):
+            await client.send(json.dumps({'request_id': request['id'], **reply(request)}))
+
+
+def test_concurrent_calls_are_matched_to_their_answers():
+    async def scenario():
+        async with running_service() as service:
+            client = await connect_node(service, 'n1')
+            responder = asyncio.create_task(answer(client, lambda request: {
+                'success': True,
+                'payload': {'echo': request['payload']['value']}
+            }))
+
+            responses = await asyncio.gather(*(
+                service.call('n1', {'type': 'query', 'payload': {'value': value}}) for value in range(5)
+            ))
+            assert [response['payload']['echo'] for response in responses] == list(range(5))
+            assert service.pending_calls == {}
+
+            responder.cancel()
+            await client.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_timed_out_and_dropped_calls_raise():
+    async def scenario():
+        async with running_service() as service:
+            client = await connect_node(service, 'n1')
+            responder = asyncio.create_task(answer(client, lambda request: {
+                'success': False,
+                'error': {'message': 'element not found'}
+            }))
+            with pytest.raises(RemoteCallError, match="element not found"):
+                await service.call('n1', {'type': 'query'})
+            responder.cancel()
+
+            with pytest.raises(asyncio.TimeoutError):
+                await service.call('n1', {'type': 'query'}, timeout=0.05)
+
+            pending = asyncio.create_task(service.call('n1', {'type': 'query'}))
+            await wait_for(lambda: service.pending_calls)
+            await client.close()
+            with pytest.raises(ConnectionError):
+                await pending
+            with pytest.raises(ConnectionError):
+                await service.call('n1', {'type': 'query'})
+
+    asyncio.run(scenario())
+
+
+def test_answers_from_another_connection_are_ignored():
+    async def scenario():
+        async with running_service() as service:
+            target = await connect_node(service, 'n1')
+            other = await connect_node(service, 'n2')
+
+            call = asyncio.create_task(service.call('n1', {'type': 'query'}))
+            request = json.loads(await target.recv())
+            await other.send(json.dumps({'request_id': request['id'], 'success': True, 'payload': 'forged'}))
+            await asyncio.sleep(0.05)
+            assert not call.done()
+
+            await target.send(json.dumps({'request_id': request['id'], 'success': True, 'payload': 'real'}))
+            assert (await call)['payload'] == 'real'
+            await target.close()
+            await other.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,96 @@
+"""
+Scheduler tests
+任务调度器测试
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.services.scheduler import TaskScheduler
+from src.utils.config import Settings
+from src.utils.cron import CronExpression
+
+NOW = datetime(2024, 3, 4, 10, 7, 30)  # a Monday
+
+
+class Listener:
+    def __init__(self):
+        self.active = set()
+        self.fired = []
+
+    def is_task_active(self, task_id):
+        return task_id in self.active
+
+    async def on_trigger_fired(self, task_id, next_run_at, execution_count):
+        self.fired.append((task_id, execution_count))
+
+
+@pytest.mark.parametrize('expression, expected', [
+    ('*/15 * * * *', datetime(2024, 3, 4, 10, 15)),
+    ('@hourly', datetime(2024, 3, 4, 11, 0)),
+    ('30 9 * * fri', datetime(2024, 3, 8, 9, 30)),
+    ('0 0 1 jan *', datetime(2025, 1, 1, 0, 0)),
+    # Day and weekday both restricted: either one matches
+    ('0 12 15 * mon', datetime(2024, 3, 4, 12, 0)),
+    # A '*'-prefixed day field does not restrict the day
+    ('0 12 */2 * tue', datetime(2024, 3, 5, 12, 0))
+])
+def test_cron_next_run(expression, expected):
+    assert CronExpression(expression).next_after(NOW) == expected
+
+
+@pytest.mark.parametrize('expression', ['* * *', '61 * * * *', '*/0 * * * *', '0 0 31 2 *'])
+def test_invalid_or_never_firing_cron_is_rejected(expression):
+    with pytest.raises(ValueError):
+        CronExpression(expression).next_after(NOW)
+
+
+def restored(policy: str, **task) -> TaskScheduler:
+    scheduler = TaskScheduler(Settings(scheduler_misfire_policy=policy, scheduler_max_catchup=3), Listener())
+    scheduler.restore([{
+        'id': 'task',
+        'trigger_config': {'type': 'scheduled', 'cron_expression': '0 * * * *'},
+        'execution_count': 1,
+        'next_run_at': NOW - timedelta(hours=5),
+        **task
+    }], now=NOW)
+    return scheduler
+
+
+def test_misfire_policies_on_restore():
+    skipped = restored('skip')
+    assert skipped.get_next_run('task') == datetime(2024, 3, 4, 11, 0)
+
+    once = restored('once')
+    assert once.get_next_run('task') == NOW
+    assert once._entries['task'].catchup == 0
+
+    replayed = restored('all')
+    assert replayed.get_next_run('task') == NOW
+    # Five missed fires, bounded by scheduler_max_catchup
+    assert replayed._entries['task'].catchup == 2 and replayed.stats['missed'] == 3
+
+    finished = restored('skip', next_run_at=None)
+    assert finished.get_stats()['scheduled_tasks'] == 0
+
+
+def test_due_task_fires_and_active_task_is_skipped():
+    async def scenario():
+        listener = Listener()
+        scheduler = TaskScheduler(Settings(), listener)
+        await scheduler.start()
+        once = {'type': 'loop', 'loop_interval': 60, 'max_executions': 1}
+        listener.active.add('busy')
+        scheduler.schedule('busy', {'type': 'loop', 'loop_interval': 60}, next_run_at=datetime.now())
+        scheduler.schedule('task', once, next_run_at=datetime.now())
+        await asyncio.sleep(0.05)
+
+        assert listener.fired == [('task', 1)]
+        assert scheduler.get_next_run('task') is None
+        assert scheduler.stats['skipped_active'] == 1
+        assert scheduler.get_next_run('busy') > datetime.now()
+        await scheduler.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,60 @@
+"""
+Record store tests
+记录存储测试
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.models.task import TaskState
+from src.services.store import RecordStore
+
+START = datetime(2024, 1, 1)
+
+
+def make_store(count: int = 6) -> RecordStore:
+    store = RecordStore(index_fields=('workflow_id', 'state'))
+    for number in range(count):
+        store.add({
+            'id': f"t{number}",
+            'created_at': START + timedelta(minutes=number),
+            'workflow_id': 'even' if number % 2 == 0 else 'odd',
+            'state': TaskState.WAITING
+        })
+    return store
+
+
+def ids(records) -> list:
+    return [record['id'] for record in records]
+
+
+def test_query_filters_through_indexes_in_created_order():
+    store = make_store()
+
+    assert ids(store.query(workflow_id='even')) == ['t4', 't2', 't0']
+    assert ids(store.query(workflow_id='odd', descending=False)) == ['t1', 't3', 't5']
+    assert ids(store.query(workflow_id='even', skip=1, limit=1)) == ['t2']
+    assert store.count(workflow_id='odd', state='waiting') == 3
+    assert store.count(workflow_id=None) == 6
+
+
+def test_update_and_remove_keep_indexes_consistent():
+    store = make_store()
+
+    store.update('t2', state=TaskState.EXECUTING)
+    assert ids(store.query(state=TaskState.EXECUTING)) == ['t2']
+    # Enum members and their raw values share an index entry
+    assert ids(store.query(state='executing', workflow_id='even')) == ['t2']
+    assert 't2' not in ids(store.query(state=TaskState.WAITING))
+
+    store.remove('t2')
+    assert store.query(state=TaskState.EXECUTING) == []
+    assert 't2' not in store and len(store) == 5
+    assert store.remove('t2') is None and store.update('t2', state='error') is None
+
+
+def test_duplicate_ids_are_rejected():
+    store = make_store(1)
+    with pytest.raises(KeyError):
+        store.add({'id': 't0', 'created_at': START})
@@ -0,0 +1,74 @@
+"""
+Bulk task tests
+批量任务测试
+"""
+
+import asyncio
+
+import pytest
+
+from src.models.task import TaskCreate
+from src.services.scheduler import TaskScheduler
+from src.services.task_service import TaskService
+from src.utils.config import Settings
+
+NEVER_FIRES = {'type': 'scheduled', 'cron_expression': '0 0 31 2 *'}
+HOURLY = {'type': 'scheduled', 'cron_expression': '0 * * * *'}
+
+
+def make_service() -> TaskService:
+    service = TaskService()
+    service.scheduler = TaskScheduler(Settings(), listener=service)
+    return service
+
+
+def test_cron_that_never_fires_is_reported_per_item():
+    async def scenario():
+        service = make_service()
+        await service.initialize()
+
+        results = await service.create_tasks([
+            TaskCreate(workflow_id='wf', trigger_config=HOURLY),
+            TaskCreate(workflow_id='wf', trigger_config=NEVER_FIRES)
+        ])
+
+        assert [item.status for item in results] == ['created', 'invalid']
+        assert 'never fires' in results[1].error
+        assert len(service.store) == 1
+        created = results[0].id
+        assert service.scheduler.get_next_run(created) == service.store.get(created)['next_run_at']
+        assert service.scheduler.get_stats()['scheduled_tasks'] == 1
+        await service.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_atomic_batch_with_never_firing_cron_schedules_nothing():
+    async def scenario():
+        service = make_service()
+        await service.initialize()
+
+        results = await service.create_tasks([
+            TaskCreate(workflow_id='wf', trigger_config=HOURLY),
+            TaskCreate(workflow_id='wf', trigger_config=NEVER_FIRES)
+        ], atomic=True)
+
+        assert [item.status for item in results] == ['invalid', 'invalid']
+        assert len(service.store) == 0
+        assert service.scheduler.get_stats()['scheduled_tasks'] == 0
+        await service.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_single_create_rejects_cron_that_never_fires():
+    async def scenario():
+        service = make_service()
+        await service.initialize()
+
+        with pytest.raises(ValueError, match="never fires"):
+            await service.create_task(TaskCreate(workflow_id='wf', trigger_config=NEVER_FIRES))
+        assert service.scheduler.get_stats()['scheduled_tasks'] == 0
+        await service.cleanup()
+
+    asyncio.run(scenario())
@@ -0,0 +1,102 @@
+"""
+Task event log tests
+任务事件日志测试
+"""
+
+import asyncio
+
+import pytest
+
+from src.models.task import TaskCreate, TaskState, TaskUpdate
+from src.services.repository import SQLiteRepository
+from src.services.task_events import TaskEventLog
+from src.services.task_service import TaskService
+from src.utils.config import DatabaseSettings
+
+MANUAL = {'type': 'manual'}
+
+
+def open_service(tmp_path, snapshot_interval: int = 1000) -> TaskService:
+    return TaskService(
+        repository=SQLiteRepository(DatabaseSettings(url=f"sqlite:///{tmp_path}/state.db")),
+        events=TaskEventLog(str(tmp_path / 'events')),
+        snapshot_interval=snapshot_interval
+    )
+
+
+async def start(service: TaskService) -> TaskService:
+    await service.repository.initialize()
+    await service.initialize()
+    return service
+
+
+def test_restart_loads_the_snapshot_and_replays_later_events(tmp_path):
+    async def scenario():
+        service = await start(open_service(tmp_path, snapshot_interval=3))
+        first = await service.create_task(TaskCreate(workflow_id='wf', trigger_config=MANUAL))
+        second = await service.create_task(TaskCreate(workflow_id='wf', trigger_config=MANUAL))
+        await service.update_task(first.id, TaskUpdate(state=TaskState.COMPLETED))
+        assert service.events.watermark > 0
+        await service.delete_task(second.id)
+        third = await service.create_task(TaskCreate(workflow_id='other', trigger_config=MANUAL))
+        # Stop without a final snapshot, as a crash would
+        await service.events.close()
+        await service.repository.cleanup()
+
+        restarted = await start(open_service(tmp_path, snapshot_interval=3))
+        assert restarted.events.stats['replayed'] > 0
+        assert set(restarted.store.records) == {first.id, third.id}
+        assert restarted.store.get(first.id)['state'] == TaskState.COMPLETED
+        assert restarted.store.get(third.id)['workflow_id'] == 'other'
+        await restarted.cleanup()
+        await restarted.repository.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_failed_append_leaves_the_store_untouched(tmp_path):
+    async def scenario():
+        service = await start(open_service(tmp_path))
+
+        async def broken(events):
+            raise OSError("disk full")
+
+        service.events.append_many = broken
+        with pytest.raises(OSError):
+            await service.create_task(TaskCreate(workflow_id='wf', trigger_config=MANUAL))
+        assert len(service.store) == 0
+        await service.events.close()
+        await service.repository.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_snapshot_keeps_events_still_being_appended_after_the_watermark(tmp_path):
+    async def scenario():
+        service = await start(open_service(tmp_path))
+        created = await service.create_task(TaskCreate(workflow_id='wf', trigger_config=MANUAL))
+
+        gate = asyncio.Event()
+        append_many = service.events.append_many
+
+        async def held(events):
+            await gate.wait()
+            await append_many(events)
+
+        service.events.append_many = held
+        update = asyncio.create_task(service.update_task(created.id, TaskUpdate(state=TaskState.COMPLETED)))
+        await asyncio.sleep(0)
+        await service.snapshot()
+        assert service.events.watermark < service.events.seq
+
+        gate.set()
+        await update
+        await service.events.close()
+        await service.repository.cleanup()
+
+        restarted = await start(open_service(tmp_path))
+        assert restarted.store.get(created.id)['state'] == TaskState.COMPLETED
+        await restarted.cleanup()
+        await restarted.repository.cleanup()
+
+    asyncio.run(scenario())
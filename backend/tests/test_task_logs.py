@@ -0,0 +1,62 @@
+"""
+Task log store tests
+任务日志存储测试
+"""
+
+import asyncio
+import os
+
+from src.services.task_logs import TaskLogStore
+
+
+def fill(logs: TaskLogStore, task_id: str, count: int) -> None:
+    for number in range(count):
+        logs.append(task_id, 'step', f"entry {number}", f"2024-01-01T00:00:{number % 60:02d}")
+
+
+def messages(entries) -> list:
+    return [int(entry['message'].split()[1]) for entry in entries]
+
+
+def test_memory_stays_bounded_and_spilled_pages_read_back(tmp_path):
+    async def scenario():
+        logs = TaskLogStore(str(tmp_path), ring_size=10)
+        fill(logs, 'task', 95)
+        await logs.flush()
+
+        assert logs.count('task') == 95
+        assert len(logs.unspilled('task')) < 20
+        assert messages(logs.tail('task')) == list(range(85, 95))
+        assert len(os.listdir(tmp_path / 'task')) == 8
+
+        # A page that straddles spilled segments and memory
+        assert messages(await logs.read('task', 5, 30)) == list(range(5, 35))
+        assert messages(await logs.read('task', 70, 100)) == list(range(70, 95))
+        assert await logs.read('task', 95, 10) == []
+
+        await logs.drop('task')
+        assert not (tmp_path / 'task').exists() and logs.count('task') == 0
+
+    asyncio.run(scenario())
+
+
+def test_pages_are_readable_while_their_segment_is_being_written(tmp_path):
+    async def scenario():
+        logs = TaskLogStore(str(tmp_path), ring_size=5)
+        fill(logs, 'task', 10)
+        # Not flushed yet: the spilled entries are served from the pending write
+        assert messages(await logs.read('task', 0, 5)) == [0, 1, 2, 3, 4]
+        await logs.flush()
+
+    asyncio.run(scenario())
+
+
+def test_without_a_directory_spilled_entries_are_dropped():
+    async def scenario():
+        logs = TaskLogStore(ring_size=3)
+        fill(logs, 'task', 10)
+        assert logs.count('task') == 10
+        assert messages(await logs.read('task', 0, 10)) == messages(logs.unspilled('task'))
+        assert logs.get_stats()['spilled_entries'] == 6
+
+    asyncio.run(scenario())
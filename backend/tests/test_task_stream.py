@@ -0,0 +1,81 @@
+"""
+Task event stream tests
+任务事件流测试
+"""
+
+import asyncio
+
+from src.api.routes import sse_events
+from src.models.task import TaskCreate, TaskState, TaskUpdate
+from src.services.task_service import TaskService
+from src.services.task_stream import TaskEventBroker, encode_sse, format_event_id, parse_event_id
+
+MANUAL = {'type': 'manual'}
+
+
+class ConnectedRequest:
+    async def is_disconnected(self):
+        return False
+
+
+def test_event_ids_round_trip():
+    assert format_event_id((7, 0)) == '7' and format_event_id((7, 2)) == '7-2'
+    assert parse_event_id('7-2') == (7, 2) and parse_event_id('7') == (7, 0)
+    assert parse_event_id('seven') is None
+    assert encode_sse({'position': (3, 1), 'event': 'progress', 'data': {'x': 1}}) == (
+        'id: 3-1\nevent: progress\ndata: {"x":1}\n\n'
+    )
+
+
+def test_resume_replays_missed_deltas_or_asks_for_a_resync():
+    broker = TaskEventBroker(history_size=4)
+    for seq in range(1, 4):
+        broker.publish('t1', 'wf', 'update', {'seq': seq}, seq=seq)
+    broker.publish('t1', 'wf', 'progress', {'percent': 50})
+
+    subscription, resumed = broker.subscribe(task_id='t1', last_event_id='2')
+    assert resumed
+    assert [delta['position'] for delta in subscription.pending] == [(3, 0), (3, 1)]
+
+    for seq in range(4, 8):
+        broker.publish('t2', 'wf', 'update', {'seq': seq}, seq=seq)
+    # Position 2 has left the window
+    stale, resumed = broker.subscribe(task_id='t1', last_event_id='2')
+    assert not resumed and not stale.pending
+    assert broker.stats['resynced'] == 1
+
+
+def test_slow_subscriber_is_dropped():
+    broker = TaskEventBroker(max_pending=2)
+    subscription, _ = broker.subscribe()
+    for seq in range(1, 4):
+        broker.publish('t1', None, 'update', {}, seq=seq)
+    assert subscription.closed and subscription not in broker.subscribers
+
+
+def test_stream_opens_with_a_snapshot_then_sends_live_deltas():
+    async def scenario():
+        service = TaskService()
+        await service.initialize()
+        task = await service.create_task(TaskCreate(workflow_id='wf', trigger_config=MANUAL))
+
+        subscription, initial = service.subscribe(task_id=task.id)
+        stream = sse_events(ConnectedRequest(), service, subscription, initial)
+        assert (await stream.__anext__()).startswith('retry: ')
+        snapshot = await stream.__anext__()
+        assert 'event: snapshot' in snapshot and task.id in snapshot
+
+        await service.update_task(task.id, TaskUpdate(state=TaskState.COMPLETED))
+        update = await asyncio.wait_for(stream.__anext__(), timeout=1)
+        assert 'event: update' in update and '"state":"completed"' in update
+        last_id = update.split('\n')[0][len('id: '):]
+        await stream.aclose()
+        assert subscription not in service.stream.subscribers
+
+        await service.update_task(task.id, TaskUpdate(state=TaskState.ERROR))
+        resumed, initial = service.subscribe(task_id=task.id, last_event_id=last_id)
+        assert initial == []
+        assert [delta['data']['changes']['state'] for delta in resumed.pending] == [TaskState.ERROR]
+        await service.cleanup()
+
+    asyncio.run(scenario())
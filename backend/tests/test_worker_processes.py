@@ -0,0 +1,65 @@
+"""
+Multi-process tests
+多进程测试
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def test_second_uvicorn_worker_refuses_shared_state(tmp_path):
+    port = free_port()
+    env = {
+        **os.environ,
+        'PYTHONPATH': BACKEND_DIR,
+        'WEBSOCKET_PORT': str(free_port()),
+        'WEBSOCKET_HOST': '127.0.0.1'
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--workers", "2", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=str(tmp_path),
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True
+    )
+    try:
+        # One worker takes the state and starts; the other one exits
+        output = ''
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            output += server.stdout.readline()
+            if "run a single worker per storage directory" in output and "Application startup complete" in output:
+                break
+        assert "run a single worker per storage directory" in output, output
+        assert output.count("Application startup complete") == 1, output
+
+        # Startup is logged before the worker starts accepting on the shared
+        # socket, so the first probes may still be refused
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=10) as response:
+                    assert json.loads(response.read())['status'] == 'healthy'
+                break
+            except urllib.error.URLError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.2)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
@@ -0,0 +1,109 @@
+"""
+Bulk workflow tests
+批量工作流测试
+"""
+
+import asyncio
+import sqlite3
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.routes import router
+from src.models.workflow import WorkflowCreate
+from src.services.repository import SQLiteRepository
+from src.services.task_service import TaskService
+from src.services.workflow_service import WorkflowService
+from src.utils.config import DatabaseSettings
+
+CYCLE = {
+    'nodes': [{'id': 'a', 'type': 'step'}, {'id': 'b', 'type': 'step'}],
+    'connections': [
+        {'from_node': 'a', 'from_socket': 'out', 'to_node': 'b', 'to_socket': 'in'},
+        {'from_node': 'b', 'from_socket': 'out', 'to_node': 'a', 'to_socket': 'in'}
+    ]
+}
+SINGLE = {'nodes': [{'id': 'a', 'type': 'step'}], 'connections': []}
+
+
+def record(record_id: str) -> dict:
+    now = datetime.now()
+    return {'id': record_id, 'created_at': now, 'updated_at': now}
+
+
+def test_write_group_commits_as_a_unit_when_its_batch_fails(tmp_path):
+    async def scenario():
+        repository = SQLiteRepository(DatabaseSettings(url=f"sqlite:///{tmp_path}/state.db"))
+        await repository.initialize()
+        with sqlite3.connect(repository.path) as connection:
+            connection.execute(
+                "CREATE TRIGGER reject BEFORE INSERT ON workflows WHEN NEW.id = 'bad' "
+                "BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+            )
+
+        group, single = await asyncio.gather(
+            repository.save_many('workflows', [record('first'), record('bad')]),
+            repository.save('workflows', record('other')),
+            return_exceptions=True
+        )
+        assert isinstance(group, sqlite3.IntegrityError) and single is None
+        assert [row['id'] for row in await repository.load_all('workflows')] == ['other']
+
+        await repository.save_many('workflows', [record('first'), record('second')])
+        await repository.delete_many('workflows', ['first', 'other'])
+        assert [row['id'] for row in await repository.load_all('workflows')] == ['second']
+        await repository.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_bulk_create_and_delete_write_through_in_one_transaction(tmp_path):
+    async def scenario():
+        repository = SQLiteRepository(DatabaseSettings(url=f"sqlite:///{tmp_path}/state.db"))
+        await repository.initialize()
+        service = WorkflowService(repository=repository)
+        await service.initialize()
+
+        commits = repository.commit_count
+        results = await service.create_workflows([
+            WorkflowCreate(name=f"wf{index}", workflow_data=SINGLE) for index in range(3)
+        ] + [WorkflowCreate(name='looped', workflow_data=CYCLE)])
+        assert [item.status for item in results] == ['created'] * 3 + ['invalid']
+        assert repository.commit_count == commits + 1
+        assert len(await repository.load_all('workflows')) == 3
+
+        await service.delete_workflows([item.id for item in results[:2]] + ['missing'])
+        assert repository.commit_count == commits + 2
+        assert len(await repository.load_all('workflows')) == 1
+        await service.cleanup()
+        await repository.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_client_errors_are_not_reported_as_server_errors():
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await app.state.task_service.initialize()
+        yield
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(router, prefix="/api/v1")
+    app.state.workflow_service = WorkflowService()
+    app.state.task_service = TaskService()
+
+    with TestClient(app) as client:
+        assert client.post("/api/v1/workflows", json={'name': 'looped', 'workflow_data': CYCLE}).status_code == 422
+        workflow_id = client.post("/api/v1/workflows", json={'name': 'ok', 'workflow_data': SINGLE}).json()['id']
+        assert client.put(f"/api/v1/workflows/{workflow_id}", json={'workflow_data': CYCLE}).status_code == 422
+        assert client.put("/api/v1/workflows/missing", json={'name': 'x'}).status_code == 404
+
+        bad_trigger = {'workflow_id': workflow_id, 'trigger_config': {'type': 'scheduled', 'cron_expression': 'soon'}}
+        assert client.post("/api/v1/tasks", json=bad_trigger).status_code == 400
+        assert client.post("/api/v1/tasks:delete", json={}).status_code == 400
+
+        deleted = client.post("/api/v1/workflows:delete", json={'workflow_ids': [workflow_id, 'missing']})
+        assert deleted.status_code == 200
+        assert [item['status'] for item in deleted.json()['results']] == ['deleted', 'not_found']
@@ -0,0 +1,127 @@
+"""
+Workflow blob store tests
+工作流块存储测试
+"""
+
+import asyncio
+import copy
+import os
+
+from src.models.workflow import WorkflowCreate, WorkflowUpdate
+from src.services.repository import SQLiteRepository
+from src.services.workflow_blobs import WorkflowBlobStore
+from src.services.workflow_service import WorkflowService
+from src.utils.config import DatabaseSettings
+
+
+def document(title: str = 'Shop') -> dict:
+    return {
+        'nodes': [
+            {
+                'id': 'start',
+                'type': 'start',
+                'properties': {},
+                'operation_units': [{'id': 'u1', 'action': {'type': 'click'}}]
+            },
+            {'id': 'end', 'type': 'end', 'properties': {'title': title}}
+        ],
+        'connections': [{'from_node': 'start', 'from_socket': 'out', 'to_node': 'end', 'to_socket': 'in'}]
+    }
+
+
+def chunk_files(directory: str) -> set:
+    return {
+        name
+        for prefix in os.listdir(directory) if os.path.isdir(os.path.join(directory, prefix))
+        for name in os.listdir(os.path.join(directory, prefix))
+    }
+
+
+def open_service(tmp_path) -> WorkflowService:
+    return WorkflowService(
+        repository=SQLiteRepository(DatabaseSettings(url=f"sqlite:///{tmp_path}/state.db")),
+        blobs=WorkflowBlobStore(str(tmp_path / 'chunks'), cache_entries=4)
+    )
+
+
+def test_chunked_document_round_trips_through_compression(tmp_path):
+    async def scenario():
+        blobs = WorkflowBlobStore(str(tmp_path), cache_entries=1)
+        original = document()
+        ref, _ = await blobs.put(copy.deepcopy(original))
+        assert len(chunk_files(str(tmp_path))) >= 5
+
+        reopened = WorkflowBlobStore(str(tmp_path))
+        assert reopened.load(ref) == original
+        await blobs.close()
+        await reopened.close()
+
+    asyncio.run(scenario())
+
+
+def test_records_keep_only_the_ref(tmp_path):
+    async def scenario():
+        service = open_service(tmp_path)
+        await service.repository.initialize()
+        await service.initialize()
+        created = await service.create_workflow(WorkflowCreate(name='Shop', workflow_data=document()))
+
+        record = service.store.get(created.id)
+        assert 'workflow_data' not in record and 'workflow_ref' in record
+        assert (await service.get_workflow(created.id)).workflow_data == document()
+        assert [workflow.workflow_data for workflow in await service.list_workflows()] == [document()]
+        assert 'workflow_data' not in record
+        await service.cleanup()
+        await service.repository.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_deleting_a_workflow_removes_only_its_own_chunks(tmp_path):
+    async def scenario():
+        service = open_service(tmp_path)
+        await service.repository.initialize()
+        await service.initialize()
+        chunks = str(tmp_path / 'chunks')
+
+        first = await service.create_workflow(WorkflowCreate(name='Shop', workflow_data=document()))
+        alone = chunk_files(chunks)
+        clone = await service.create_workflow(WorkflowCreate(name='Clone', workflow_data=document('Checkout')))
+        both = chunk_files(chunks)
+        assert alone < both
+
+        await service.delete_workflow(first.id)
+        remaining = chunk_files(chunks)
+        # The start node and its unit are shared with the clone and stay
+        assert remaining < both and remaining & alone
+        assert (await service.get_workflow(clone.id)).workflow_data == document('Checkout')
+
+        await service.update_workflow(clone.id, WorkflowUpdate(workflow_data=document('Paid')))
+        await service.delete_workflows([clone.id])
+        assert chunk_files(chunks) == set()
+        await service.cleanup()
+        await service.repository.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_restart_recounts_references_before_releasing(tmp_path):
+    async def scenario():
+        service = open_service(tmp_path)
+        await service.repository.initialize()
+        await service.initialize()
+        kept = await service.create_workflow(WorkflowCreate(name='Shop', workflow_data=document()))
+        dropped = await service.create_workflow(WorkflowCreate(name='Copy', workflow_data=document()))
+        await service.cleanup()
+        await service.repository.cleanup()
+
+        service = open_service(tmp_path)
+        await service.repository.initialize()
+        await service.initialize()
+        await service.delete_workflow(dropped.id)
+        service.blobs._objects.clear()
+        assert (await service.get_workflow(kept.id)).workflow_data == document()
+        await service.cleanup()
+        await service.repository.cleanup()
+
+    asyncio.run(scenario())
@@ -0,0 +1,93 @@
+"""
+Workflow version history tests
+工作流版本历史测试
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.routes import router
+from src.models.workflow import WorkflowCreate, WorkflowUpdate
+from src.services.workflow_history import WorkflowHistory
+from src.services.workflow_service import WorkflowService, WorkflowVersionConflict
+
+
+def document(version: int) -> dict:
+    return {'name': 'wf', 'big': 'x' * 500, 'nodes': [{'id': 'n', 'properties': {'version': version}}]}
+
+
+def test_versions_are_stored_as_diffs_with_periodic_checkpoints(tmp_path):
+    async def scenario():
+        history = WorkflowHistory(str(tmp_path), checkpoint_interval=4)
+        for version in range(1, 10):
+            await history.record('wf', version, document(version), document(version - 1) if version > 1 else None)
+
+        versions = await history.list_versions('wf')
+        assert [info['version'] for info in versions] == list(range(9, 0, -1))
+        assert [info['version'] for info in versions if info['checkpoint']] == [9, 5, 1]
+        assert all(info['size_bytes'] < 200 for info in versions if not info['checkpoint'])
+        await history.close()
+
+        # A fresh instance indexes the file and rebuilds any version
+        reopened = WorkflowHistory(str(tmp_path), checkpoint_interval=4)
+        assert await reopened.get_version('wf', 7) == document(7)
+        assert reopened.stats['patches_applied'] == 2
+        assert await reopened.get_version('wf', 10) is None
+        await reopened.drop('wf')
+        assert await reopened.list_versions('wf') == []
+        await reopened.close()
+
+    asyncio.run(scenario())
+
+
+def test_rollback_is_saved_as_a_new_version():
+    async def scenario():
+        service = WorkflowService()
+        await service.initialize()
+        workflow = await service.create_workflow(WorkflowCreate(name='first', workflow_data={'nodes': [], 'connections': []}))
+        await service.update_workflow(workflow.id, WorkflowUpdate(name='second'))
+        await service.update_workflow(workflow.id, WorkflowUpdate(name='third'))
+
+        assert (await service.get_version(workflow.id, 1)).name == 'first'
+        result = await service.rollback_workflow(workflow.id, 1)
+        assert result.version == 4
+        assert (await service.get_workflow(workflow.id)).name == 'first'
+        versions = await service.list_versions(workflow.id)
+        assert [(info.version, info.reason) for info in versions][:2] == [(4, 'rollback to 1'), (3, 'update')]
+
+        with pytest.raises(WorkflowVersionConflict):
+            await service.rollback_workflow(workflow.id, 2, expected_version=3)
+        with pytest.raises(LookupError):
+            await service.rollback_workflow(workflow.id, 9)
+        await service.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_version_routes():
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        await app.state.workflow_service.cleanup()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(router, prefix="/api/v1")
+    app.state.workflow_service = WorkflowService()
+
+    with TestClient(app) as client:
+        workflow_id = client.post("/api/v1/workflows", json={'name': 'first', 'workflow_data': {'nodes': []}}).json()['id']
+        client.put(f"/api/v1/workflows/{workflow_id}", json={'name': 'second'})
+
+        assert [item['version'] for item in client.get(f"/api/v1/workflows/{workflow_id}/versions").json()] == [2, 1]
+        assert client.get(f"/api/v1/workflows/{workflow_id}/versions/1").json()['name'] == 'first'
+        assert client.get(f"/api/v1/workflows/{workflow_id}/versions/7").status_code == 404
+
+        rollback = client.post(f"/api/v1/workflows/{workflow_id}/versions/1/rollback", headers={'If-Match': '"2"'})
+        assert rollback.status_code == 200 and rollback.headers['etag'] == '"3"'
+        assert client.post(f"/api/v1/workflows/{workflow_id}/versions/1/rollback", headers={'If-Match': '"2"'}).status_code == 412
+        assert client.post(f"/api/v1/workflows/{workflow_id}/versions/9/rollback").status_code == 404
+        assert client.get("/api/v1/workflows/missing/versions").status_code == 404
@@ -0,0 +1,111 @@
+"""
+Workflow planner tests
+工作流执行计划测试
+"""
+
+import asyncio
+
+import pytest
+
+from src.services.workflow_planner import WorkflowExecutor, WorkflowValidationError, build_plan
+
+
+def diamond(**execution_config) -> dict:
+    """start -> left, right -> end"""
+    def link(source: str, target: str, socket: str) -> dict:
+        return {'from_node': source, 'from_socket': 'out', 'to_node': target, 'to_socket': socket}
+
+    return {
+        'nodes': [{'id': node_id, 'type': 'step'} for node_id in ('start', 'left', 'right', 'end')],
+        'connections': [
+            link('start', 'left', 'in'),
+            link('start', 'right', 'in'),
+            link('left', 'end', 'a'),
+            link('right', 'end', 'b')
+        ],
+        'execution_config': execution_config
+    }
+
+
+def test_plan_orders_nodes_into_levels():
+    plan = build_plan('wf', None, diamond())
+
+    assert plan.levels == (('start',), ('left', 'right'), ('end',))
+    assert plan.dependency_counts['end'] == 2
+    assert plan.priority['start'] == 3
+
+
+def test_cycles_and_dangling_sockets_are_rejected():
+    looped = diamond()
+    looped['connections'].append({'from_node': 'end', 'from_socket': 'out', 'to_node': 'start', 'to_socket': 'in'})
+    with pytest.raises(WorkflowValidationError, match="cycle"):
+        build_plan('wf', None, looped)
+
+    dangling = diamond()
+    dangling['connections'][0]['to_socket'] = None
+    with pytest.raises(WorkflowValidationError, match="dangling"):
+        build_plan('wf', None, dangling)
+
+
+@pytest.mark.parametrize('config', [
+    {'timeout_seconds': 0},
+    {'timeout_seconds': -5},
+    {'timeout_seconds': 'soon'},
+    {'timeout_seconds': float('inf')},
+    {'max_parallel': 0},
+    {'max_parallel': '4'},
+    {'max_parallel': 2.5},
+    {'max_parallel': True},
+    {'mode': 'eventually'}
+])
+def test_invalid_execution_config_is_rejected(config):
+    with pytest.raises(WorkflowValidationError):
+        build_plan('wf', None, diamond(**config))
+
+
+def test_parallel_mode_runs_independent_branches_together():
+    async def scenario():
+        running = set()
+        overlapped = []
+
+        async def runner(node, inputs):
+            running.add(node.id)
+            await asyncio.sleep(0.01)
+            overlapped.append(set(running))
+            running.discard(node.id)
+            return {'out': node.id}
+
+        result = await WorkflowExecutor(runner).execute(build_plan('wf', None, diamond(mode='parallel')))
+        assert result.success
+        assert result.outputs['end'] == {'out': 'end'}
+        assert {'left', 'right'} in overlapped
+
+    asyncio.run(scenario())
+
+
+def test_failed_node_stops_the_plan_and_skips_its_dependents():
+    async def scenario():
+        async def runner(node, inputs):
+            if node.id == 'left':
+                raise RuntimeError("boom")
+            return {'out': node.id}
+
+        plan = build_plan('wf', None, diamond(mode='parallel', error_handling='continue'))
+        result = await WorkflowExecutor(runner).execute(plan)
+        assert not result.success
+        assert result.errors == {'left': 'boom'}
+        assert 'right' in result.outputs and result.skipped == ['end']
+
+    asyncio.run(scenario())
+
+
+def test_plan_timeout_fails_the_run():
+    async def scenario():
+        async def runner(node, inputs):
+            await asyncio.sleep(1)
+
+        result = await WorkflowExecutor(runner).execute(build_plan('wf', None, diamond(timeout_seconds=0.05)))
+        assert not result.success
+        assert 'timed out' in result.errors['__workflow__']
+
+    asyncio.run(scenario())